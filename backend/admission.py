@@ -0,0 +1,185 @@
+"""
+Admission control for expensive endpoints.
+
+Grid generation can spend a long time in retry loops, so the endpoints that run it
+are each given a token bucket (sustained rate plus burst) and a concurrency limit
+with a short bounded wait queue. Requests over either limit are shed at once with
+429 or 503 and a Retry-After estimate. Guess and verification endpoints are never
+gated, so they always keep the remaining worker capacity.
+"""
+
+from typing import Dict, Optional
+import logging
+import math
+import os
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate tokens per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> Optional[float]:
+        """Take a token; returns None on success or the seconds until one is available"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+class Admission:
+    """Outcome of an admission attempt; use as a context manager to release the slot"""
+    __slots__ = ('limiter', 'admitted', 'status', 'retry_after', 'reason', 'started')
+
+    def __init__(self, limiter: Optional['EndpointLimiter'], admitted: bool, status: int = 200,
+                 retry_after: int = 0, reason: Optional[str] = None):
+        self.limiter = limiter
+        self.admitted = admitted
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+        self.started = time.monotonic()
+
+    def __enter__(self) -> 'Admission':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if self.admitted and self.limiter is not None:
+            self.limiter.release(time.monotonic() - self.started)
+
+
+class EndpointLimiter:
+    """Rate and concurrency limits for one endpoint"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 rate: float = 0.0, burst: int = 0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rate, max(1, burst)) if rate > 0 else None
+
+        self.condition = threading.Condition()
+        self.active = 0
+        self.queued = 0
+        self.service_time = 0.5  # Moving average of seconds a slot is held, for Retry-After
+
+        self.admitted = 0
+        self.max_queued = 0
+        self.shed_rate_limited = 0
+        self.shed_overloaded = 0
+
+    def _retry_after(self) -> int:
+        # Time for the queue ahead to drain through the available slots
+        return max(1, math.ceil(self.service_time * (self.queued + 1) / self.max_concurrent))
+
+    def admit(self) -> Admission:
+        if self.bucket is not None:
+            wait = self.bucket.try_acquire()
+            if wait is not None:
+                with self.condition:
+                    self.shed_rate_limited += 1
+                logger.warning(f"Shed {self.name} request: rate limited")
+                return Admission(self, False, 429, max(1, math.ceil(wait)), 'Too many requests')
+
+        with self.condition:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.admitted += 1
+                return Admission(self, True)
+
+            if self.queued >= self.max_queue:
+                self.shed_overloaded += 1
+                retry_after = self._retry_after()
+                logger.warning(f"Shed {self.name} request: {self.active} running, {self.queued} queued")
+                return Admission(self, False, 503, retry_after, 'Server is busy')
+
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed_overloaded += 1
+                        logger.warning(f"Shed {self.name} request: queued for {self.queue_timeout}s")
+                        return Admission(self, False, 503, self._retry_after(), 'Server is busy')
+                    self.condition.wait(remaining)
+            finally:
+                self.queued -= 1
+
+            self.active += 1
+            self.admitted += 1
+            return Admission(self, True)
+
+    def release(self, held: float) -> None:
+        with self.condition:
+            self.active -= 1
+            self.service_time = 0.8 * self.service_time + 0.2 * held
+            self.condition.notify()
+
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                'active': self.active,
+                'queued': self.queued,
+                'maxConcurrent': self.max_concurrent,
+                'maxQueued': self.max_queued,
+                'admitted': self.admitted,
+                'shedRateLimited': self.shed_rate_limited,
+                'shedOverloaded': self.shed_overloaded,
+            }
+
+
+class AdmissionController:
+    """Named endpoint limiters; endpoints without a limiter are always admitted"""
+
+    def __init__(self):
+        self.limiters = {}
+
+    def add(self, limiter: EndpointLimiter) -> None:
+        self.limiters[limiter.name] = limiter
+
+    def admit(self, endpoint: str) -> Admission:
+        limiter = self.limiters.get(endpoint)
+        if limiter is None:
+            return Admission(None, True)
+        return limiter.admit()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+def limiter_from_env(name: str, prefix: str) -> EndpointLimiter:
+    """
+    Build a limiter configured by <prefix>_CONCURRENCY, <prefix>_QUEUE,
+    <prefix>_QUEUE_TIMEOUT, <prefix>_RATE (requests per second, 0 for no limit)
+    and <prefix>_BURST.
+    """
+    limiter = EndpointLimiter(
+        name,
+        max_concurrent=int(os.environ.get(f'{prefix}_CONCURRENCY', '2')),
+        max_queue=int(os.environ.get(f'{prefix}_QUEUE', '8')),
+        queue_timeout=float(os.environ.get(f'{prefix}_QUEUE_TIMEOUT', '2.0')),
+        rate=float(os.environ.get(f'{prefix}_RATE', '20')),
+        burst=int(os.environ.get(f'{prefix}_BURST', '40')),
+    )
+    # The limits apply by default, so say which ones are in force
+    rate = f"{limiter.bucket.rate:g}/s (burst {limiter.bucket.burst})" if limiter.bucket else "unlimited"
+    logger.info(f"Admission limits for {name}: {limiter.max_concurrent} concurrent, queue {limiter.max_queue} "
+                f"({limiter.queue_timeout:g} s), rate {rate}; set {prefix}_* to change them")
+    return limiter
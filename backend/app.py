@@ -2,16 +2,18 @@
 Streamlit app for the League of Legends Grid Game.
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import json
 import random
 import uuid
-from datetime import datetime
+from contextlib import nullcontext
+from functools import lru_cache
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import sys
 import os
+import time
 import logging
 
 # Get the project root directory
@@ -19,144 +21,162 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(PROJECT_ROOT)
 
 # Import backend modules
-from backend.categories import CATEGORY_TYPES, get_all_categories, get_champions_for_category
-from backend.grid_generator import GridGenerator, load_champions_data
+from backend.categories import CATEGORY_TYPES, get_all_categories
+from backend.admission import AdmissionController, limiter_from_env
+from backend.data_reload import DataSnapshot, data_versions_from_env
+from backend.event_journal import journal_from_env
+from backend.game_store import MemoryGameStore, create_game_store
+from backend.grid_pool import GridPool
+from backend.game_state import GameState
+from backend.game_tokens import InvalidGameToken, load_token_secret
+from backend.icon_cache import IconCache, SpriteAtlasCache
+from backend.log_pipeline import configure_logging
+from backend.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics
+from backend.name_index import MAX_SUGGESTIONS, normalize_name
+from backend.profiling import profiler_from_env
+from backend.serialization import PreencodedPayload, compress_response, install_json_provider
+from backend.single_flight import SingleFlight
+from backend.tracing import TRACE_HEADER, traced, tracer_from_env
+from backend.warmup import Warmup, run_warmup
 
 import urllib.parse
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(PROJECT_ROOT, 'logs', 'game.log')),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging; records are queued and written by a background thread (see LOLGRID_LOG_*)
+log_pipeline = configure_logging(os.path.join(PROJECT_ROOT, 'logs', 'game.log'))
 logger = logging.getLogger(__name__)
 
+# Frontend origins allowed to call the API
+CORS_ORIGINS = ["http://localhost:3000"]
+
 app = Flask(__name__, static_folder=os.path.join(PROJECT_ROOT, 'static'))
 CORS(app, resources={
     r"/*": {
-        "origins": ["http://localhost:3000"],
+        "origins": CORS_ORIGINS,
         "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Accept"],
         "supports_credentials": True,
         "expose_headers": ["Content-Type", "Access-Control-Allow-Origin"]
     }
 })
-
-# Load champion data
-CHAMPION_DATA = load_champions_data()
-logger.info(f"Loaded {len(CHAMPION_DATA)} champions from data file")
-
-# Load champion icons mapping
-with open(os.path.join(PROJECT_ROOT, "data", "champion_icons.json"), "r") as f:
-    CHAMPION_ICONS = json.load(f)
-    logger.info(f"Loaded {len(CHAMPION_ICONS)} champion icons")
-
-# Get list of all champion names for autocomplete
-CHAMPION_NAMES = sorted([champion["name"] for champion in CHAMPION_DATA])
-
-# Initialize grid generator
-grid_generator = GridGenerator(CHAMPION_DATA)
-logger.info("Initialized grid generator")
-
-# Store game states for different sessions
-game_states = {}
-
-# Store the daily challenge
+install_json_provider(app)
+
+# Opt-in request profiling; the app is only wrapped when a trigger is configured
+profiler = profiler_from_env()
+if profiler is not None:
+    app.wsgi_app = profiler.wrap(app.wsgi_app)
+
+# Request metrics, exposed with the rest of the registry on /metrics
+HTTP_REQUESTS = metrics.counter('lolgrid_http_requests_total', 'HTTP requests by endpoint, method and status', ['endpoint', 'method', 'status'])
+HTTP_ERRORS = metrics.counter('lolgrid_http_request_errors_total', 'HTTP requests that failed with a server error', ['endpoint'])
+HTTP_LATENCY = metrics.histogram('lolgrid_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint'])
+LIVE_GAMES = metrics.gauge('lolgrid_live_games', 'Games started and not yet finished')
+GAMES_FINISHED = metrics.counter('lolgrid_games_finished_total', 'Games played until no guesses remained')
+
+def record_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    """Count a finished request and its latency; shared with the ASGI app"""
+    HTTP_REQUESTS.labels(endpoint=endpoint, method=method, status=status).inc()
+    HTTP_LATENCY.labels(endpoint=endpoint).observe(seconds)
+    if status >= 500:
+        HTTP_ERRORS.labels(endpoint=endpoint).inc()
+
+# Sampled request traces, kept for /api/debug/traces (see LOLGRID_TRACE_*)
+tracer = tracer_from_env()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if tracer.enabled:
+        g.trace_scope = tracer.start_trace(f"{request.method} {request.path}", request.headers.get(TRACE_HEADER))
+
+# Registered before compression so it runs last and the latency includes it
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        record_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    trace_scope = g.pop('trace_scope', None)
+    if trace_scope is not None:
+        tracer.finish_trace(trace_scope, status=response.status_code)
+        response.headers['X-Trace-Id'] = trace_scope.span.trace.trace_id
+    return response
+
+@app.teardown_request
+def finish_unfinished_trace(exc):
+    # after_request does not run when a response could not be built
+    trace_scope = g.pop('trace_scope', None)
+    if trace_scope is not None:
+        tracer.finish_trace(trace_scope, error=type(exc).__name__ if exc is not None else None)
+
+@app.after_request
+def compress_dynamic_response(response):
+    return compress_response(response, request)
+
+# Champion data and everything derived from it, published as one snapshot that is
+# swapped atomically when the data files change (see LOLGRID_DATA_RELOAD). Handlers
+# read data_versions.current once and use that snapshot for the whole request.
+data_versions = data_versions_from_env(load_token_secret())
+CHAMPION_NAMES_CACHE_CONTROL = 'public, max-age=3600'
+AUTOCOMPLETE_CACHE_CONTROL = 'public, max-age=3600'
+CATEGORY_CATALOG_CACHE_CONTROL = 'public, max-age=86400'
+
+# Grid generation is gated so a burst of new games cannot starve guesses; shed
+# /api/game requests are served from recently generated grids when possible
+admission = AdmissionController()
+admission.add(limiter_from_env('game', 'LOLGRID_GAME'))
+admission.add(limiter_from_env('generate', 'LOLGRID_GENERATE'))
+grid_pool = GridPool()
+pool_flight = SingleFlight('grid_pool')
+
+# Stateless mode hands games to the client as signed tokens instead of storing them
+STATELESS_GAMES = os.environ.get('LOLGRID_STATELESS_GAMES', '0') == '1'
+
+# Store game states for different sessions (in memory or SQLite, see LOLGRID_GAME_STORE)
+# Each stored game is rebuilt against the data version it was created with
+game_states = create_game_store(lambda record: GameState.from_record(record, data_versions.index_for(record[1])))
+logger.info(f"Using {type(game_states).__name__} for game states")
+
+# Append-only journal of games, guesses and daily verifications (see LOLGRID_EVENT_JOURNAL)
+event_journal = journal_from_env()
+
+# Store the daily challenge; it carries its own date and is replaced, never mutated
 daily_challenge = None
-daily_challenge_date = None
-
-# Champion ID mapping for special characters
-CHAMPION_ID_MAPPING = {
-    "Aurelion Sol": "AurelionSol",
-    "Bel'Veth": "Belveth",
-    "Cho'Gath": "Chogath",
-    "Dr. Mundo": "DrMundo",
-    "Jarvan IV": "JarvanIV",
-    "Kai'Sa": "Kaisa",
-    "K'Sante": "KSante",
-    "Kha'Zix": "Khazix",
-    "Kog'Maw": "KogMaw",
-    "Lee Sin": "LeeSin",
-    "Master Yi": "MasterYi",
-    "Miss Fortune": "MissFortune",
-    "Nunu & Willump": "Nunu",
-    "Rek'Sai": "RekSai",
-    "Renata Glasc": "Renata",
-    "Tahm Kench": "TahmKench",
-    "Twisted Fate": "TwistedFate",
-    "Vel'Koz": "Velkoz",
-    "Xin Zhao": "XinZhao"
-}
+daily_flight = SingleFlight('daily_challenge')
 
 # Get the champion ID for the icon URL
 def get_champion_id(champion_name):
-    return CHAMPION_ID_MAPPING.get(champion_name, champion_name)
-
-def validate_game_state(game_state: Dict) -> bool:
-    """Validate that a game state has all required fields and correct structure."""
-    try:
-        # Check required top-level fields
-        required_fields = ['grid', 'categories', 'guessesRemaining', 'isGameOver', 'score', 'gameId']
-        if not all(field in game_state for field in required_fields):
-            logger.error(f"Game state missing required fields: {[f for f in required_fields if f not in game_state]}")
-            return False
-
-        # Validate grid structure
-        if not isinstance(game_state['grid'], list) or len(game_state['grid']) != 3:
-            logger.error("Invalid grid structure: grid must be a 3x3 array")
-            return False
-
-        for row in game_state['grid']:
-            if not isinstance(row, list) or len(row) != 3:
-                logger.error("Invalid grid structure: each row must contain 3 cells")
-                return False
-            for cell in row:
-                if not isinstance(cell, dict):
-                    logger.error("Invalid cell structure: each cell must be a dictionary")
-                    return False
-                required_cell_fields = ['xCategory', 'yCategory', 'correctChampions']
-                if not all(field in cell for field in required_cell_fields):
-                    logger.error(f"Cell missing required fields: {[f for f in required_cell_fields if f not in cell]}")
-                    return False
-                if not isinstance(cell['correctChampions'], list):
-                    logger.error("Invalid correctChampions field: must be a list")
-                    return False
-
-        return True
-    except Exception as e:
-        logger.error(f"Error validating game state: {str(e)}")
-        return False
-
-def get_game_state(game_id: str) -> Optional[Dict]:
-    """Safely retrieve a game state, with validation."""
+    return data_versions.current.name_index.icon_id(champion_name)
+
+def canonical_champion_name(champion: str, index) -> str:
+    """
+    Resolve a guessed spelling to the champion's display name in the data version
+    of the given champion index (a game's), leaving unknown names as typed
+    """
+    snapshot = data_versions.get(index.version) or data_versions.current
+    return snapshot.name_index.canonical(champion) or champion
+
+# Load every champion icon into memory once, keyed by normalized champion ID
+icon_cache = IconCache(os.path.join(PROJECT_ROOT, 'static', 'champion_icons'), get_champion_id)
+atlas_cache = SpriteAtlasCache(os.path.join(PROJECT_ROOT, 'static', 'champion_icons', 'atlas'))
+
+def get_champion_icon_url(champion_name):
+    """Content-hashed icon URL for a champion, falling back to the plain URL"""
+    return icon_cache.icon_url(champion_name) or f"/champion_icons/{urllib.parse.quote(get_champion_id(champion_name))}"
+
+def get_game_state(game_id: str) -> Optional[GameState]:
+    """Safely retrieve a game state."""
     try:
-        if game_id not in game_states:
+        game_state = game_states.get(game_id)
+        if game_state is None:
             logger.error(f"Game state not found for ID: {game_id}")
-            return None
-        
-        game_state = game_states[game_id]
-        if not validate_game_state(game_state):
-            logger.error(f"Invalid game state found for ID: {game_id}")
-            # Remove corrupted game state
-            del game_states[game_id]
-            return None
-        
         return game_state
     except Exception as e:
         logger.error(f"Error retrieving game state: {str(e)}")
         return None
 
-def save_game_state(game_id: str, game_state: Dict) -> bool:
-    """Safely save a game state, with validation."""
+def save_game_state(game_id: str, game_state: GameState) -> bool:
+    """Safely save a game state."""
     try:
-        if not validate_game_state(game_state):
-            logger.error(f"Attempted to save invalid game state for ID: {game_id}")
-            return False
-        
         game_states[game_id] = game_state
         logger.info(f"Successfully saved game state for ID: {game_id}")
         return True
@@ -169,7 +189,7 @@ def get_champions_for_categories(category1: str, category2: str) -> List[str]:
     # This function is kept for backward compatibility
     # The actual implementation is now in the GridGenerator class
     logger.debug(f"Finding champions matching both categories: '{category1}' and '{category2}'")
-    difficulty, matching_champions = grid_generator.calculate_pair_difficulty(category1, category2)
+    difficulty, matching_champions = data_versions.current.grid_generator.calculate_pair_difficulty(category1, category2)
     logger.info(f"Found {len(matching_champions)} champions matching both categories")
     return matching_champions
 
@@ -178,85 +198,210 @@ def generate_valid_grid() -> Tuple[List[str], List[str], List[List[List[str]]]]:
     # This function is kept for backward compatibility
     # The actual implementation is now in the GridGenerator class
     logger.info("Generating valid grid")
-    row_categories, col_categories, solutions, _ = grid_generator.generate_valid_grid()
+    row_categories, col_categories, solutions, _ = data_versions.current.grid_generator.generate_valid_grid()
     logger.info(f"Generated grid with row categories: {row_categories}")
     logger.info(f"Generated grid with column categories: {col_categories}")
     return row_categories, col_categories, solutions
 
+def wants_compact_format() -> bool:
+    """Whether the client asked for the compact wire format (?format=compact)"""
+    return request.args.get('format') == 'compact'
+
+def game_state_response(game_state: GameState, compact: bool, row: Optional[int] = None,
+                        col: Optional[int] = None, with_token: bool = False) -> Dict:
+    """
+    Serialize a game state for the client. Compact responses to a guess only
+    carry the changed cell; stateless games carry a freshly signed token.
+    """
+    if not compact:
+        payload = game_state.to_dict()
+    elif row is not None:
+        payload = game_state.guess_delta(row, col)
+    else:
+        payload = game_state.to_compact_dict()
+    if with_token:
+        payload['gameToken'] = data_versions.encode_token(game_state)
+    return payload
+
+@traced('generate_stateless_game_state')
+def generate_stateless_game_state(difficulty: float = 0.5):
+    """Generate a game state carried entirely by a signed game token"""
+    try:
+        logger.info(f"Generating stateless game state with difficulty: {difficulty}")
+        snapshot = data_versions.current
+        row_categories, col_categories, _, grid_difficulty = snapshot.grid_generator.generate_valid_grid(difficulty)
+        grid_pool.add(row_categories, col_categories, grid_difficulty)
+        game_state = snapshot.token_codec.new_game(row_categories, col_categories, grid_difficulty)
+        record_game_created(game_state, row_categories, col_categories, grid_difficulty)
+        logger.info(f"Generated new game state with ID: {game_state.game_id}")
+        return game_state
+    except Exception as e:
+        logger.error(f"Error generating stateless game state: {str(e)}")
+        return None
+
+@traced('generate_game_state')
 def generate_game_state(difficulty: float = 0.5):
     """Generate a game state with the specified difficulty"""
+    if STATELESS_GAMES:
+        return generate_stateless_game_state(difficulty)
     try:
         logger.info(f"Generating game state with difficulty: {difficulty}")
-        game_state = grid_generator.generate_game_state(difficulty)
-        game_id = str(uuid.uuid4())
-        game_state['gameId'] = game_id
-        
-        if not save_game_state(game_id, game_state):
-            logger.error("Failed to save initial game state")
-            return None
-        
-        logger.info(f"Generated new game state with ID: {game_id}")
-        return game_state
+        snapshot = data_versions.current
+        row_categories, col_categories, _, grid_difficulty = snapshot.grid_generator.generate_valid_grid(difficulty)
+        grid_pool.add(row_categories, col_categories, grid_difficulty)
+        return start_game(row_categories, col_categories, grid_difficulty, snapshot)
     except Exception as e:
         logger.error(f"Error generating game state: {str(e)}")
         return None
 
-def generate_daily_challenge():
-    """Generate a daily challenge with medium difficulty."""
-    global daily_challenge, daily_challenge_date
+def start_game(row_categories: List[str], col_categories: List[str], grid_difficulty: float,
+               snapshot: Optional[DataSnapshot] = None) -> Optional[GameState]:
+    """Start a game on an already generated grid, pinned to the given (or current) data version"""
+    snapshot = snapshot or data_versions.current
+    if STATELESS_GAMES:
+        game_state = snapshot.token_codec.new_game(row_categories, col_categories, grid_difficulty)
+        record_game_created(game_state, row_categories, col_categories, grid_difficulty)
+        return game_state
+    
+    game_id = str(uuid.uuid4())
+    game_state = GameState(snapshot.champion_index, game_id, row_categories, col_categories, grid_difficulty)
+    
+    if not save_game_state(game_id, game_state):
+        logger.error("Failed to save initial game state")
+        return None
     
+    record_game_created(game_state, row_categories, col_categories, grid_difficulty)
+    logger.info(f"Generated new game state with ID: {game_id}")
+    return game_state
+
+def record_game_created(game_state, row_categories: List[str], col_categories: List[str], grid_difficulty: float) -> None:
+    LIVE_GAMES.inc()
+    event_journal.record('game', game=game_state.game_id, rows=row_categories, cols=col_categories,
+                         difficulty=round(grid_difficulty, 4), stateless=STATELESS_GAMES)
+
+def record_guess(game_state, row: int, col: int, champion: str, is_correct: bool) -> None:
+    event_journal.record('guess', game=game_state.game_id, row=row, col=col, champion=champion, correct=is_correct,
+                         score=game_state.score, remaining=game_state.guesses_remaining)
+
+def finish_game(game_state) -> None:
+    """Record a game that has just used its last guess"""
+    LIVE_GAMES.dec()
+    GAMES_FINISHED.inc()
+    logger.info(f"Game completed - ID: {game_state.game_id}, Final Score: {game_state.score}")
+
+def shed_payload(ticket) -> Tuple[Dict, int]:
+    """Error payload for a request refused by admission control; routes turn retryAfter into a Retry-After header"""
+    return {'error': ticket.reason, 'retryAfter': ticket.retry_after}, ticket.status
+
+def api_response(payload: Dict, status: int):
+    response = jsonify(payload)
+    if 'retryAfter' in payload:
+        response.headers['Retry-After'] = str(payload['retryAfter'])
+    return response, status
+
+def daily_challenge_is_current() -> bool:
+    """Whether today's daily challenge has already been generated."""
+    challenge = daily_challenge
+    return challenge is not None and challenge['date'] == datetime.now().date()
+
+def generate_daily_challenge():
+    """Get today's daily challenge, generating it on the first call of the day."""
     # Only generate a new challenge if it's a new day or we don't have one
     today = datetime.now().date()
-    if daily_challenge_date != today or daily_challenge is None:
-        logger.info("Generating new daily challenge")
-        # Generate a grid with medium difficulty (0.5)
-        row_categories, col_categories, solutions, _ = grid_generator.generate_valid_grid(0.5)
-        
-        # Create the daily challenge format
-        daily_challenge = {
-            'rows': row_categories,
-            'cols': col_categories,
-            'solutions': solutions
-        }
-        daily_challenge_date = today
-        logger.info(f"Generated daily challenge with row categories: {row_categories}")
-        logger.info(f"Generated daily challenge with column categories: {col_categories}")
-    else:
+    challenge = daily_challenge
+    if challenge is not None and challenge['date'] == today:
         logger.info("Using existing daily challenge")
+        return challenge
+    
+    # At rollover every request sees a stale challenge; one generates, the rest wait for it
+    return daily_flight.do(today, build_daily_challenge, today)
+
+def build_daily_challenge(today):
+    """Generate and publish the daily challenge for a date with medium difficulty."""
+    global daily_challenge
     
-    return daily_challenge
+    # A caller that missed the challenge but not the flight finds it published already
+    challenge = daily_challenge
+    if challenge is not None and challenge['date'] == today:
+        return challenge
+    
+    logger.info("Generating new daily challenge")
+    # The challenge keeps the data version it was generated from until rollover
+    snapshot = data_versions.current
+    # Generate a grid with medium difficulty (0.5), seeded by the date so every
+    # pre-forked worker picks the same challenge
+    daily_generator = snapshot.grid_generator.spawn(rng=random.Random(f"daily-{today.isoformat()}"))
+    row_categories, col_categories, solutions, _ = daily_generator.generate_valid_grid(0.5)
+    
+    # Create the daily challenge format, precomputing each cell's answer bitmask
+    # so verification is a single bit test
+    challenge = {
+        'date': today,
+        'rows': row_categories,
+        'cols': col_categories,
+        'solutions': solutions,
+        'answerMasks': [[snapshot.champion_index.pair_mask(row_cat, col_cat) for col_cat in col_categories] for row_cat in row_categories],
+        'index': snapshot.champion_index,
+        'payload': PreencodedPayload(
+            {'rows': row_categories, 'cols': col_categories},
+            etag=f"{today.isoformat()}-{snapshot.version}"
+        )
+    }
+    # Published with a single assignment, so the date always matches the grid
+    daily_challenge = challenge
+    event_journal.record('daily', date=today.isoformat(), rows=row_categories, cols=col_categories)
+    logger.info(f"Generated daily challenge with row categories: {row_categories}")
+    logger.info(f"Generated daily challenge with column categories: {col_categories}")
+    return challenge
+
+def seconds_until_daily_rollover() -> int:
+    """Seconds until the daily challenge changes at local midnight."""
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((tomorrow - now).total_seconds()))
+
+def daily_cache_control() -> str:
+    # The grid is fixed until rollover, so clients and proxies can cache it until then
+    return f"public, max-age={seconds_until_daily_rollover()}"
 
 @app.route('/api/daily', methods=['GET'])
 def get_daily_challenge():
     """Get today's daily challenge."""
     logger.info("API request: get_daily_challenge")
     challenge = generate_daily_challenge()
-    return jsonify({
-        'rows': challenge['rows'],
-        'cols': challenge['cols']
-    })
+    return challenge['payload'].response(request, daily_cache_control())
 
-@app.route('/api/generate', methods=['POST'])
-def generate_new_grid():
-    data = request.get_json()
+def generate_grid_categories(data: Dict) -> Tuple[Dict, int]:
+    """Generate a grid's row and column categories without starting a game. Returns the payload and status."""
     difficulty = data.get('difficulty', 0.5)  # Default to medium difficulty
     logger.info(f"API request: generate_new_grid with difficulty: {difficulty}")
     
-    # Use the global CHAMPION_DATA
-    generator = GridGenerator(CHAMPION_DATA)
-    row_categories, col_categories, solutions, _ = generator.generate_valid_grid(target_difficulty=difficulty)
+    with admission.admit('generate') as ticket:
+        if not ticket.admitted:
+            return shed_payload(ticket)
+        
+        # A fresh generator over the current champion data, reusing the warm caches
+        generator = data_versions.current.grid_generator.spawn()
+        row_categories, col_categories, solutions, _ = generator.generate_valid_grid(target_difficulty=difficulty)
     
     logger.info(f"Generated grid with row categories: {row_categories}")
     logger.info(f"Generated grid with column categories: {col_categories}")
     
-    return jsonify({
+    return {
         'rows': row_categories,
         'cols': col_categories
-    })
+    }, 200
 
-@app.route('/api/daily/verify', methods=['POST'])
-def verify_daily_challenge():
-    data = request.get_json()
+@app.route('/api/generate', methods=['POST'])
+def generate_new_grid():
+    return api_response(*generate_grid_categories(request.get_json()))
+
+def valid_cell(row, col) -> bool:
+    """Whether row and col are integer coordinates inside the 3x3 grid"""
+    return all(isinstance(x, int) and not isinstance(x, bool) and 0 <= x < 3 for x in (row, col))
+
+def verify_daily_guess(data: Dict) -> Tuple[Dict, int]:
+    """Check a guess against today's daily challenge. Returns the payload and status."""
     row = data.get('row')
     col = data.get('col')
     champion = data.get('champion')
@@ -265,170 +410,495 @@ def verify_daily_challenge():
     
     if row is None or col is None or champion is None:
         logger.error("Missing required fields in verify_daily_challenge request")
-        return jsonify({'error': 'Missing required fields'}), 400
+        return {'error': 'Missing required fields'}, 400
     
-    challenge = generate_daily_challenge()
-    row_category = challenge['rows'][row]
-    col_category = challenge['cols'][col]
+    if not isinstance(champion, str):
+        logger.error(f"Rejected non-string champion guess: {champion!r}")
+        return {'error': 'Champion must be a string'}, 400
     
-    logger.debug(f"Verifying champion '{champion}' for cell with categories: '{row_category}' x '{col_category}'")
+    if not valid_cell(row, col):
+        logger.error(f"Invalid cell coordinates: row={row}, col={col}")
+        return {'error': 'Invalid cell coordinates'}, 400
     
-    # Get champions that match both categories
-    row_champions = set(get_champions_for_category(CHAMPION_DATA, row_category))
-    col_champions = set(get_champions_for_category(CHAMPION_DATA, col_category))
-    valid_champions = row_champions.intersection(col_champions)
+    challenge = generate_daily_challenge()
+    champion_index = challenge['index']
+    champion = canonical_champion_name(champion, champion_index)
     
-    is_correct = champion in valid_champions
+    # Look the champion up in the cell's precomputed answer bitmask
+    answer_mask = challenge['answerMasks'][row][col]
+    champion_id = champion_index.champion_ids.get(champion)
+    is_correct = champion_id is not None and bool(answer_mask >> champion_id & 1)
     logger.info(f"Verification result for '{champion}': {'correct' if is_correct else 'incorrect'}")
+    event_journal.record('verify', date=challenge['date'].isoformat(), row=row, col=col, champion=champion, correct=is_correct)
     
-    if not is_correct:
-        logger.debug(f"Valid champions for this cell: {', '.join(valid_champions)}")
+    if not is_correct and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Valid champions for this cell: {', '.join(champion_index.champions_for_mask(answer_mask))}")
     
-    return jsonify({
-        'isCorrect': is_correct
-    })
+    return {'isCorrect': is_correct}, 200
 
-@app.route('/api/game', methods=['GET'])
-def get_game():
+@app.route('/api/daily/verify', methods=['POST'])
+def verify_daily_challenge():
+    payload, status = verify_daily_guess(request.get_json())
+    return jsonify(payload), status
+
+def new_game(difficulty: str, compact: bool) -> Tuple[Dict, int]:
+    """Start a new game. Returns the payload and status."""
     try:
-        # Get difficulty from query parameters, default to 0.5
-        difficulty = float(request.args.get('difficulty', 0.5))
         # Clamp difficulty between 0 and 1
-        difficulty = max(0.0, min(1.0, difficulty))
+        difficulty = max(0.0, min(1.0, float(difficulty)))
         
         logger.info(f"API request: get_game with difficulty: {difficulty}")
         
-        game_state = generate_game_state(difficulty)
+        with admission.admit('game') as ticket:
+            if ticket.admitted:
+                game_state = generate_game_state(difficulty)
+            else:
+                # Fall back to a recent grid rather than turning the player away
+                grid = grid_pool.take(difficulty)
+                if grid is None:
+                    return shed_payload(ticket)
+                logger.info(f"Starting game on a pooled grid after shedding generation ({ticket.status})")
+                game_state = start_game(*grid)
+        
         if game_state is None:
             logger.error("Failed to generate game state")
-            return jsonify({'error': 'Failed to generate game state'}), 500
+            return {'error': 'Failed to generate game state'}, 500
         
-        return jsonify(game_state)
+        return game_state_response(game_state, compact, with_token=STATELESS_GAMES), 200
     except Exception as e:
         logger.error(f"Error in get_game: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return {'error': 'Internal server error'}, 500
 
-@app.route('/api/guess', methods=['POST'])
-def make_guess():
+@app.route('/api/game', methods=['GET'])
+def get_game():
+    # Get difficulty from query parameters, default to 0.5
+    return api_response(*new_game(request.args.get('difficulty', 0.5), wants_compact_format()))
+
+def token_guess_error(game: GameState, moves: List[Tuple[int, int, str]]) -> Optional[str]:
+    """
+    Why guesses cannot be applied to a token game, or None. A token only records
+    known champions, and a cell set in the token cannot be guessed again, which
+    would otherwise let a resubmitted token retry it.
+    """
+    cells = set()
+    for row, col, champion in moves:
+        if champion not in game.index.champion_ids:
+            return 'Unknown champion'
+        if game.cell(row, col).guess is not None or (row, col) in cells:
+            return 'Cell already guessed'
+        cells.add((row, col))
+    return None
+
+def make_stateless_guess(token: str, row, col, champion: str, compact: bool) -> Tuple[Dict, int]:
+    """Apply a guess to a token game, verifying the answer against the champion index"""
+    try:
+        game = data_versions.decode_token(token)
+    except InvalidGameToken as e:
+        logger.error(f"Rejected game token: {str(e)}")
+        return {'error': str(e)}, 400
+    
+    if not valid_cell(row, col):
+        logger.error(f"Invalid cell coordinates: row={row}, col={col}")
+        return {'error': 'Invalid cell coordinates'}, 400
+    if game.is_game_over:
+        logger.error(f"Guess submitted for finished game: {game.game_id}")
+        return {'error': 'Game is over'}, 400
+    
+    champion = canonical_champion_name(champion, game.index)
+    error = token_guess_error(game, [(row, col, champion)])
+    if error is not None:
+        logger.error(f"Rejected guess for token game {game.game_id}: {error}")
+        return {'error': error}, 400
+    is_correct = game.guess(row, col, champion)
+    record_guess(game, row, col, champion, is_correct)
+    logger.info(f"Guess result for '{champion}' in cell ({row},{col}): {'correct' if is_correct else 'incorrect'}")
+    if game.guesses_remaining == 0:
+        finish_game(game)
+    
+    return game_state_response(game, compact, row, col, with_token=True), 200
+
+def apply_guess(data: Dict, compact: bool) -> Tuple[Dict, int]:
+    """Apply a guess request to its game. Returns the payload and status."""
     try:
-        data = request.get_json()
         row = data.get('row')
         col = data.get('col')
         champion = data.get('champion')
         game_id = data.get('gameId')
+        game_token = data.get('gameToken')
         
         logger.info(f"API request: make_guess - game: {game_id}, row: {row}, col: {col}, champion: {champion}")
         
-        if not all(x is not None for x in [row, col, champion, game_id]):
-            logger.error("Missing required fields in make_guess request")
-            return jsonify({'error': 'Missing required fields'}), 400
-        
-        # Get current game state
-        game_state = get_game_state(game_id)
-        if game_state is None:
-            logger.error(f"Game state not found for ID: {game_id}")
-            return jsonify({'error': 'Game not found or corrupted'}), 404
+        # Anything but a string would be taken for a champion ID further down
+        if champion is not None and not isinstance(champion, str):
+            logger.error(f"Rejected non-string champion guess: {champion!r}")
+            return {'error': 'Champion must be a string'}, 400
         
-        # Validate row and col indices
-        if not (0 <= row < 3 and 0 <= col < 3):
-            logger.error(f"Invalid cell coordinates: row={row}, col={col}")
-            return jsonify({'error': 'Invalid cell coordinates'}), 400
+        if game_token is not None and all(x is not None for x in [row, col, champion]):
+            return make_stateless_guess(game_token, row, col, champion, compact)
         
-        # Check if the guess is correct
-        cell = game_state['grid'][row][col]
-        is_correct = champion in cell['correctChampions']
+        if not all(x is not None for x in [row, col, champion, game_id]):
+            logger.error("Missing required fields in make_guess request")
+            return {'error': 'Missing required fields'}, 400
         
-        logger.info(f"Guess result for '{champion}' in cell ({row},{col}): {'correct' if is_correct else 'incorrect'}")
+        # Load, guess and save under the game's lock so concurrent guesses on the
+        # same game apply one after the other
+        with game_states.locked(game_id):
+            # Get current game state
+            game_state = get_game_state(game_id)
+            if game_state is None:
+                logger.error(f"Game state not found for ID: {game_id}")
+                return {'error': 'Game not found or corrupted'}, 404
+            
+            # Validate row and col indices
+            if not valid_cell(row, col):
+                logger.error(f"Invalid cell coordinates: row={row}, col={col}")
+                return {'error': 'Invalid cell coordinates'}, 400
+            if game_state.is_game_over:
+                logger.error(f"Guess submitted for finished game: {game_id}")
+                return {'error': 'Game is over'}, 400
+            
+            # Check the guess against the cell's answer bitmask
+            champion = canonical_champion_name(champion, game_state.index)
+            is_correct = game_state.guess(row, col, champion)
+            record_guess(game_state, row, col, champion, is_correct)
+            
+            logger.info(f"Guess result for '{champion}' in cell ({row},{col}): {'correct' if is_correct else 'incorrect'}")
+            
+            if not is_correct and logger.isEnabledFor(logging.DEBUG):
+                correct_champions = game_state.index.champions_for_mask(game_state.cell(row, col).answer_mask)
+                logger.debug(f"Correct champions for this cell: {', '.join(correct_champions)}")
+            
+            # Check if game is over
+            if game_state.is_game_over:
+                finish_game(game_state)
+            
+            # Save the updated game state
+            if not save_game_state(game_id, game_state):
+                logger.error(f"Failed to save updated game state for ID: {game_id}")
+                return {'error': 'Failed to save game state'}, 500
+            
+            payload = game_state_response(game_state, compact, row, col)
         
-        if not is_correct:
-            logger.debug(f"Correct champions for this cell: {', '.join(cell['correctChampions'])}")
+        return payload, 200
+    except Exception as e:
+        logger.error(f"Error in make_guess: {str(e)}")
+        return {'error': 'Internal server error'}, 500
+
+# A game has nine guesses, so a longer batch can never be applied
+MAX_BATCH_GUESSES = 9
+
+def parse_batch_guesses(guesses) -> Tuple[Optional[List[Tuple[int, int, str]]], Optional[str]]:
+    """Validate a list of guesses, returning (row, col, champion as typed) moves or an error message"""
+    if not isinstance(guesses, list) or not guesses:
+        return None, 'Missing required fields'
+    if len(guesses) > MAX_BATCH_GUESSES:
+        return None, f'At most {MAX_BATCH_GUESSES} guesses per request'
+    
+    moves = []
+    for guess in guesses:
+        if not isinstance(guess, dict) or any(guess.get(field) is None for field in ('row', 'col', 'champion')):
+            return None, 'Missing required fields'
+        row, col = guess['row'], guess['col']
+        if not valid_cell(row, col):
+            return None, 'Invalid cell coordinates'
+        if not isinstance(guess['champion'], str):
+            return None, 'Champion must be a string'
+        moves.append((row, col, guess['champion']))
+    return moves, None
+
+def apply_guesses(data: Dict, compact: bool) -> Tuple[Dict, int]:
+    """
+    Apply a batch of guesses to one game in order under a single load and save.
+    The batch is validated up front and applied entirely or not at all.
+    Returns the payload and status.
+    """
+    try:
+        game_id = data.get('gameId')
+        game_token = data.get('gameToken')
+        guesses = data.get('guesses')
         
-        # Update the cell
-        cell['guessedChampion'] = champion
-        cell['isCorrect'] = is_correct
+        logger.info(f"API request: make_guesses - game: {game_id}, guesses: {len(guesses) if isinstance(guesses, list) else None}")
         
-        # Update score and guesses
-        if is_correct:
-            game_state['score'] += 1
-        game_state['guessesRemaining'] -= 1
+        if game_id is None and game_token is None:
+            logger.error("Missing required fields in make_guesses request")
+            return {'error': 'Missing required fields'}, 400
         
-        # Check if game is over
-        if game_state['guessesRemaining'] == 0:
-            game_state['isGameOver'] = True
-            logger.info(f"Game completed - ID: {game_id}, Final Score: {game_state['score']}")
+        moves, error = parse_batch_guesses(guesses)
+        if error is not None:
+            logger.error(f"Rejected guess batch: {error}")
+            return {'error': error}, 400
         
-        # Save the updated game state
-        if not save_game_state(game_id, game_state):
-            logger.error(f"Failed to save updated game state for ID: {game_id}")
-            return jsonify({'error': 'Failed to save game state'}), 500
+        # A stored game is loaded, updated and saved under its lock; a token game has no shared state
+        with (game_states.locked(game_id) if game_token is None else nullcontext()):
+            if game_token is not None:
+                try:
+                    game_state = data_versions.decode_token(game_token)
+                except InvalidGameToken as e:
+                    logger.error(f"Rejected game token: {str(e)}")
+                    return {'error': str(e)}, 400
+            else:
+                game_state = get_game_state(game_id)
+                if game_state is None:
+                    logger.error(f"Game state not found for ID: {game_id}")
+                    return {'error': 'Game not found or corrupted'}, 404
+            
+            # Names resolve against the data version the game was created with
+            moves = [(row, col, canonical_champion_name(champion, game_state.index)) for row, col, champion in moves]
+            if game_token is not None:
+                error = token_guess_error(game_state, moves)
+                if error is not None:
+                    logger.error(f"Rejected guess batch for token game {game_state.game_id}: {error}")
+                    return {'error': error}, 400
+            
+            if len(moves) > game_state.guesses_remaining:
+                logger.error(f"Batch of {len(moves)} guesses exceeds the {game_state.guesses_remaining} remaining in game {game_state.game_id}")
+                return {'error': 'Not enough guesses remaining'}, 400
+            
+            results = []
+            for row, col, champion in moves:
+                is_correct = game_state.guess(row, col, champion)
+                record_guess(game_state, row, col, champion, is_correct)
+                results.append({'row': row, 'col': col, 'guessedChampion': champion, 'isCorrect': is_correct})
+            logger.info(f"Applied {len(results)} guesses to game {game_state.game_id}: {sum(result['isCorrect'] for result in results)} correct")
+            
+            if game_state.is_game_over and moves:
+                finish_game(game_state)
+            
+            if game_token is None and not save_game_state(game_id, game_state):
+                logger.error(f"Failed to save updated game state for ID: {game_id}")
+                return {'error': 'Failed to save game state'}, 500
+            
+            payload = game_state.guesses_delta([(row, col) for row, col, _ in moves]) if compact else game_state.to_dict()
         
-        return jsonify(game_state)
+        payload['results'] = results
+        if game_token is not None:
+            payload['gameToken'] = data_versions.encode_token(game_state)
+        return payload, 200
     except Exception as e:
-        logger.error(f"Error in make_guess: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
+        logger.error(f"Error in make_guesses: {str(e)}")
+        return {'error': 'Internal server error'}, 500
 
-@app.route('/api/valid-champions', methods=['POST'])
-def get_valid_champions():
-    data = request.get_json()
-    row_category = data.get('rowCategory')
-    col_category = data.get('colCategory')
-    
-    logger.info(f"API request: get_valid_champions - row: '{row_category}', col: '{col_category}'")
-    
-    if not row_category or not col_category:
-        logger.error("Missing required fields in get_valid_champions request")
-        return jsonify({'error': 'Missing required fields'}), 400
-    
-    # Get champions that match both categories
-    row_champions = set(get_champions_for_category(CHAMPION_DATA, row_category))
-    col_champions = set(get_champions_for_category(CHAMPION_DATA, col_category))
-    valid_champions = row_champions.intersection(col_champions)
-    
-    logger.info(f"Found {len(valid_champions)} valid champions for categories: '{row_category}' x '{col_category}'")
+@app.route('/api/guesses', methods=['POST'])
+def make_guesses():
+    payload, status = apply_guesses(request.get_json(), wants_compact_format())
+    return jsonify(payload), status
+
+@app.route('/api/guess', methods=['POST'])
+def make_guess():
+    payload, status = apply_guess(request.get_json(), wants_compact_format())
+    return jsonify(payload), status
+
+VALID_CHAMPIONS_CACHE_CONTROL = 'public, max-age=86400'
+
+@lru_cache(maxsize=4096)
+def valid_champions_payload(category_a: str, category_b: str, index_version: str) -> PreencodedPayload:
+    """
+    Pre-serialized /api/valid-champions body and its ETag for a category pair.
+    Callers pass the pair in sorted order so both orderings share one entry; the
+    index version keys out entries built from older champion data.
+    """
+    champion_index = data_versions.index_for(index_version)
+    valid_champions = champion_index.champions_for_mask(champion_index.pair_mask(category_a, category_b))
     
     # Format response with champion icons
     champions = [
         {
             'name': champion,
-            'icon': f"/champion_icons/{urllib.parse.quote(get_champion_id(champion))}"
+            'icon': get_champion_icon_url(champion)
         }
         for champion in valid_champions
     ]
+    return PreencodedPayload({'champions': champions})
+
+def lookup_valid_champions(data) -> Optional[PreencodedPayload]:
+    """Cached valid champions payload for a request, or None if fields are missing."""
+    row_category = data.get('rowCategory')
+    col_category = data.get('colCategory')
     
-    return jsonify({
-        'champions': champions
-    })
+    logger.info(f"API request: get_valid_champions - row: '{row_category}', col: '{col_category}'")
+    
+    if not row_category or not col_category:
+        logger.error("Missing required fields in get_valid_champions request")
+        return None
+    
+    category_a, category_b = sorted((row_category, col_category))
+    snapshot = data_versions.current
+    payload = valid_champions_payload(category_a, category_b, snapshot.version)
+    # Read by scripts/analyze_logs.py; the count is a popcount, so cached responses log it too
+    logger.info(f"Found {snapshot.champion_index.pair_count(row_category, col_category)} valid champions "
+                f"for categories: '{row_category}' x '{col_category}'")
+    return payload
+
+@app.route('/api/valid-champions', methods=['GET', 'POST'])
+def get_valid_champions():
+    payload = lookup_valid_champions(request.get_json() if request.method == 'POST' else request.args)
+    if payload is None:
+        return jsonify({'error': 'Missing required fields'}), 400
+    return payload.response(request, VALID_CHAMPIONS_CACHE_CONTROL)
+
+def admission_stats() -> Dict:
+    """Concurrency, queue depth and shed counts per gated endpoint"""
+    return {'endpoints': admission.stats(), 'gridPool': {'size': len(grid_pool), 'served': grid_pool.served}}
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    return jsonify(admission_stats())
+
+@app.route('/api/categories', methods=['GET'])
+def get_category_catalog():
+    """Category catalog that compact game payloads reference by ID."""
+    logger.info("API request: get_category_catalog")
+    return data_versions.current.catalog_payload.response(request, CATEGORY_CATALOG_CACHE_CONTROL)
 
 @app.route('/api/champions', methods=['GET'])
 def get_champions():
     logger.info("API request: get_champions")
-    return jsonify({
-        'champions': CHAMPION_NAMES
+    return data_versions.current.names_payload.response(request, CHAMPION_NAMES_CACHE_CONTROL)
+
+# Longer queries cannot match a champion name and would only fill the cache
+MAX_AUTOCOMPLETE_QUERY = 64
+
+@lru_cache(maxsize=4096)
+def autocomplete_payload(key: str, limit: int, index_version: str) -> PreencodedPayload:
+    """
+    Encoded suggestions for a normalized query, shared by every spelling of it. Keyed
+    by data version rather than snapshot, so cached entries never keep a superseded
+    snapshot alive; they age out of the LRU instead.
+    """
+    snapshot = data_versions.get(index_version) or data_versions.current
+    return PreencodedPayload({
+        'suggestions': [
+            {'name': name, 'icon': get_champion_icon_url(name)}
+            for name in snapshot.name_index.autocomplete(key, limit)
+        ]
     })
 
+def autocomplete_champions(data: Dict) -> Optional[PreencodedPayload]:
+    """Look up suggestions for the 'q' and optional 'limit' parameters, or None if q is missing"""
+    query = data.get('q')
+    if query is None:
+        return None
+    try:
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        limit = 10
+    return autocomplete_payload(normalize_name(query[:MAX_AUTOCOMPLETE_QUERY]), max(1, min(limit, MAX_SUGGESTIONS)), data_versions.current.version)
+
+@app.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    payload = autocomplete_champions(request.args)
+    if payload is None:
+        return jsonify({'error': 'Missing required fields'}), 400
+    return payload.response(request, AUTOCOMPLETE_CACHE_CONTROL)
+
+def response_cache_lookups() -> List[Tuple[Tuple[str, str], int]]:
+    lookups = []
+    for cache, function in (('valid_champions', valid_champions_payload), ('autocomplete', autocomplete_payload)):
+        info = function.cache_info()
+        lookups.append(((cache, 'hit'), info.hits))
+        lookups.append(((cache, 'miss'), info.misses))
+    return lookups
+
+def admission_samples(key: str) -> List[Tuple[Tuple[str], int]]:
+    return [((endpoint,), stats[key]) for endpoint, stats in admission.stats().items()]
+
+metrics.callback('lolgrid_response_cache_lookups_total', 'Encoded response cache lookups by cache and result',
+                 'counter', response_cache_lookups, ['cache', 'result'])
+metrics.callback('lolgrid_admission_active', 'Gated requests running', 'gauge',
+                 lambda: admission_samples('active'), ['endpoint'])
+metrics.callback('lolgrid_admission_queued', 'Gated requests waiting for a slot', 'gauge',
+                 lambda: admission_samples('queued'), ['endpoint'])
+metrics.callback('lolgrid_admission_shed_total', 'Gated requests refused by admission control', 'counter',
+                 lambda: [((endpoint, reason), stats[key]) for endpoint, stats in admission.stats().items()
+                          for reason, key in (('rate_limited', 'shedRateLimited'), ('overloaded', 'shedOverloaded'))],
+                 ['endpoint', 'reason'])
+metrics.callback('lolgrid_log_records_dropped_total', 'Log records dropped because the log queue was full', 'counter',
+                 lambda: [((), log_pipeline.handler.dropped if log_pipeline is not None else 0)])
+# A SQLite store is the same table in every process, so only the scraping process counts it
+# Counting never waits for pending store writes, so a stuck database cannot block scrapes
+metrics.callback('lolgrid_game_states', 'Games held by the game state store', 'gauge',
+                 lambda: [((), len(game_states))], local=not isinstance(game_states, MemoryGameStore))
+
+def metrics_exposition() -> bytes:
+    """Every metric of this process, merged with the other workers' when LOLGRID_METRICS_DIR is set"""
+    return metrics.exposition()
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics_exposition(), mimetype=METRICS_CONTENT_TYPE)
+
+def debug_traces(args: Dict) -> Tuple[Dict, int]:
+    """A finished trace by 'traceId', or summaries of the latest ones filtered by 'minMs' and 'limit'"""
+    if not tracer.enabled:
+        return {'error': 'Tracing is disabled'}, 404
+    trace_id = args.get('traceId')
+    if trace_id is not None:
+        trace = tracer.get(trace_id)
+        if trace is None:
+            return {'error': 'Trace not found'}, 404
+        return trace, 200
+    try:
+        limit = max(1, int(args.get('limit', 50)))
+        min_ms = float(args.get('minMs', 0))
+    except (TypeError, ValueError):
+        return {'error': 'Invalid limit or minMs'}, 400
+    return {'traces': tracer.recent(limit, min_ms)}, 200
+
+@app.route('/api/debug/traces', methods=['GET'])
+def get_debug_traces():
+    payload, status = debug_traces(request.args)
+    return jsonify(payload), status
+
+def fill_grid_pool(count: int) -> None:
+    """Generate grids so shed requests can be served from the start; concurrent fills share one run"""
+    pool_flight.do('fill', generate_pool_grids, count)
+
+def generate_pool_grids(count: int) -> None:
+    # Generated at the default target; the grids' actual difficulties spread over the pool's buckets
+    generator = data_versions.current.grid_generator.spawn()
+    for _ in range(count):
+        row_categories, col_categories, _, grid_difficulty = generator.generate_valid_grid()
+        grid_pool.add(row_categories, col_categories, grid_difficulty)
+    logger.info(f"Pre-filled grid pool with {len(grid_pool)} grids")
+
+def readiness() -> Tuple[Dict, int]:
+    """Warm-up progress; 503 until it has finished so load balancers hold traffic back"""
+    status = warmup.status()
+    return status, 200 if status['ready'] else 503
+
+@app.route('/ready', methods=['GET'])
+def get_readiness():
+    payload, status = readiness()
+    return jsonify(payload), status
+
+@app.route('/champion_icons/atlas/<filename>')
+def serve_icon_atlas(filename):
+    response = atlas_cache.response(request, filename)
+    if response is None:
+        logger.error(f"Sprite atlas not found: {filename}")
+        return "Atlas not found", 404
+    return response
+
 @app.route('/champion_icons/<path:filename>')
 def serve_champion_icon(filename):
-    # Decode the URL-encoded filename
-    decoded_filename = urllib.parse.unquote(filename)
-    logger.info(f"Requested champion icon for: {decoded_filename}")
-    
-    # Remove .png extension if it exists
-    clean_filename = decoded_filename.replace('.png', '')
-    
-    # Get the champion ID from the mapping
-    champion_id = get_champion_id(clean_filename)
-    
-    # Add .png extension to the champion ID
-    champion_id = champion_id + '.png'
-    
-    # Check if the file exists
-    icon_path = os.path.join(PROJECT_ROOT, 'static', 'champion_icons', champion_id)
-    if not os.path.exists(icon_path):
-        logger.error(f"Champion icon file not found: {icon_path}")
+    # Flask has already URL-decoded the filename; icons are served from memory
+    response = icon_cache.response(request, filename)
+    if response is None:
+        logger.error(f"Champion icon not found: {filename}")
         return "Icon not found", 404
-    
-    logger.info(f"Serving champion icon: {champion_id}")
-    return send_from_directory(os.path.join(PROJECT_ROOT, 'static', 'champion_icons'), champion_id)
+    return response
+
+# Fill every cache the first requests would otherwise fill (see LOLGRID_WARMUP); the
+# grid pool is only pre-filled when LOLGRID_WARMUP_POOL grids are asked for
+warmup = Warmup()
+warmup.add('grid_caches', lambda: data_versions.current.warm(), steps=True)
+warmup.add('daily_challenge', generate_daily_challenge)
+WARMUP_POOL_GRIDS = int(os.environ.get('LOLGRID_WARMUP_POOL', '0'))
+if WARMUP_POOL_GRIDS > 0:
+    warmup.add('grid_pool', lambda: fill_grid_pool(WARMUP_POOL_GRIDS))
+metrics.callback('lolgrid_ready', 'Whether warm-up has finished and the process takes traffic', 'gauge',
+                 lambda: [((), 1 if warmup.ready.is_set() else 0)], local=True)
+run_warmup(warmup)
 
 if __name__ == "__main__":
     app.run(debug=True, port=5001) 
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+ASGI variant of the League of Legends Grid Game API.
+
+Serves the same endpoints as backend/app.py with async handlers. It imports the
+WSGI app module, so both share one game state store, champion index and set of
+caches. Grid generation is CPU-bound and runs in a thread pool, so the event
+loop keeps answering guesses while grids are built. Guesses and /metrics may
+block on the game store (a SQLite commit, a game's lock), so they run in a
+second pool and never stall the event loop or wait behind generation.
+
+Run it with any ASGI server, for example:
+    uvicorn backend.asgi:app --port 5001
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+
+from backend import app as api
+from backend.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend.tracing import TRACE_HEADER
+from backend.serialization import compress_body, dumps_compact
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GENERATION_WORKERS = int(os.environ.get('LOLGRID_GENERATION_WORKERS', '4'))
+generation_executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix='grid-generation')
+STORE_WORKERS = int(os.environ.get('LOLGRID_STORE_WORKERS', '8'))
+store_executor = ThreadPoolExecutor(max_workers=STORE_WORKERS, thread_name_prefix='game-store')
+
+Rendered = Tuple[int, bytes, Dict[str, str]]
+
+
+class Request:
+    """The parts of an ASGI HTTP request the handlers need"""
+    __slots__ = ('method', 'path', 'query', 'headers', 'body')
+
+    def __init__(self, scope: Dict, body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True).items()}
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.body = body
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name)
+
+    def json(self) -> Dict:
+        return json.loads(self.body) if self.body else {}
+
+    @property
+    def compact(self) -> bool:
+        return self.query.get('format') == 'compact'
+
+
+def json_response(request: Request, payload: Dict, status: int = 200) -> Rendered:
+    body = dumps_compact(payload)
+    headers = {'Content-Type': 'application/json'}
+    if 'retryAfter' in payload:
+        headers['Retry-After'] = str(payload['retryAfter'])
+    if status == 200:
+        body, encoding = compress_body(body, request.header('accept-encoding'))
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+            headers['Vary'] = 'Accept-Encoding'
+    return status, body, headers
+
+
+def not_found(message: str) -> Rendered:
+    return 404, message.encode('utf-8'), {'Content-Type': 'text/plain; charset=utf-8'}
+
+
+async def run_in_pool(executor: ThreadPoolExecutor, func, *args):
+    # Run in a copy of the current context so spans join the request's trace
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def run_in_generation_pool(func, *args):
+    return await run_in_pool(generation_executor, func, *args)
+
+
+async def run_in_store_pool(func, *args):
+    return await run_in_pool(store_executor, func, *args)
+
+
+async def ensure_daily_challenge() -> None:
+    """Generate today's challenge off the event loop if it has not been generated yet"""
+    if not api.daily_challenge_is_current():
+        await run_in_generation_pool(api.generate_daily_challenge)
+
+
+async def get_game(request: Request) -> Rendered:
+    payload, status = await run_in_generation_pool(api.new_game, request.query.get('difficulty', 0.5), request.compact)
+    return json_response(request, payload, status)
+
+
+async def make_guess(request: Request) -> Rendered:
+    payload, status = await run_in_store_pool(api.apply_guess, request.json(), request.compact)
+    return json_response(request, payload, status)
+
+
+async def make_guesses(request: Request) -> Rendered:
+    payload, status = await run_in_store_pool(api.apply_guesses, request.json(), request.compact)
+    return json_response(request, payload, status)
+
+
+async def get_daily_challenge(request: Request) -> Rendered:
+    logger.info("API request: get_daily_challenge")
+    await ensure_daily_challenge()
+    status, body, headers = api.generate_daily_challenge()['payload'].render(
+        request.header('accept-encoding'), request.header('if-none-match'), api.daily_cache_control()
+    )
+    headers['Content-Type'] = 'application/json'
+    return status, body, headers
+
+
+async def verify_daily_challenge(request: Request) -> Rendered:
+    await ensure_daily_challenge()
+    payload, status = api.verify_daily_guess(request.json())
+    return json_response(request, payload, status)
+
+
+async def generate_new_grid(request: Request) -> Rendered:
+    payload, status = await run_in_generation_pool(api.generate_grid_categories, request.json())
+    return json_response(request, payload, status)
+
+
+async def get_valid_champions(request: Request) -> Rendered:
+    payload = api.lookup_valid_champions(request.json() if request.method == 'POST' else request.query)
+    if payload is None:
+        return json_response(request, {'error': 'Missing required fields'}, 400)
+    status, body, headers = payload.render(
+        request.header('accept-encoding'), request.header('if-none-match'), api.VALID_CHAMPIONS_CACHE_CONTROL
+    )
+    headers['Content-Type'] = 'application/json'
+    return status, body, headers
+
+
+async def get_admission_stats(request: Request) -> Rendered:
+    return json_response(request, api.admission_stats())
+
+
+async def get_category_catalog(request: Request) -> Rendered:
+    status, body, headers = api.data_versions.current.catalog_payload.render(
+        request.header('accept-encoding'), request.header('if-none-match'), api.CATEGORY_CATALOG_CACHE_CONTROL
+    )
+    headers['Content-Type'] = 'application/json'
+    return status, body, headers
+
+
+async def get_champions(request: Request) -> Rendered:
+    status, body, headers = api.data_versions.current.names_payload.render(
+        request.header('accept-encoding'), request.header('if-none-match'), api.CHAMPION_NAMES_CACHE_CONTROL
+    )
+    headers['Content-Type'] = 'application/json'
+    return status, body, headers
+
+
+async def autocomplete(request: Request) -> Rendered:
+    payload = api.autocomplete_champions(request.query)
+    if payload is None:
+        return json_response(request, {'error': 'Missing required fields'}, 400)
+    status, body, headers = payload.render(
+        request.header('accept-encoding'), request.header('if-none-match'), api.AUTOCOMPLETE_CACHE_CONTROL
+    )
+    headers['Content-Type'] = 'application/json'
+    return status, body, headers
+
+
+async def get_debug_traces(request: Request) -> Rendered:
+    payload, status = api.debug_traces(request.query)
+    return json_response(request, payload, status)
+
+
+async def get_readiness(request: Request) -> Rendered:
+    payload, status = api.readiness()
+    return json_response(request, payload, status)
+
+
+async def get_metrics(request: Request) -> Rendered:
+    # Scrapes count the games in the store, which may have to read SQLite
+    return 200, await run_in_store_pool(api.metrics_exposition), {'Content-Type': METRICS_CONTENT_TYPE}
+
+
+async def serve_icon_atlas(request: Request, filename: str) -> Rendered:
+    rendered = api.atlas_cache.render(filename, request.header('accept-encoding'), request.header('if-none-match'))
+    return rendered or not_found("Atlas not found")
+
+
+async def serve_champion_icon(request: Request, filename: str) -> Rendered:
+    rendered = api.icon_cache.render(filename, request.header('if-none-match'))
+    return rendered or not_found("Icon not found")
+
+
+ROUTES = {
+    ('GET', '/api/game'): get_game,
+    ('POST', '/api/guess'): make_guess,
+    ('POST', '/api/guesses'): make_guesses,
+    ('GET', '/api/daily'): get_daily_challenge,
+    ('POST', '/api/daily/verify'): verify_daily_challenge,
+    ('POST', '/api/generate'): generate_new_grid,
+    ('GET', '/api/valid-champions'): get_valid_champions,
+    ('POST', '/api/valid-champions'): get_valid_champions,
+    ('GET', '/api/admission'): get_admission_stats,
+    ('GET', '/api/categories'): get_category_catalog,
+    ('GET', '/api/champions'): get_champions,
+    ('GET', '/api/autocomplete'): autocomplete,
+    ('GET', '/metrics'): get_metrics,
+    ('GET', '/ready'): get_readiness,
+    ('GET', '/api/debug/traces'): get_debug_traces,
+}
+
+# Routes whose last path segment(s) are passed to the handler, longest prefix first
+PREFIX_ROUTES = [
+    ('/champion_icons/atlas/', serve_icon_atlas),
+    ('/champion_icons/', serve_champion_icon),
+]
+
+# Metric endpoint labels for prefix routes, matching the Flask URL rules
+PREFIX_ENDPOINTS = {
+    '/champion_icons/atlas/': '/champion_icons/atlas/<filename>',
+    '/champion_icons/': '/champion_icons/<path:filename>',
+}
+
+
+def route_handler(request: Request):
+    """The handler of an exact route; HEAD is served by the GET handler and its body dropped"""
+    handler = ROUTES.get((request.method, request.path))
+    if handler is None and request.method == 'HEAD':
+        handler = ROUTES.get(('GET', request.path))
+    return handler
+
+
+def endpoint_label(request: Request) -> str:
+    """The route a request was served by, as the Flask app labels it in metrics"""
+    if route_handler(request) is not None or request.method == 'OPTIONS':
+        return request.path
+    for prefix, _ in PREFIX_ROUTES:
+        if request.path.startswith(prefix):
+            return PREFIX_ENDPOINTS[prefix]
+    return 'unmatched'
+
+
+async def dispatch(request: Request) -> Rendered:
+    if request.method == 'OPTIONS':
+        return 200, b'', {
+            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type, Accept'
+        }
+
+    handler = route_handler(request)
+    if handler is not None:
+        return await handler(request)
+
+    if request.method in ('GET', 'HEAD'):
+        for prefix, prefix_handler in PREFIX_ROUTES:
+            if request.path.startswith(prefix):
+                return await prefix_handler(request, unquote(request.path[len(prefix):]))
+
+    return not_found("Not found")
+
+
+def add_cors_headers(request: Request, headers: Dict[str, str]) -> None:
+    """Mirror the Flask-CORS configuration of the WSGI app"""
+    origin = request.header('origin')
+    if origin in api.CORS_ORIGINS:
+        headers['Access-Control-Allow-Origin'] = origin
+        headers['Access-Control-Allow-Credentials'] = 'true'
+        headers['Access-Control-Expose-Headers'] = 'Content-Type, Access-Control-Allow-Origin'
+        headers['Vary'] = f"{headers['Vary']}, Origin" if 'Vary' in headers else 'Origin'
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            generation_executor.shutdown(wait=False)
+            store_executor.shutdown(wait=False)
+            api.game_states.close()
+            api.metrics.close()
+            api.event_journal.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    request = Request(scope, await read_body(receive))
+    started = time.perf_counter()
+    trace_scope = api.tracer.start_trace(f"{request.method} {request.path}", request.header(TRACE_HEADER.lower())) if api.tracer.enabled else None
+    try:
+        status, body, headers = await dispatch(request)
+    except ValueError as e:
+        # Malformed JSON bodies
+        logger.error(f"Bad request to {request.path}: {str(e)}")
+        status, body, headers = json_response(request, {'error': 'Invalid request body'}, 400)
+    except Exception as e:
+        logger.error(f"Error handling {request.method} {request.path}: {str(e)}")
+        status, body, headers = json_response(request, {'error': 'Internal server error'}, 500)
+
+    if trace_scope is not None:
+        api.tracer.finish_trace(trace_scope, status=status)
+        headers['X-Trace-Id'] = trace_scope.span.trace.trace_id
+    add_cors_headers(request, headers)
+    # HEAD reports the length of the body a GET would have sent
+    headers['Content-Length'] = str(len(body))
+    if request.method == 'HEAD':
+        body = b''
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    api.record_request(endpoint_label(request), request.method, status, time.perf_counter() - started)
@@ -6,6 +6,8 @@ Each category type contains a list of specific categories that can be used in th
 from typing import List, Dict
 import logging
 
+from backend.tracing import annotate, traced
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -249,12 +251,16 @@ def get_category_type(category):
             return type_name
     return None
 
+@traced('get_champions_for_category')
 def get_champions_for_category(champions_data: Dict, category: str) -> List[str]:
     """Get all champions that match a given category"""
     matching_champions = []
     category_type = get_category_type(category)
+    # Checked once so the loop below never builds messages that would be dropped
+    debug = logger.isEnabledFor(logging.DEBUG)
     
-    logger.debug(f"Finding champions for category: '{category}' (type: {category_type})")
+    if debug:
+        logger.debug(f"Finding champions for category: '{category}' (type: {category_type})")
     
     for champion in champions_data:
         matches = False
@@ -408,12 +414,16 @@ def get_champions_for_category(champions_data: Dict, category: str) -> List[str]
         
         if matches:
             matching_champions.append(champion["name"])
-            logger.debug(f"Champion '{champion['name']}' matches category '{category}'")
+            if debug:
+                logger.debug(f"Champion '{champion['name']}' matches category '{category}'")
     
+    # Read by scripts/analyze_logs.py; scans are cached, so this is logged once per category and data version
     logger.info(f"Found {len(matching_champions)} champions matching category '{category}'")
-    if matching_champions:
-        logger.debug(f"Matching champions: {', '.join(matching_champions)}")
+    if debug:
+        if matching_champions:
+            logger.debug(f"Matching champions: {', '.join(matching_champions)}")
     
+    annotate(category=category, matches=len(matching_champions))
     return matching_champions
 
 def validate_categories(champions_data):
@@ -0,0 +1,152 @@
+"""
+Shared access to the champion data for the backend and the scripts.
+
+Parsing data/champions.json and deriving the champion index, the name index and
+the per-category difficulties is the bulk of every cold start. The results are
+saved together in one binary snapshot file, keyed by a hash of the data files and
+the category definitions, and every later start is a single load of that file. The
+snapshot is rebuilt as soon as any of its inputs changes.
+
+The snapshot is a pickle: only load files this code wrote. Set
+LOLGRID_DATA_SNAPSHOT to another path, or to 'off' to always parse the JSON.
+"""
+
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+
+from backend.champion_index import ChampionIndex
+from backend.name_index import ChampionNameIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAMPIONS_PATH = os.path.join(PROJECT_ROOT, 'data', 'champions.json')
+ICONS_PATH = os.path.join(PROJECT_ROOT, 'data', 'champion_icons.json')
+CATEGORIES_PATH = os.path.join(PROJECT_ROOT, 'backend', 'categories.py')
+DEFAULT_SNAPSHOT_PATH = os.path.join(PROJECT_ROOT, 'data', 'champion_data.snapshot')
+
+# Bump when anything stored in the snapshot changes shape
+SNAPSHOT_FORMAT = 1
+
+# Category definitions are code, so a running process keeps the ones it imported;
+# the key uses them as imported, not as currently on disk
+with open(CATEGORIES_PATH, 'rb') as f:
+    CATEGORIES_SOURCE = f.read()
+
+
+class ChampionData:
+    """The parsed champion data file and the structures derived from it"""
+
+    def __init__(self, document: Dict, champion_icons: Dict[str, str], key: str):
+        start = time.perf_counter()
+        self.key = key
+        self.document = document
+        self.champion_icons = champion_icons
+        self.champions = document["champions"]
+        self.champion_names = sorted(champion["name"] for champion in self.champions)
+        self.champion_index = ChampionIndex(self.champions)
+        self.name_index = ChampionNameIndex(self.champion_names, champion_icons)
+
+        # Imported here because the grid generator loads its data through this module
+        from backend.grid_generator import GridGenerator
+        generator = GridGenerator(self.champions)
+        for category in self.champion_index.categories:
+            generator.calculate_category_difficulty(category)
+        self.category_difficulties = generator.category_difficulty_cache
+
+        logger.info(f"Built champion data {key} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def read_inputs() -> Dict[str, bytes]:
+    """Raw contents of every file the champion data is derived from"""
+    inputs = {CATEGORIES_PATH: CATEGORIES_SOURCE}
+    for path in (CHAMPIONS_PATH, ICONS_PATH):
+        with open(path, 'rb') as f:
+            inputs[path] = f.read()
+    return inputs
+
+
+def content_key(inputs: Dict[str, bytes]) -> str:
+    digest = hashlib.sha256(str(SNAPSHOT_FORMAT).encode('ascii'))
+    for path in (CHAMPIONS_PATH, ICONS_PATH, CATEGORIES_PATH):
+        digest.update(hashlib.sha256(inputs[path]).digest())
+    return digest.hexdigest()[:16]
+
+
+def read_snapshot(path: str, key: str) -> Optional[ChampionData]:
+    """The snapshot at path if it was built from the same inputs, else None"""
+    try:
+        with open(path, 'rb') as f:
+            stored_key, data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable champion data snapshot {path}: {str(e)}")
+        return None
+    if stored_key != key:
+        return None
+    return data
+
+
+def write_snapshot(path: str, data: ChampionData) -> None:
+    """Write a snapshot, replacing any existing file atomically"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((data.key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write champion data snapshot {path}: {str(e)}")
+        return
+    logger.info(f"Wrote champion data snapshot {data.key} to {path}")
+
+
+def snapshot_path() -> Optional[str]:
+    path = os.environ.get('LOLGRID_DATA_SNAPSHOT', DEFAULT_SNAPSHOT_PATH)
+    return None if path.lower() in ('', 'off', '0') else path
+
+
+def load_champion_data() -> ChampionData:
+    """Champion data from the snapshot when it is current, otherwise parsed, derived and snapshotted"""
+    start = time.perf_counter()
+    inputs = read_inputs()
+    key = content_key(inputs)
+    path = snapshot_path()
+
+    data = read_snapshot(path, key) if path is not None else None
+    if data is not None:
+        logger.info(f"Loaded champion data {key} from snapshot in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return data
+
+    data = ChampionData(json.loads(inputs[CHAMPIONS_PATH]), json.loads(inputs[ICONS_PATH]), key)
+    if path is not None:
+        write_snapshot(path, data)
+    return data
+
+
+# Loaded once per process for the helpers below; hot reloads call load_champion_data()
+_process_data: Optional[ChampionData] = None
+
+
+def process_champion_data() -> ChampionData:
+    """The champion data as first loaded by this process"""
+    global _process_data
+    if _process_data is None:
+        _process_data = load_champion_data()
+    return _process_data
+
+
+def load_champions_document() -> Dict:
+    """The whole champions.json document, for scripts that edit and save it"""
+    return process_champion_data().document
+
+
+def load_champions_data() -> List[Dict]:
+    """The champion records"""
+    return process_champion_data().champions
@@ -0,0 +1,93 @@
+"""
+Bitset index over champions and categories.
+
+Champions and categories get stable integer IDs, and each category is stored as an
+int bitmask of matching champion IDs, so a cell answer is a single AND of two masks.
+"""
+
+from typing import Dict, List
+import hashlib
+import logging
+
+from backend.categories import CATEGORY_TYPES, get_all_categories, get_category_type, get_champions_for_category
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ChampionIndex:
+    """Champion/category ID tables with per-category champion bitmasks"""
+
+    def __init__(self, champions_data: List[Dict]):
+        # Champion IDs follow the data file order, so decoded masks list champions
+        # in the same order as get_champions_for_category
+        self.champion_names = [champion["name"] for champion in champions_data]
+        self.champion_ids = {name: i for i, name in enumerate(self.champion_names)}
+
+        # Categories that appear under several types (e.g. "Support") get one ID
+        self.categories = list(dict.fromkeys(get_all_categories()))
+        self.category_ids = {category: i for i, category in enumerate(self.categories)}
+
+        self.category_masks = []
+        for category in self.categories:
+            mask = 0
+            for name in get_champions_for_category(champions_data, category):
+                mask |= 1 << self.champion_ids[name]
+            self.category_masks.append(mask)
+
+        # The version identifies the data an ID or mask refers to
+        digest = hashlib.sha256()
+        digest.update("\n".join(self.champion_names).encode("utf-8"))
+        digest.update("\n".join(self.categories).encode("utf-8"))
+        for mask in self.category_masks:
+            digest.update(mask.to_bytes((len(self.champion_names) + 7) // 8, "little"))
+        self.version = digest.hexdigest()[:16]
+
+        logger.info(f"Built champion index {self.version} with {len(self.champion_names)} champions and {len(self.categories)} categories")
+
+    def category_catalog(self) -> Dict:
+        """Category ID catalog that compact game payloads refer to"""
+        return {
+            'version': self.version,
+            'categories': [
+                {'id': i, 'name': category, 'type': get_category_type(category)}
+                for i, category in enumerate(self.categories)
+            ],
+            'types': {
+                type_name: {
+                    'name': type_data['name'],
+                    'description': type_data['description'],
+                    'categoryIds': [self.category_ids[category] for category in type_data['categories']]
+                }
+                for type_name, type_data in CATEGORY_TYPES.items()
+            }
+        }
+
+    def category_mask(self, category: str) -> int:
+        """Return the bitmask of champions matching a category (0 if unknown)"""
+        category_id = self.category_ids.get(category)
+        return self.category_masks[category_id] if category_id is not None else 0
+
+    def pair_mask(self, category1: str, category2: str) -> int:
+        """Return the bitmask of champions matching both categories"""
+        return self.category_mask(category1) & self.category_mask(category2)
+
+    def pair_count(self, category1: str, category2: str) -> int:
+        """Return the number of champions matching both categories"""
+        return self.pair_mask(category1, category2).bit_count()
+
+    def champions_for_mask(self, mask: int) -> List[str]:
+        """Decode a champion bitmask into champion names"""
+        names = []
+        while mask:
+            low_bit = mask & -mask
+            names.append(self.champion_names[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return names
+
+    def matches(self, champion: str, category1: str, category2: str) -> bool:
+        """Check whether a champion is a valid answer for a category pair"""
+        champion_id = self.champion_ids.get(champion)
+        if champion_id is None:
+            return False
+        return bool(self.pair_mask(category1, category2) >> champion_id & 1)
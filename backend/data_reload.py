@@ -0,0 +1,211 @@
+"""
+Hot reload of the champion data.
+
+Everything derived from data/champions.json and data/champion_icons.json (the
+champion records and names, the name index, the champion index with its category
+masks and pair counts, the grid generator and the category catalog) is bundled in
+a DataSnapshot that is never modified once published. A watcher thread polls the
+data files and, when they change, builds and warms a new snapshot in the
+background, then publishes it by replacing a single reference. Requests read
+`current` once and use that snapshot throughout, so they never wait for a rebuild
+or see two versions mixed.
+
+Games hold the champion index they were created with, and the most recent
+snapshots stay reachable by version, so stored games and game tokens keep
+resolving against the data they were created from until their version ages out.
+
+Category definitions are Python code in backend/categories.py; other modules bind
+them at import, so they cannot be swapped in place. The watcher logs a warning
+when that file changes; only a full restart picks it up. A prefork SIGHUP does not,
+as its new workers fork from a master that already imported the old definitions.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from backend.champion_data import CATEGORIES_PATH, CHAMPIONS_PATH, ICONS_PATH, ChampionData, load_champion_data
+from backend.game_state import GameState
+from backend.game_tokens import GameTokenCodec, token_index_version
+from backend.grid_generator import GridGenerator
+from backend.metrics import registry as metrics
+from backend.serialization import PreencodedPayload
+from backend.shared_index import share_champion_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DATA_RELOADS = metrics.counter('lolgrid_data_reloads_total', 'Champion data reloads by result', ['result'])
+
+FileStamp = Optional[Tuple[int, int]]
+
+
+def file_stamp(path: str) -> FileStamp:
+    """Modification time and size of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DataSnapshot:
+    """One version of the champion data and every structure derived from it"""
+
+    def __init__(self, data: ChampionData, token_secret: bytes):
+        self.champions_data = data.champions
+        self.champion_icons = data.champion_icons
+        self.champion_names = data.champion_names
+        self.names_payload = PreencodedPayload({'champions': self.champion_names})
+
+        # Normalized names, aliases and icon IDs for guess checks, icons and autocomplete
+        self.name_index = data.name_index
+        self.grid_generator = GridGenerator(data.champions)
+        self.grid_generator.category_difficulty_cache.update(data.category_difficulties)
+
+        # Bitset index shared by every worker built from the same data; memory-mapped
+        # from LOLGRID_SHARED_INDEX when set, so all workers on a machine share one copy
+        self.champion_index = share_champion_index(data.champion_index)
+        self.version = self.champion_index.version
+        self.token_codec = GameTokenCodec(self.champion_index, token_secret)
+
+        # The category catalog only changes with the champion data, which its version reflects
+        self.catalog_payload = PreencodedPayload(self.champion_index.category_catalog(), etag=self.version)
+
+    @classmethod
+    def load(cls, token_secret: bytes) -> 'DataSnapshot':
+        data = load_champion_data()
+        logger.info(f"Loaded {len(data.champions)} champions and {len(data.champion_icons)} champion icons")
+        return cls(data, token_secret)
+
+    def warm(self) -> Dict[str, float]:
+        """Fill the grid generator's caches, which grid generation otherwise fills on first use"""
+        return self.grid_generator.warm_up()
+
+
+class DataVersions:
+    """The current data snapshot, the recent ones by version, and the watcher replacing them"""
+
+    def __init__(self, token_secret: bytes, keep: int = 4, interval: float = 2.0, watch: bool = False):
+        self.token_secret = token_secret
+        self.keep = max(1, keep)
+        self.interval = interval
+        self.listeners: List[Callable[[DataSnapshot], None]] = []
+        self.reload_lock = threading.Lock()
+        self.snapshots = OrderedDict()  # version -> snapshot, oldest first; replaced, never mutated
+        self._stamps = self.file_stamps()
+        self.current = DataSnapshot.load(token_secret)
+        self._publish(self.current)
+        self._watcher = None
+        if watch:
+            self._start_watcher()
+            # Forked workers inherit the snapshots but not the thread, and the lock
+            # may have been held by a reload in progress at the fork
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def file_stamps(self) -> Dict[str, FileStamp]:
+        return {path: file_stamp(path) for path in (CHAMPIONS_PATH, ICONS_PATH, CATEGORIES_PATH)}
+
+    def get(self, version: Optional[str]) -> Optional[DataSnapshot]:
+        """The retained snapshot for a champion index version, or None"""
+        return self.snapshots.get(version)
+
+    def index_for(self, version: str):
+        """
+        Champion index for a stored game's version. Unknown versions get the current
+        index, which GameState.from_record then rejects with a clear error.
+        """
+        snapshot = self.get(version)
+        return (snapshot or self.current).champion_index
+
+    def encode_token(self, game_state: GameState) -> str:
+        """Sign a token game against the data version it was created with"""
+        snapshot = self.get(game_state.index.version)
+        codec = snapshot.token_codec if snapshot is not None else GameTokenCodec(game_state.index, self.token_secret)
+        return codec.encode(game_state)
+
+    def decode_token(self, token: str) -> GameState:
+        """Verify and decode a token with the codec of the data version it was issued for"""
+        snapshot = self.get(token_index_version(token))
+        # The current codec reports malformed tokens and versions no longer retained
+        return (snapshot or self.current).token_codec.decode(token)
+
+    def _publish(self, snapshot: DataSnapshot) -> None:
+        # Copy, update and swap, so readers never see the mapping mid-update
+        snapshots = OrderedDict(self.snapshots)
+        snapshots.pop(snapshot.version, None)
+        snapshots[snapshot.version] = snapshot
+        while len(snapshots) > self.keep:
+            snapshots.popitem(last=False)
+        self.snapshots = snapshots
+        self.current = snapshot
+        for listener in self.listeners:
+            listener(snapshot)
+
+    def reload(self) -> bool:
+        """Rebuild from the data files and publish the result; on any error the current snapshot stays"""
+        with self.reload_lock:
+            stamps = self.file_stamps()
+            previous = self.current
+            start = time.perf_counter()
+            try:
+                snapshot = DataSnapshot.load(self.token_secret)
+                snapshot.warm()
+            except Exception as e:
+                # Not retried until the files change again, e.g. once a partial write completes
+                self._stamps = stamps
+                DATA_RELOADS.labels(result='error').inc()
+                logger.error(f"Error reloading champion data, keeping version {previous.version}: {str(e)}")
+                return False
+            self._stamps = stamps
+            self._publish(snapshot)
+            DATA_RELOADS.labels(result='ok').inc()
+            logger.info(f"Reloaded champion data {previous.version} -> {snapshot.version} "
+                        f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return True
+
+    def check(self) -> bool:
+        """Reload if the data files changed since the last load; returns whether a new snapshot was published"""
+        stamps = self.file_stamps()
+        if stamps == self._stamps:
+            return False
+        if stamps[CATEGORIES_PATH] != self._stamps[CATEGORIES_PATH]:
+            logger.warning(f"{CATEGORIES_PATH} changed; restart the server (a prefork SIGHUP is not enough) to load the new category definitions")
+        if all(stamps[path] == self._stamps[path] for path in (CHAMPIONS_PATH, ICONS_PATH)):
+            self._stamps = stamps
+            return False
+        return self.reload()
+
+    def _start_watcher(self) -> None:
+        self._watcher = threading.Thread(target=self._watch, name="data-reload", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching champion data files for changes every {self.interval:g} s")
+
+    def _after_fork(self) -> None:
+        self.reload_lock = threading.Lock()
+        self._start_watcher()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking champion data files: {str(e)}")
+
+
+def data_versions_from_env(token_secret: bytes) -> DataVersions:
+    """
+    Load the champion data. LOLGRID_DATA_RELOAD=1 watches the data files and reloads
+    them on change, polling every LOLGRID_DATA_RELOAD_INTERVAL seconds (default 2);
+    LOLGRID_DATA_VERSIONS data versions are kept for games still in play (default 4).
+    """
+    return DataVersions(
+        token_secret,
+        keep=int(os.environ.get('LOLGRID_DATA_VERSIONS', '4')),
+        interval=float(os.environ.get('LOLGRID_DATA_RELOAD_INTERVAL', '2')),
+        watch=os.environ.get('LOLGRID_DATA_RELOAD', '0') == '1',
+    )
@@ -0,0 +1,141 @@
+"""
+Append-only journal of game events.
+
+Every game created, guess, daily challenge and daily verification is recorded as
+one JSON object per line, so games can be reconstructed and analyzed exactly
+(see scripts/analyze_events.py) instead of being pieced together from log
+messages. Events are queued by request threads and written in batches by a
+background thread. Each batch is a single append, so several worker processes can
+share one journal file without interleaving lines; only a short write, which the
+writer finishes with a second append, can let another process's batch in. The file is never rotated;
+rotate it externally (e.g. copytruncate) if it is kept on for long.
+
+Event fields:
+- game: ts, game, rows, cols, difficulty, stateless
+- guess: ts, game, row, col, champion, correct, score, remaining
+- daily: ts, date, rows, cols
+- verify: ts, date, row, col, champion, correct
+"""
+
+from typing import Dict, List, Optional
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from backend.serialization import dumps_compact
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JOURNAL_PATH = os.path.join(PROJECT_ROOT, 'logs', 'events.jsonl')
+
+
+class EventJournal:
+    """Batched, append-only JSONL event writer"""
+
+    def __init__(self, path: str, flush_interval: float = 0.2, batch_size: int = 1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._start()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        # Also run in forked children, which inherit neither the thread nor a usable queue
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="event-journal", daemon=True)
+        self._writer.start()
+
+    def record(self, event_type: str, **fields) -> None:
+        """Queue an event; never blocks on disk"""
+        if self._closed:
+            return
+        fields['t'] = event_type
+        fields['ts'] = round(time.time(), 3)
+        self._queue.put(fields)
+
+    def _take_batch(self) -> Optional[List[Dict]]:
+        """Wait for events and return up to batch_size of them, or None once closed"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is None:
+                # Close requested: write what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(event)
+        return batch
+
+    def _write(self, batch: List[Dict]) -> None:
+        data = b''.join(dumps_compact(event) + b'\n' for event in batch)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # One O_APPEND write keeps the batch whole between processes; a short
+            # write (a full disk, a signal) is finished with further writes
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        self.written += len(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            except OSError as e:
+                logger.error(f"Error writing {len(batch)} events to {self.path}: {str(e)}")
+
+    def close(self) -> None:
+        """Write queued events and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+
+class NullJournal:
+    """Journal used when event journaling is disabled"""
+
+    def record(self, event_type: str, **fields) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def journal_from_env():
+    """
+    Journal at the path in LOLGRID_EVENT_JOURNAL, flushed every LOLGRID_EVENT_FLUSH_MS
+    milliseconds (default 200). Journaling is off unless a path is set; '1' selects
+    logs/events.jsonl in the project.
+    """
+    path = os.environ.get('LOLGRID_EVENT_JOURNAL', '')
+    if path.lower() in ('', 'off', '0'):
+        return NullJournal()
+    if path == '1':
+        path = DEFAULT_JOURNAL_PATH
+    logger.info(f"Recording game events to {path}")
+    return EventJournal(path, flush_interval=float(os.environ.get('LOLGRID_EVENT_FLUSH_MS', '200')) / 1000)
@@ -0,0 +1,197 @@
+"""
+Typed game state model for the League of Legends Grid Game.
+
+Game states are valid by construction: cells refer to categories and champions by
+their champion index IDs and hold each cell's answers as a champion bitmask, so a
+guess check is a single bit test. The JSON shape the frontend expects is only
+built at the response boundary by GameState.to_dict.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+
+from backend.categories import CATEGORY_TYPES, get_category_type
+from backend.champion_index import ChampionIndex
+
+RECORD_FORMAT = 1
+
+
+@lru_cache(maxsize=None)
+def _category_values(category: str) -> tuple:
+    """All categories of the same type as the given category"""
+    return tuple(CATEGORY_TYPES[get_category_type(category)]["categories"])
+
+
+class Cell:
+    """A single grid cell: its category pair, answer bitmask and guess"""
+    __slots__ = ('row_category', 'col_category', 'answer_mask', 'guess', 'is_correct')
+
+    def __init__(self, row_category: int, col_category: int, answer_mask: int,
+                 guess: Union[int, str, None] = None, is_correct: Optional[bool] = None):
+        self.row_category = row_category    # Category ID
+        self.col_category = col_category    # Category ID
+        self.answer_mask = answer_mask      # Bitmask of correct champion IDs
+        self.guess = guess                  # Champion ID, raw text for unknown names, or None
+        self.is_correct = is_correct
+
+
+class GameState:
+    """A game in progress on a 3x3 grid"""
+    __slots__ = ('index', 'game_id', 'cells', 'guesses_remaining', 'difficulty')
+
+    def __init__(self, index: ChampionIndex, game_id: str, row_categories: List[str],
+                 col_categories: List[str], difficulty: float = 0.0):
+        if len(row_categories) != 3 or len(col_categories) != 3:
+            raise ValueError("A grid needs exactly 3 row and 3 column categories")
+        row_ids = [index.category_ids[category] for category in row_categories]
+        col_ids = [index.category_ids[category] for category in col_categories]
+
+        self.index = index
+        self.game_id = game_id
+        self.cells = [
+            Cell(row_id, col_id, index.category_masks[row_id] & index.category_masks[col_id])
+            for row_id in row_ids for col_id in col_ids
+        ]
+        self.guesses_remaining = 9
+        self.difficulty = difficulty
+
+    @property
+    def score(self) -> int:
+        """Number of cells guessed correctly"""
+        return sum(1 for cell in self.cells if cell.is_correct)
+
+    @property
+    def is_game_over(self) -> bool:
+        return self.guesses_remaining <= 0
+
+    @property
+    def row_categories(self) -> List[str]:
+        return [self.index.categories[self.cells[i * 3].row_category] for i in range(3)]
+
+    @property
+    def col_categories(self) -> List[str]:
+        return [self.index.categories[self.cells[j].col_category] for j in range(3)]
+
+    def cell(self, row: int, col: int) -> Cell:
+        if not (0 <= row < 3 and 0 <= col < 3):
+            raise IndexError(f"Invalid cell coordinates: row={row}, col={col}")
+        return self.cells[row * 3 + col]
+
+    def guess(self, row: int, col: int, champion: str) -> bool:
+        """Record a guess for a cell and return whether it was correct"""
+        if not isinstance(champion, str):
+            # Integer guesses are champion IDs internally, so raw input must be text
+            raise TypeError(f"Champion guess must be a string, not {type(champion).__name__}")
+        cell = self.cell(row, col)
+        champion_id = self.index.champion_ids.get(champion)
+        is_correct = champion_id is not None and bool(cell.answer_mask >> champion_id & 1)
+        cell.guess = champion_id if champion_id is not None else champion
+        cell.is_correct = is_correct
+        self.guesses_remaining -= 1
+        return is_correct
+
+    def guessed_name(self, cell: Cell) -> Optional[str]:
+        if isinstance(cell.guess, int):
+            return self.index.champion_names[cell.guess]
+        return cell.guess
+
+    def cell_to_dict(self, cell: Cell) -> Dict:
+        return {
+            'xCategory': self.index.categories[cell.col_category],
+            'yCategory': self.index.categories[cell.row_category],
+            'correctChampions': self.index.champions_for_mask(cell.answer_mask),
+            'guessedChampion': self.guessed_name(cell),
+            'isCorrect': cell.is_correct
+        }
+
+    def to_dict(self) -> Dict:
+        """Serialize to the game state JSON shape returned by the API"""
+        return {
+            'grid': [[self.cell_to_dict(self.cells[i * 3 + j]) for j in range(3)] for i in range(3)],
+            'categories': {
+                'xAxis': [{'name': cat, 'values': list(_category_values(cat))} for cat in self.col_categories],
+                'yAxis': [{'name': cat, 'values': list(_category_values(cat))} for cat in self.row_categories]
+            },
+            'guessesRemaining': self.guesses_remaining,
+            'isGameOver': self.is_game_over,
+            'score': self.score,
+            'difficulty': self.difficulty,
+            'gameId': self.game_id
+        }
+
+    def to_compact_dict(self) -> Dict:
+        """
+        Serialize to the compact wire format: categories are category catalog IDs
+        and cell answers are never sent to the client
+        """
+        return {
+            'gameId': self.game_id,
+            'catalogVersion': self.index.version,
+            'rows': [cell.row_category for cell in self.cells[::3]],
+            'cols': [cell.col_category for cell in self.cells[:3]],
+            'guesses': [self.guessed_name(cell) for cell in self.cells],
+            'correct': [cell.is_correct for cell in self.cells],
+            'guessesRemaining': self.guesses_remaining,
+            'isGameOver': self.is_game_over,
+            'score': self.score,
+            'difficulty': self.difficulty
+        }
+
+    def cell_delta(self, row: int, col: int) -> Dict:
+        cell = self.cell(row, col)
+        return {'row': row, 'col': col, 'guessedChampion': self.guessed_name(cell), 'isCorrect': cell.is_correct}
+
+    def guess_delta(self, row: int, col: int) -> Dict:
+        """The part of the compact state changed by a guess on one cell"""
+        return {
+            'gameId': self.game_id,
+            'cell': self.cell_delta(row, col),
+            'guessesRemaining': self.guesses_remaining,
+            'isGameOver': self.is_game_over,
+            'score': self.score
+        }
+
+    def guesses_delta(self, positions: List[Tuple[int, int]]) -> Dict:
+        """The part of the compact state changed by guesses on several cells, each cell listed once"""
+        return {
+            'gameId': self.game_id,
+            'cells': [self.cell_delta(row, col) for row, col in dict.fromkeys(positions)],
+            'guessesRemaining': self.guesses_remaining,
+            'isGameOver': self.is_game_over,
+            'score': self.score
+        }
+
+    def to_record(self) -> list:
+        """Compact, JSON-serializable form used by the persistent game store"""
+        return [
+            RECORD_FORMAT,
+            self.index.version,
+            self.game_id,
+            [cell.row_category for cell in self.cells[::3]],
+            [cell.col_category for cell in self.cells[:3]],
+            [cell.guess for cell in self.cells],
+            [cell.is_correct for cell in self.cells],
+            self.guesses_remaining,
+            self.difficulty
+        ]
+
+    @classmethod
+    def from_record(cls, record: list, index: ChampionIndex) -> 'GameState':
+        """Rebuild a game state from to_record output"""
+        record_format, index_version, game_id, row_ids, col_ids, guesses, correct, guesses_remaining, difficulty = record
+        if record_format != RECORD_FORMAT:
+            raise ValueError(f"Unsupported game state record format: {record_format}")
+        if index_version != index.version:
+            raise ValueError(f"Game state was saved with champion index {index_version}, not {index.version}")
+
+        game_state = cls(
+            index, game_id,
+            [index.categories[i] for i in row_ids],
+            [index.categories[i] for i in col_ids],
+            difficulty
+        )
+        for cell, guess, is_correct in zip(game_state.cells, guesses, correct):
+            cell.guess = guess
+            cell.is_correct = is_correct
+        game_state.guesses_remaining = guesses_remaining
+        return game_state
@@ -0,0 +1,429 @@
+"""
+Game state storage backends for the League of Legends Grid Game.
+
+The app talks to a store through a small dict-like interface so the in-memory
+backend and the persistent SQLite backend are interchangeable. Stores hold
+GameState objects; the SQLite backend persists their compact records.
+"""
+
+from typing import Callable, ContextManager, Dict, Iterator, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+
+from backend.game_state import GameState
+from backend.metrics import registry as metrics
+
+# Get the project root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'game_states.db')
+DEFAULT_SHARDS = 16
+DEFAULT_FLUSH_TIMEOUT = 10.0
+
+SHARD_LOCKS = metrics.counter('lolgrid_game_store_lock_acquisitions_total',
+                              'Game store shard lock acquisitions by shard and whether they had to wait',
+                              ['shard', 'result'])
+SHARD_LOCK_WAIT = metrics.counter('lolgrid_game_store_lock_wait_seconds_total',
+                                  'Time spent waiting for contended game store shard locks', ['shard'])
+
+
+def encode_game_state(game_state: GameState) -> bytes:
+    """Encode a game state record as zlib-compressed compact JSON."""
+    payload = json.dumps(game_state.to_record(), separators=(',', ':'), ensure_ascii=False)
+    return zlib.compress(payload.encode('utf-8'), 1)
+
+
+def decode_game_record(blob: bytes) -> list:
+    """Decode the game state record produced by encode_game_state."""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class LockStripes:
+    """
+    A fixed set of locks, picked by hashing the game ID. Games on different
+    stripes never wait for each other, and acquisitions that found their lock
+    held are counted per stripe. The locks are reentrant, so a store method can
+    run inside a caller's locked() block for the same game.
+    """
+
+    def __init__(self, count: int = DEFAULT_SHARDS):
+        self.count = max(1, count)
+        self.locks = [threading.RLock() for _ in range(self.count)]
+        self.uncontended = [SHARD_LOCKS.labels(shard=str(i), result='uncontended') for i in range(self.count)]
+        self.contended = [SHARD_LOCKS.labels(shard=str(i), result='contended') for i in range(self.count)]
+        self.wait_seconds = [SHARD_LOCK_WAIT.labels(shard=str(i)) for i in range(self.count)]
+
+    def shard(self, game_id: str) -> int:
+        # crc32 rather than hash() so a game maps to the same shard in every worker
+        return zlib.crc32(str(game_id).encode('utf-8')) % self.count
+
+    @contextmanager
+    def hold(self, shard: int) -> Iterator[None]:
+        lock = self.locks[shard]
+        if lock.acquire(blocking=False):
+            self.uncontended[shard].inc()
+        else:
+            start = time.perf_counter()
+            lock.acquire()
+            self.contended[shard].inc()
+            self.wait_seconds[shard].inc(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def after_fork(self) -> None:
+        # A lock held by another thread at the fork would never be released in the child
+        self.locks = [threading.RLock() for _ in range(self.count)]
+
+
+class GameStateStore:
+    """Base class for game state stores, exposing a minimal mapping interface."""
+
+    def get(self, game_id: str) -> Optional[GameState]:
+        raise NotImplementedError
+
+    def set(self, game_id: str, game_state: GameState) -> None:
+        raise NotImplementedError
+
+    def delete(self, game_id: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> bool:
+        """Wait up to timeout seconds for writes made before the call to be durable; returns whether they are."""
+        return True
+
+    def close(self) -> None:
+        """Flush pending writes and release resources."""
+
+    def after_fork(self) -> None:
+        """Reset per-process resources in a freshly forked worker."""
+
+    def locked(self, game_id: str) -> ContextManager[None]:
+        """
+        Hold a game's lock, so a get, change and set of the game is not interleaved
+        with another request's. Other games on other shards proceed in parallel.
+        """
+        return self.stripes.hold(self.stripes.shard(game_id))
+
+    def __contains__(self, game_id: str) -> bool:
+        return self.get(game_id) is not None
+
+    def __getitem__(self, game_id: str) -> GameState:
+        game_state = self.get(game_id)
+        if game_state is None:
+            raise KeyError(game_id)
+        return game_state
+
+    def __setitem__(self, game_id: str, game_state: GameState) -> None:
+        self.set(game_id, game_state)
+
+    def __delitem__(self, game_id: str) -> None:
+        self.delete(game_id)
+
+
+class MemoryGameStore(GameStateStore):
+    """Process-local store split into shards, each a plain dict behind its own lock."""
+
+    def __init__(self, shards: int = DEFAULT_SHARDS):
+        self.stripes = LockStripes(shards)
+        self._shards = [{} for _ in range(self.stripes.count)]
+
+    def get(self, game_id: str) -> Optional[GameState]:
+        shard = self.stripes.shard(game_id)
+        with self.stripes.hold(shard):
+            return self._shards[shard].get(game_id)
+
+    def set(self, game_id: str, game_state: GameState) -> None:
+        shard = self.stripes.shard(game_id)
+        with self.stripes.hold(shard):
+            self._shards[shard][game_id] = game_state
+
+    def delete(self, game_id: str) -> None:
+        shard = self.stripes.shard(game_id)
+        with self.stripes.hold(shard):
+            self._shards[shard].pop(game_id, None)
+
+    def after_fork(self) -> None:
+        self.stripes.after_fork()
+
+    def __len__(self) -> int:
+        return sum(len(games) for games in self._shards)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([game_id for games in self._shards for game_id in list(games)])
+
+
+class SQLiteGameStore(GameStateStore):
+    """
+    Persistent store backed by SQLite in WAL mode.
+
+    Writes are queued and flushed in batches by a background thread, and recently
+    used games are served from an in-memory LRU cache. Writes that have not been
+    flushed yet are kept in a pending map so reads always see the latest state.
+
+    With write_through=True every write is committed before set() returns and the
+    cache is bypassed, so several worker processes can serve the same games.
+    locked() only orders requests within one process.
+    """
+
+    def __init__(self, decode_record: Callable[[list], GameState], db_path: str = DEFAULT_DB_PATH,
+                 cache_size: int = 10000, cache_ttl: float = 2.0, flush_interval: float = 0.05,
+                 batch_size: int = 256, write_through: bool = False, shards: int = DEFAULT_SHARDS):
+        self.stripes = LockStripes(shards)
+        self.decode_record = decode_record  # Rebuilds a GameState from its stored record
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl      # How long a cached game is trusted before re-reading (other workers may write)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.write_through = write_through
+        if write_through:
+            self.cache_ttl = 0.0
+
+        self._cache = OrderedDict()     # game_id -> (loaded_at, game_state)
+        self._cache_lock = threading.Lock()
+        self._pending = {}              # game_id -> encoded blob, or None for a pending delete
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS game_states ("
+            "game_id TEXT PRIMARY KEY, state BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+        self._start_writer()
+        atexit.register(self.close)
+        logger.info(f"Opened SQLite game store at {db_path}")
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(target=self._write_loop, name="game-store-writer", daemon=True)
+        self._writer.start()
+
+    def after_fork(self) -> None:
+        # Neither the parent's connections nor its writer thread survive fork, and
+        # its locks may have been held at the time, so start over with fresh ones
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        self.stripes.after_fork()
+        self._start_writer()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cache_get(self, game_id: str) -> Optional[GameState]:
+        with self._cache_lock:
+            entry = self._cache.get(game_id)
+            if entry is None:
+                return None
+            loaded_at, game_state = entry
+            if time.monotonic() - loaded_at > self.cache_ttl:
+                del self._cache[game_id]
+                return None
+            self._cache.move_to_end(game_id)
+            return game_state
+
+    def _cache_put(self, game_id: str, game_state: GameState) -> None:
+        with self._cache_lock:
+            self._cache[game_id] = (time.monotonic(), game_state)
+            self._cache.move_to_end(game_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, game_id: str) -> Optional[GameState]:
+        game_state = self._cache_get(game_id)
+        if game_state is not None:
+            return game_state
+
+        with self._pending_lock:
+            pending = self._pending.get(game_id, False)
+        if pending is None:
+            return None
+        if pending is not False:
+            blob = pending
+        else:
+            row = self._connection().execute(
+                "SELECT state FROM game_states WHERE game_id = ?", (game_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            blob = row[0]
+        game_state = self.decode_record(decode_game_record(blob))
+
+        self._cache_put(game_id, game_state)
+        return game_state
+
+    def set(self, game_id: str, game_state: GameState) -> None:
+        blob = encode_game_state(game_state)
+        self._cache_put(game_id, game_state)
+        with self._pending_lock:
+            self._pending[game_id] = blob
+        if self.write_through:
+            self._write_batch({game_id: blob})
+        else:
+            self._queue.put(game_id)
+
+    def delete(self, game_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(game_id, None)
+        with self._pending_lock:
+            self._pending[game_id] = None
+        if self.write_through:
+            self._write_batch({game_id: None})
+        else:
+            self._queue.put(game_id)
+
+    def __len__(self) -> int:
+        """Stored games plus the effect of writes not flushed yet; never waits for the writer."""
+        with self._pending_lock:
+            pending = dict(self._pending)
+        conn = self._connection()
+        count = conn.execute("SELECT COUNT(*) FROM game_states").fetchone()[0]
+        if not pending:
+            return count
+
+        # Pending writes only change the count for games the table does (not) hold yet
+        game_ids = list(pending)
+        stored = set()
+        for start in range(0, len(game_ids), 500):
+            chunk = game_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT game_id FROM game_states WHERE game_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            stored.update(row[0] for row in rows)
+        for game_id, blob in pending.items():
+            if blob is None and game_id in stored:
+                count -= 1
+            elif blob is not None and game_id not in stored:
+                count += 1
+        return count
+
+    def _take_batch(self) -> Dict[str, Optional[bytes]]:
+        """Wait for queued game ids and return their latest pending values."""
+        try:
+            game_ids = {self._queue.get(timeout=self.flush_interval)}
+        except queue.Empty:
+            return {}
+        while len(game_ids) < self.batch_size:
+            try:
+                game_ids.add(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        with self._pending_lock:
+            return {game_id: self._pending[game_id] for game_id in game_ids if game_id in self._pending}
+
+    def _write_batch(self, batch: Dict[str, Optional[bytes]]) -> None:
+        now = time.time()
+        upserts = [(game_id, blob, now) for game_id, blob in batch.items() if blob is not None]
+        deletes = [(game_id,) for game_id, blob in batch.items() if blob is None]
+        conn = self._connection()
+        with conn:
+            if upserts:
+                conn.executemany(
+                    "INSERT INTO game_states (game_id, state, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(game_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                    upserts
+                )
+            if deletes:
+                conn.executemany("DELETE FROM game_states WHERE game_id = ?", deletes)
+
+        # Only drop pending entries that were not overwritten while we were writing
+        with self._pending_lock:
+            for game_id, blob in batch.items():
+                if self._pending.get(game_id, False) is blob:
+                    del self._pending[game_id]
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                    logger.debug(f"Flushed {len(batch)} game states to SQLite")
+                except Exception as e:
+                    logger.error(f"Error flushing game states: {str(e)}")
+                    if self._closed:
+                        logger.error(f"Giving up on {len(batch)} unwritten game states at shutdown")
+                        return
+                    # Requeue so the writes are retried on the next pass
+                    for game_id in batch:
+                        self._queue.put(game_id)
+                    time.sleep(self.flush_interval)
+            elif self._closed:
+                return
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> bool:
+        # Only the writes pending now are waited for, so steady new traffic cannot
+        # keep this from returning; each is done once written or superseded
+        with self._pending_lock:
+            waiting = dict(self._pending)
+        deadline = time.monotonic() + timeout
+        while waiting:
+            with self._pending_lock:
+                waiting = {game_id: blob for game_id, blob in waiting.items()
+                           if self._pending.get(game_id, False) is blob}
+            if not waiting:
+                break
+            if time.monotonic() >= deadline:
+                logger.error(f"Gave up waiting for {len(waiting)} game states to be written after {timeout:g} s")
+                return False
+            time.sleep(self.flush_interval / 4)
+        return True
+
+    def close(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._writer.join(timeout=5)
+
+
+def create_game_store(decode_record: Callable[[list], GameState], backend: Optional[str] = None) -> GameStateStore:
+    """
+    Create the configured game state store.
+    The backend is read from LOLGRID_GAME_STORE ('memory' or 'sqlite'), the
+    SQLite path from LOLGRID_GAME_DB, and LOLGRID_GAME_STORE_SHARED=1 makes the
+    SQLite store write-through for multi-process servers. LOLGRID_GAME_STORE_SHARDS
+    sets how many lock shards games are spread over (default 16).
+    """
+    backend = backend or os.environ.get('LOLGRID_GAME_STORE', 'memory')
+    shards = int(os.environ.get('LOLGRID_GAME_STORE_SHARDS', str(DEFAULT_SHARDS)))
+    if backend == 'memory':
+        return MemoryGameStore(shards)
+    if backend == 'sqlite':
+        return SQLiteGameStore(decode_record, os.environ.get('LOLGRID_GAME_DB', DEFAULT_DB_PATH),
+                               write_through=os.environ.get('LOLGRID_GAME_STORE_SHARED') == '1', shards=shards)
+    raise ValueError(f"Unknown game store backend: {backend}")
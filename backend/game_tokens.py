@@ -0,0 +1,135 @@
+"""
+Stateless, HMAC-signed game tokens.
+
+A token carries everything needed to continue a game: the grid as category IDs
+and the progress as guessed champion IDs, guessed/correct cell bits and guesses
+remaining. Any worker holding the same secret and champion index can verify a
+guess without shared storage.
+
+Tokens carry no server-side state, so nothing stops a client from resubmitting an
+older token it was given, e.g. the one from before a wrong guess, and retrying that
+cell. Guesses on a cell already set in the submitted token are rejected, but a
+token game is only as binding as the client keeping its latest token. Use stored
+games where that matters.
+"""
+
+from typing import List, Optional
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import struct
+
+from backend.champion_index import ChampionIndex
+from backend.game_state import GameState
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TOKEN_FORMAT = 1
+NO_GUESS = 0xFFFF
+MAC_SIZE = 16
+
+# format, index version, game nonce, 6 category IDs, 9 guessed champion IDs,
+# guessed bits, correct bits, guesses remaining, difficulty
+_PAYLOAD = struct.Struct("<B8s8s6H9HHHBe")
+
+
+class InvalidGameToken(ValueError):
+    """Raised when a game token is malformed, tampered with or for another index"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_token_secret() -> bytes:
+    """Read the signing secret from LOLGRID_TOKEN_SECRET, or make a process-local one"""
+    secret = os.environ.get("LOLGRID_TOKEN_SECRET")
+    if secret:
+        return secret.encode("utf-8")
+    logger.warning("LOLGRID_TOKEN_SECRET is not set; game tokens will only be valid in this process")
+    return secrets.token_bytes(32)
+
+
+def token_index_version(token: str) -> Optional[str]:
+    """The champion index version a token was issued for, without verifying it; None if malformed"""
+    try:
+        raw = _b64decode(token)
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != _PAYLOAD.size + MAC_SIZE:
+        return None
+    return raw[1:9].hex()
+
+
+class GameTokenCodec:
+    """Encodes, signs and verifies game tokens against a champion index"""
+
+    def __init__(self, index: ChampionIndex, secret: bytes):
+        self.index = index
+        self.secret = secret
+        self.index_version = bytes.fromhex(index.version)[:8]
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+    def encode(self, game: GameState) -> str:
+        """Serialize and sign a game"""
+        category_ids = [cell.row_category for cell in game.cells[::3]] + [cell.col_category for cell in game.cells[:3]]
+        if any(cell.guess is not None and not isinstance(cell.guess, int) for cell in game.cells):
+            raise ValueError("Token games only hold guesses of known champions")
+        guess_ids = [cell.guess if cell.guess is not None else NO_GUESS for cell in game.cells]
+        guessed_bits = sum(1 << i for i, cell in enumerate(game.cells) if cell.guess is not None)
+        correct_bits = sum(1 << i for i, cell in enumerate(game.cells) if cell.is_correct)
+        payload = _PAYLOAD.pack(
+            TOKEN_FORMAT, self.index_version, bytes.fromhex(game.game_id),
+            *category_ids, *guess_ids,
+            guessed_bits, correct_bits, game.guesses_remaining, game.difficulty
+        )
+        return _b64encode(payload + self._sign(payload))
+
+    def decode(self, token: str) -> GameState:
+        """Verify a token's signature and decode it"""
+        try:
+            raw = _b64decode(token)
+        except (ValueError, TypeError):
+            raise InvalidGameToken("Malformed game token")
+        if len(raw) != _PAYLOAD.size + MAC_SIZE:
+            raise InvalidGameToken("Malformed game token")
+
+        payload, mac = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+        if not hmac.compare_digest(mac, self._sign(payload)):
+            raise InvalidGameToken("Invalid game token signature")
+
+        fields = _PAYLOAD.unpack(payload)
+        token_format, index_version, nonce = fields[0], fields[1], fields[2]
+        if token_format != TOKEN_FORMAT:
+            raise InvalidGameToken(f"Unsupported game token format: {token_format}")
+        if index_version != self.index_version:
+            raise InvalidGameToken("Game token was issued for a different champion data version")
+
+        category_ids, guess_ids = fields[3:9], fields[9:18]
+        guessed_bits, correct_bits, guesses_remaining, difficulty = fields[18:22]
+        categories = [self.index.categories[category_id] for category_id in category_ids]
+
+        # Cell answers are recomputed from the index rather than trusted from the client
+        game = GameState(self.index, nonce.hex(), categories[:3], categories[3:], difficulty)
+        for i, (cell, guess_id) in enumerate(zip(game.cells, guess_ids)):
+            if guessed_bits >> i & 1:
+                if guess_id >= len(self.index.champion_names):
+                    raise InvalidGameToken("Game token holds a guess that is not a champion")
+                cell.guess = guess_id
+                cell.is_correct = bool(correct_bits >> i & 1)
+        game.guesses_remaining = guesses_remaining
+        return game
+
+    def new_game(self, row_categories: List[str], col_categories: List[str], difficulty: float) -> GameState:
+        """Start a new token game for a generated grid"""
+        return GameState(self.index, secrets.token_hex(8), row_categories, col_categories, difficulty)
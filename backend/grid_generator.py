@@ -1,21 +1,34 @@
 import random
-import json
 from typing import Dict, List, Tuple, Set, Optional
 from dataclasses import dataclass
 from collections import defaultdict
 import math
 import os
 import sys
+import time
 import logging
 
 # Get the project root directory
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-from backend.categories import CATEGORY_TYPES, get_all_categories, get_category_type, get_champions_for_category
+from backend.categories import get_all_categories, get_category_type, get_champions_for_category
+from backend.champion_data import load_champions_data
+from backend.metrics import registry
+from backend.single_flight import SingleFlight
+from backend.tracing import annotate, span, traced
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+GRID_GENERATIONS = registry.counter('lolgrid_grid_generations_total', 'Grid generations by outcome', ['outcome'])
+GRID_ATTEMPTS = registry.counter('lolgrid_grid_generation_attempts_total', 'Candidate grids tried while generating')
+GRID_DURATION = registry.histogram('lolgrid_grid_generation_duration_seconds', 'Time to generate a valid grid')
+CACHE_LOOKUPS = registry.counter('lolgrid_cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result'])
+CATEGORY_CACHE_HITS = CACHE_LOOKUPS.labels(cache='category_difficulty', result='hit')
+CATEGORY_CACHE_MISSES = CACHE_LOOKUPS.labels(cache='category_difficulty', result='miss')
+PAIR_CACHE_HITS = CACHE_LOOKUPS.labels(cache='pair_difficulty', result='hit')
+PAIR_CACHE_MISSES = CACHE_LOOKUPS.labels(cache='pair_difficulty', result='miss')
+
 @dataclass
 class CategoryPair:
     """Represents a pair of categories and their difficulty score"""
@@ -27,19 +40,82 @@ class CategoryPair:
 class GridGenerator:
     """Handles the generation of valid grids with difficulty scoring"""
     
-    def __init__(self, champions_data: Dict):
+    def __init__(self, champions_data: Dict, rng: Optional[random.Random] = None):
         self.champions_data = champions_data
+        self.rng = rng or random              # Source of randomness; pass a seeded Random for reproducible grids
+        self.category_champions_cache = {}   # Cache for champions matching each category
         self.category_difficulty_cache = {}  # Cache for category difficulty scores
         self.pair_difficulty_cache = {}      # Cache for category pair difficulty scores
+        self.cache_fills = SingleFlight('grid_caches')  # One computation per missing cache entry
         self.recently_used_categories = set()  # Track recently used categories
         self.max_recent_categories = 20       # How many recent categories to track
+    
+    def spawn(self, rng: Optional[random.Random] = None) -> 'GridGenerator':
+        """A generator over the same data sharing this one's caches, with its own randomness and recent categories"""
+        generator = GridGenerator(self.champions_data, rng)
+        generator.category_champions_cache = self.category_champions_cache
+        generator.category_difficulty_cache = self.category_difficulty_cache
+        generator.pair_difficulty_cache = self.pair_difficulty_cache
+        generator.cache_fills = self.cache_fills
+        return generator
+    
+    def champions_for_category(self, category: str) -> List[str]:
+        """Champions matching a category, scanned once per set of caches"""
+        champions = self.category_champions_cache.get(category)
+        if champions is None:
+            champions = self.cache_fills.do(('category', category), self._scan_category, category)
+        return champions
+    
+    def _scan_category(self, category: str) -> List[str]:
+        # Rechecked, as the entry may have been filled since the caller missed it
+        champions = self.category_champions_cache.get(category)
+        if champions is None:
+            champions = get_champions_for_category(self.champions_data, category)
+            self.category_champions_cache[category] = champions
+        return champions
+    
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Fill every cache grid generation would otherwise fill on first use: the
+        category scans, the category difficulties and the difficulty of every
+        ordered category pair. Returns the milliseconds each step took.
+        """
+        categories = list(dict.fromkeys(get_all_categories()))
+        timings = {}
+        
+        start = time.perf_counter()
+        for category in categories:
+            self.champions_for_category(category)
+        timings['category_scan'] = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        for category in categories:
+            self.calculate_category_difficulty(category)
+        timings['category_difficulty'] = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        for category1 in categories:
+            for category2 in categories:
+                if category1 != category2:
+                    self.calculate_pair_difficulty(category1, category2)
+        timings['pair_difficulty'] = (time.perf_counter() - start) * 1000
+        
+        return timings
         
     def calculate_category_difficulty(self, category: str) -> float:
         """Calculate the difficulty score for a single category based on how many champions match it"""
+        if category in self.category_difficulty_cache:
+            CATEGORY_CACHE_HITS.inc()
+            return self.category_difficulty_cache[category]
+        CATEGORY_CACHE_MISSES.inc()
+        # Concurrent misses for the same category share one computation
+        return self.cache_fills.do(('difficulty', category), self._fill_category_difficulty, category)
+    
+    def _fill_category_difficulty(self, category: str) -> float:
         if category in self.category_difficulty_cache:
             return self.category_difficulty_cache[category]
         
-        matching_champions = get_champions_for_category(self.champions_data, category)
+        matching_champions = self.champions_for_category(category)
         total_champions = len(self.champions_data)
         
         # Fewer matching champions = higher difficulty
@@ -52,12 +128,24 @@ class GridGenerator:
             difficulty = 1.0 - (math.log(len(matching_champions) + 1) / math.log(total_champions + 1))
         
         self.category_difficulty_cache[category] = difficulty
-        logger.debug(f"Category '{category}' difficulty: {difficulty:.3f} ({len(matching_champions)} champions)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Category '{category}' difficulty: {difficulty:.3f} ({len(matching_champions)} champions)")
         return difficulty
     
+    @traced('calculate_pair_difficulty')
     def calculate_pair_difficulty(self, category1: str, category2: str) -> Tuple[float, List[str]]:
         """Calculate the difficulty score for a pair of categories"""
         cache_key = f"{category1}|{category2}"
+        if cache_key in self.pair_difficulty_cache:
+            PAIR_CACHE_HITS.inc()
+            annotate(pair=cache_key, cached=True)
+            return self.pair_difficulty_cache[cache_key]
+        PAIR_CACHE_MISSES.inc()
+        annotate(pair=cache_key, cached=False)
+        # Concurrent misses for the same pair share one computation
+        return self.cache_fills.do(('pair', cache_key), self._fill_pair_difficulty, category1, category2, cache_key)
+    
+    def _fill_pair_difficulty(self, category1: str, category2: str, cache_key: str) -> Tuple[float, List[str]]:
         if cache_key in self.pair_difficulty_cache:
             return self.pair_difficulty_cache[cache_key]
         
@@ -65,10 +153,10 @@ class GridGenerator:
         matching_champions = []
         
         # Get champions that match each category individually
-        champions_cat1 = get_champions_for_category(self.champions_data, category1)
-        champions_cat2 = get_champions_for_category(self.champions_data, category2)
+        champions_cat1 = self.champions_for_category(category1)
+        champions_cat2 = set(self.champions_for_category(category2))
         
-        # Find champions that match both categories
+        # Find champions that match both categories, in the first category's order
         for champion_name in champions_cat1:
             if champion_name in champions_cat2:
                 matching_champions.append(champion_name)
@@ -94,9 +182,10 @@ class GridGenerator:
         result = (difficulty, matching_champions)
         self.pair_difficulty_cache[cache_key] = result
         
-        logger.debug(f"Category pair '{category1}' x '{category2}' difficulty: {difficulty:.3f} ({len(matching_champions)} champions)")
-        if matching_champions:
-            logger.debug(f"Matching champions: {', '.join(matching_champions)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Category pair '{category1}' x '{category2}' difficulty: {difficulty:.3f} ({len(matching_champions)} champions)")
+            if matching_champions:
+                logger.debug(f"Matching champions: {', '.join(matching_champions)}")
         
         return result
     
@@ -115,6 +204,7 @@ class GridGenerator:
         # hard categories, just make them less likely
         return base_weight * (0.5 + difficulty * 0.5)
     
+    @traced('select_categories')
     def select_categories(self, count: int, exclude_categories: Set[str] = None, valid_categories: List[str] = None) -> List[str]:
         """Select categories with weighted randomness, avoiding recently used ones"""
         if exclude_categories is None:
@@ -134,7 +224,7 @@ class GridGenerator:
         weights = [self.get_category_weight(cat) for cat in available_categories]
         
         # Select categories based on weights
-        selected = random.choices(available_categories, weights=weights, k=count)
+        selected = self.rng.choices(available_categories, weights=weights, k=count)
         
         # Update recently used categories
         self.recently_used_categories.update(selected)
@@ -144,6 +234,7 @@ class GridGenerator:
         
         return selected
     
+    @traced('generate_valid_grid')
     def generate_valid_grid(self, target_difficulty: float = 0.5) -> Tuple[List[str], List[str], List[List[List[str]]], float]:
         """
         Generate a valid 3x3 grid with categories that have at least one solution.
@@ -156,6 +247,9 @@ class GridGenerator:
         grid_difficulty = 0.0
         attempts = 0
         max_attempts = 100
+        started = time.perf_counter()
+        # Checked once so the retry loop never builds messages that would be dropped
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         logger.info(f"Generating grid with target difficulty: {target_difficulty}")
         
@@ -163,7 +257,7 @@ class GridGenerator:
         all_categories = get_all_categories()
         valid_categories = []
         for category in all_categories:
-            matching_champions = get_champions_for_category(self.champions_data, category)
+            matching_champions = self.champions_for_category(category)
             if matching_champions:
                 valid_categories.append(category)
         
@@ -173,45 +267,57 @@ class GridGenerator:
         
         while not valid_grid and attempts < max_attempts:
             attempts += 1
-            logger.debug(f"Attempt {attempts} to generate valid grid")
+            with span('grid_attempt', attempt=attempts):
+                if debug:
+                    logger.debug(f"Attempt {attempts} to generate valid grid")
             
-            # Select 6 random categories (3 for rows, 3 for columns)
-            row_categories = self.select_categories(3, valid_categories=valid_categories)
-            col_categories = self.select_categories(3, exclude_categories=set(row_categories), valid_categories=valid_categories)
+                # Select 6 random categories (3 for rows, 3 for columns)
+                row_categories = self.select_categories(3, valid_categories=valid_categories)
+                col_categories = self.select_categories(3, exclude_categories=set(row_categories), valid_categories=valid_categories)
             
-            logger.debug(f"Selected row categories: {row_categories}")
-            logger.debug(f"Selected column categories: {col_categories}")
+                if debug:
+                    logger.debug(f"Selected row categories: {row_categories}")
+                    logger.debug(f"Selected column categories: {col_categories}")
             
-            # Check if each cell has at least one valid solution
-            solutions = []
-            valid_grid = True
-            total_difficulty = 0.0
-            cell_count = 0
+                # Check if each cell has at least one valid solution
+                solutions = []
+                valid_grid = True
+                total_difficulty = 0.0
+                cell_count = 0
             
-            for row_cat in row_categories:
-                row_solutions = []
-                for col_cat in col_categories:
-                    difficulty, cell_solutions = self.calculate_pair_difficulty(row_cat, col_cat)
-                    if not cell_solutions:
-                        logger.debug(f"No valid solutions for cell with categories '{row_cat}' x '{col_cat}'")
-                        valid_grid = False
+                for row_cat in row_categories:
+                    row_solutions = []
+                    for col_cat in col_categories:
+                        difficulty, cell_solutions = self.calculate_pair_difficulty(row_cat, col_cat)
+                        if not cell_solutions:
+                            if debug:
+                                logger.debug(f"No valid solutions for cell with categories '{row_cat}' x '{col_cat}'")
+                            valid_grid = False
+                            break
+                        row_solutions.append(cell_solutions)
+                        total_difficulty += difficulty
+                        cell_count += 1
+                    if not valid_grid:
                         break
-                    row_solutions.append(cell_solutions)
-                    total_difficulty += difficulty
-                    cell_count += 1
-                if not valid_grid:
-                    break
-                solutions.append(row_solutions)
+                    solutions.append(row_solutions)
             
-            if valid_grid:
-                # Calculate average grid difficulty
-                grid_difficulty = total_difficulty / cell_count
-                logger.debug(f"Generated grid with difficulty: {grid_difficulty:.3f}")
+                if valid_grid:
+                    # Calculate average grid difficulty
+                    grid_difficulty = total_difficulty / cell_count
+                    if debug:
+                        logger.debug(f"Generated grid with difficulty: {grid_difficulty:.3f}")
                 
-                # If the grid difficulty is too far from target, try again
-                if abs(grid_difficulty - target_difficulty) > 0.3:
-                    logger.debug(f"Grid difficulty {grid_difficulty:.3f} too far from target {target_difficulty:.3f}, trying again")
-                    valid_grid = False
+                    # If the grid difficulty is too far from target, try again
+                    if abs(grid_difficulty - target_difficulty) > 0.3:
+                        if debug:
+                            logger.debug(f"Grid difficulty {grid_difficulty:.3f} too far from target {target_difficulty:.3f}, trying again")
+                        valid_grid = False
+                annotate(valid=valid_grid, solvable_cells=cell_count)
+        
+        annotate(target_difficulty=target_difficulty, attempts=attempts, valid=valid_grid)
+        GRID_ATTEMPTS.inc(attempts)
+        GRID_DURATION.observe(time.perf_counter() - started)
+        GRID_GENERATIONS.labels(outcome='success' if valid_grid else 'failure').inc()
         
         if not valid_grid:
             logger.error(f"Failed to generate valid grid after {max_attempts} attempts")
@@ -219,60 +325,6 @@ class GridGenerator:
         
         logger.info(f"Successfully generated grid with difficulty: {grid_difficulty:.3f}")
         return row_categories, col_categories, solutions, grid_difficulty
-    
-    def generate_game_state(self, target_difficulty: float = 0.5):
-        """Generate a game state with the specified target difficulty"""
-        try:
-            # Generate a valid grid
-            row_categories, col_categories, solutions, grid_difficulty = self.generate_valid_grid(target_difficulty)
-            
-            # Create grid
-            grid = []
-            for i, row_solutions in enumerate(solutions):
-                row = []
-                for j, cell_solutions in enumerate(row_solutions):
-                    row.append({
-                        'xCategory': col_categories[j],
-                        'yCategory': row_categories[i],
-                        'correctChampions': cell_solutions,
-                        'guessedChampion': None,
-                        'isCorrect': None
-                    })
-                grid.append(row)
-            
-            # Helper function to get category type from category name
-            def get_category_type(category):
-                for cat_type, info in CATEGORY_TYPES.items():
-                    if category in info["categories"]:
-                        return cat_type
-                return None
-            
-            game_state = {
-                'grid': grid,
-                'categories': {
-                    'xAxis': [{'name': cat, 'values': list(CATEGORY_TYPES[get_category_type(cat)]["categories"])} for cat in col_categories],
-                    'yAxis': [{'name': cat, 'values': list(CATEGORY_TYPES[get_category_type(cat)]["categories"])} for cat in row_categories]
-                },
-                'guessesRemaining': 9,
-                'isGameOver': False,
-                'score': 0,
-                'difficulty': grid_difficulty
-            }
-            
-            logger.info("Successfully generated game state")
-            return game_state
-        except Exception as e:
-            logger.error(f"Error generating game state: {str(e)}")
-            raise
-
-def load_champions_data() -> Dict:
-    """Load champion data from the JSON file"""
-    # Get the project root directory
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(project_root, 'data', 'champions.json')
-    with open(data_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return data["champions"]  # Return the champions array
 
 # Example usage
 if __name__ == "__main__":
@@ -281,15 +333,14 @@ if __name__ == "__main__":
     
     # Generate grids with different difficulty levels
     for difficulty in [0.3, 0.5, 0.7]:
-        game_state = generator.generate_game_state(difficulty)
-        print(f"\nGenerated grid with difficulty: {game_state['difficulty']:.2f}")
-        print("Row categories:", game_state['categories']['yAxis'])
-        print("Column categories:", game_state['categories']['xAxis'])
+        row_categories, col_categories, solutions, grid_difficulty = generator.generate_valid_grid(difficulty)
+        print(f"\nGenerated grid with difficulty: {grid_difficulty:.2f}")
+        print("Row categories:", row_categories)
+        print("Column categories:", col_categories)
         
         # Print a sample of matching champions for each cell
-        for i, row in enumerate(game_state['grid']):
-            for j, cell in enumerate(row):
-                champions = cell['correctChampions']
-                print(f"Cell ({i},{j}): {cell['yCategory']} x {cell['xCategory']} - {len(champions)} champions")
+        for i, row in enumerate(solutions):
+            for j, champions in enumerate(row):
+                print(f"Cell ({i},{j}): {row_categories[i]} x {col_categories[j]} - {len(champions)} champions")
                 if champions:
-                    print(f"  Sample: {', '.join(random.sample(champions, min(3, len(champions))))}") 
\ No newline at end of file
+                    print(f"  Sample: {', '.join(random.sample(champions, min(3, len(champions))))}")
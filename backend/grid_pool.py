@@ -0,0 +1,52 @@
+"""
+Pool of recently generated grids.
+
+Every grid the generator produces is remembered by difficulty, so when generation
+is shed under load a new game can still be started on a recent grid of similar
+difficulty instead of failing.
+"""
+
+from collections import deque
+from typing import List, Optional, Tuple
+import logging
+import random
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+Grid = Tuple[List[str], List[str], float]  # row categories, column categories, grid difficulty
+
+
+class GridPool:
+    """Recent grids bucketed by difficulty"""
+
+    def __init__(self, per_bucket: int = 16, buckets: int = 10, tolerance: float = 0.3):
+        self.buckets = buckets
+        self.tolerance = tolerance  # Same slack the generator allows around a target difficulty
+        self.grids = [deque(maxlen=per_bucket) for _ in range(buckets + 1)]
+        self.lock = threading.Lock()
+        self.served = 0
+
+    def _bucket(self, difficulty: float) -> int:
+        return round(max(0.0, min(1.0, difficulty)) * self.buckets)
+
+    def add(self, row_categories: List[str], col_categories: List[str], grid_difficulty: float) -> None:
+        with self.lock:
+            self.grids[self._bucket(grid_difficulty)].append((list(row_categories), list(col_categories), grid_difficulty))
+
+    def take(self, target_difficulty: float) -> Optional[Grid]:
+        """A random recent grid from the bucket nearest the target, or None if none is close enough"""
+        target = self._bucket(target_difficulty)
+        max_distance = round(self.tolerance * self.buckets)
+        with self.lock:
+            for distance in range(max_distance + 1):
+                for bucket in ((target - distance, target + distance) if distance else (target,)):
+                    if 0 <= bucket <= self.buckets and self.grids[bucket]:
+                        self.served += 1
+                        return random.choice(self.grids[bucket])
+        return None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(grids) for grids in self.grids)
@@ -0,0 +1,153 @@
+"""
+In-memory champion icon cache.
+
+Every icon is read once at startup and kept in memory with a content hash, so
+serving an icon needs no filesystem access. URLs that carry the content hash
+are served as immutable. Sprite atlases built by scripts/champion_icons.py are
+cached the same way.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+
+from flask import Request, Response
+from werkzeug.http import parse_etags
+
+from backend.name_index import normalize_name
+from backend.serialization import PreencodedPayload
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def render_image(data: bytes, etag: str, if_none_match: Optional[str], cache_control: str) -> Tuple[int, bytes, Dict[str, str]]:
+    """Status, body and headers for a PNG with a strong ETag"""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control, 'Content-Type': 'image/png'}
+    if parse_etags(if_none_match).contains_weak(etag):
+        return 304, b'', headers
+    return 200, data, headers
+
+
+def to_response(rendered: Optional[Tuple[int, bytes, Dict[str, str]]]) -> Optional[Response]:
+    if rendered is None:
+        return None
+    status, body, headers = rendered
+    response = Response(body, status=status)
+    response.headers.update(headers)
+    return response
+
+
+class Icon:
+    """A cached icon image and its content hash"""
+    __slots__ = ('champion_id', 'data', 'content_hash')
+
+    def __init__(self, champion_id: str, data: bytes):
+        self.champion_id = champion_id
+        self.data = data
+        self.content_hash = hashlib.sha1(data).hexdigest()[:HASH_LENGTH]
+
+    @property
+    def url(self) -> str:
+        return f"/champion_icons/{self.champion_id}.{self.content_hash}.png"
+
+
+class IconCache:
+    """Champion icons loaded into memory, keyed by normalized champion ID"""
+
+    def __init__(self, icons_dir: str, resolve_id: Optional[Callable[[str], str]] = None):
+        self.resolve_id = resolve_id  # Maps champion names and aliases to icon IDs
+        self.icons = {}
+        for filename in sorted(os.listdir(icons_dir)):
+            champion_id, ext = os.path.splitext(filename)
+            if ext != '.png':
+                continue
+            with open(os.path.join(icons_dir, filename), 'rb') as f:
+                self.icons[normalize_name(champion_id)] = Icon(champion_id, f.read())
+        logger.info(f"Loaded {len(self.icons)} champion icons into memory")
+
+    def get(self, champion: str) -> Optional[Icon]:
+        """Find the icon for a champion name or champion ID"""
+        if self.resolve_id is not None:
+            champion = self.resolve_id(champion)
+        return self.icons.get(normalize_name(champion))
+
+    def icon_url(self, champion: str) -> Optional[str]:
+        icon = self.get(champion)
+        return icon.url if icon is not None else None
+
+    def lookup(self, filename: str) -> Tuple[Optional[Icon], bool]:
+        """
+        Resolve a requested icon filename such as 'Ahri', "Kai'Sa.png" or
+        'Ahri.<hash>.png'. Returns the icon and whether the URL's hash matched it.
+        """
+        if filename.endswith('.png'):
+            filename = filename[:-len('.png')]
+
+        name, _, suffix = filename.rpartition('.')
+        if name and len(suffix) == HASH_LENGTH:
+            icon = self.get(name)
+            if icon is not None:
+                return icon, icon.content_hash == suffix
+
+        return self.get(filename), False
+
+    def render(self, filename: str, if_none_match: Optional[str]) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """Status, body and headers for an icon request, or None if there is no such icon"""
+        icon, hashed = self.lookup(filename)
+        if icon is None:
+            return None
+        # Hashed URLs change whenever the image does, so they can be cached forever
+        return render_image(icon.data, icon.content_hash, if_none_match, IMMUTABLE_CACHE_CONTROL if hashed else DEFAULT_CACHE_CONTROL)
+
+    def response(self, request: Request, filename: str) -> Optional[Response]:
+        """Serve an icon with caching headers, or None if there is no such icon"""
+        return to_response(self.render(filename, request.headers.get('If-None-Match')))
+
+
+class SpriteAtlasCache:
+    """Sprite atlases and their coordinate manifests, loaded into memory"""
+
+    def __init__(self, atlas_dir: str):
+        self.manifests = {}  # variant -> PreencodedPayload of the manifest
+        self.images = {}     # image filename -> PNG bytes
+        if not os.path.isdir(atlas_dir):
+            logger.warning(f"No sprite atlases found in {atlas_dir}; run scripts/champion_icons.py --atlas")
+            return
+
+        for filename in sorted(os.listdir(atlas_dir)):
+            variant, ext = os.path.splitext(filename)
+            if ext != '.json':
+                continue
+            with open(os.path.join(atlas_dir, filename), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            image_name = os.path.basename(manifest['image'])
+            with open(os.path.join(atlas_dir, image_name), 'rb') as f:
+                self.images[image_name] = f.read()
+            self.manifests[variant] = PreencodedPayload(manifest)
+        logger.info(f"Loaded {len(self.manifests)} sprite atlases into memory")
+
+    def render(self, filename: str, accept_encoding: Optional[str],
+               if_none_match: Optional[str]) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """Status, body and headers for a manifest ('<variant>.json') or image ('<variant>.<hash>.png')"""
+        variant, ext = os.path.splitext(filename)
+        if ext == '.json' and variant in self.manifests:
+            # Manifests point at content-hashed images, so only they need revalidating
+            status, body, headers = self.manifests[variant].render(accept_encoding, if_none_match, DEFAULT_CACHE_CONTROL)
+            headers['Content-Type'] = 'application/json'
+            return status, body, headers
+
+        data = self.images.get(filename)
+        if data is None:
+            return None
+        return render_image(data, filename.split('.')[-2], if_none_match, IMMUTABLE_CACHE_CONTROL)
+
+    def response(self, request: Request, filename: str) -> Optional[Response]:
+        """Serve an atlas manifest or image, or None if there is no such file"""
+        return to_response(self.render(filename, request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match')))
@@ -0,0 +1,176 @@
+"""
+Non-blocking logging pipeline.
+
+Request threads only put records on a bounded in-memory queue. A listener thread
+writes them to a size-rotated log file and the console, so disk I/O never adds
+latency to a request. When the queue is full, records are dropped and counted
+rather than making the request wait. Optional modes write one JSON object per line
+and keep only a sample of records below WARNING.
+
+RotatingFileHandler is not safe across processes: workers rotating the same file
+at once rename it over each other. Forked workers therefore append through a
+WatchedFileHandler, which reopens the file once it has been renamed, and only the
+process that configured logging (the pre-fork master) rotates it, from rotate().
+"""
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+from typing import List, Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+
+from backend.tracing import current_trace_id
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Captured in the request's thread, before the record leaves its context
+        record.trace_id = current_trace_id()
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        trace_id = getattr(record, 'trace_id', None)
+        if trace_id is not None:
+            entry['traceId'] = trace_id
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LogPipeline:
+    """The queue handler installed on the root logger and the listener draining it"""
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int, sample_rate: float,
+                 file_handler: Optional[RotatingFileHandler] = None):
+        self.handlers = handlers
+        self.file_handler = file_handler  # Rotated by this process only; None in forked children
+        self.queue_size = queue_size
+        self.handler = DroppingQueueHandler(queue.Queue(queue_size))
+        if sample_rate < 1.0:
+            self.handler.addFilter(SamplingFilter(sample_rate))
+        self.listener = QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+
+    def start(self) -> None:
+        self.listener.start()
+        atexit.register(self.stop)
+        # A forked child has the queue but not the listener thread, and the queue's
+        # lock may have been held at the fork, so the child gets a fresh pair
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        if self.file_handler is not None:
+            # Append without rotating; the parent rotates and this handler follows the rename
+            watched = WatchedFileHandler(self.file_handler.baseFilename, encoding='utf-8', delay=True)
+            watched.setFormatter(self.file_handler.formatter)
+            watched.setLevel(self.file_handler.level)
+            self.handlers = [watched if handler is self.file_handler else handler for handler in self.handlers]
+            self.file_handler = None
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.handler.dropped = 0
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def rotate(self) -> None:
+        """Roll the log file over once it has outgrown its limit, counting what forked workers wrote"""
+        handler = self.file_handler
+        if handler is None or handler.maxBytes <= 0:
+            return
+        try:
+            size = os.path.getsize(handler.baseFilename)
+        except OSError:
+            return
+        if size >= handler.maxBytes:
+            handler.acquire()
+            try:
+                handler.doRollover()
+            finally:
+                handler.release()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+
+def configure_logging(log_path: str) -> Optional[LogPipeline]:
+    """
+    Route all logging through a queue to a rotating log file and the console.
+    Configured by:
+    - LOLGRID_LOG_LEVEL (default INFO)
+    - LOLGRID_LOG_FORMAT (text or json)
+    - LOLGRID_LOG_SAMPLE_RATE (fraction of records below WARNING to keep, default 1)
+    - LOLGRID_LOG_MAX_BYTES (default 10 MiB) and LOLGRID_LOG_BACKUPS (default 5) for rotation
+    - LOLGRID_LOG_QUEUE (records buffered before new ones are dropped, default 10000)
+    Returns None if logging was already configured.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, DroppingQueueHandler) for handler in root.handlers):
+        return None
+
+    formatter = JsonFormatter() if os.environ.get('LOLGRID_LOG_FORMAT', 'text') == 'json' else logging.Formatter(TEXT_FORMAT)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    file_handler = RotatingFileHandler(
+        log_path,
+        maxBytes=int(os.environ.get('LOLGRID_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+        backupCount=int(os.environ.get('LOLGRID_LOG_BACKUPS', '5')),
+        encoding='utf-8',
+        delay=True,
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    pipeline = LogPipeline(
+        [file_handler, console_handler],
+        queue_size=int(os.environ.get('LOLGRID_LOG_QUEUE', '10000')),
+        sample_rate=float(os.environ.get('LOLGRID_LOG_SAMPLE_RATE', '1')),
+        file_handler=file_handler,
+    )
+    root.setLevel(os.environ.get('LOLGRID_LOG_LEVEL', 'INFO').upper())
+    root.addHandler(pipeline.handler)
+    pipeline.start()
+    return pipeline
@@ -0,0 +1,404 @@
+"""
+Metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms record into per-thread cells that are only summed
+when metrics are read, so recording never takes a lock. When LOLGRID_METRICS_DIR
+is set, every process also writes a snapshot of its metrics there about once a
+second and whenever it serves /metrics, and /metrics served by any worker merges
+the snapshots of all of them, so other processes' metrics are up to a second old.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Per-thread shards kept before those of exited threads are folded together
+MAX_SHARDS = 64
+
+
+class ShardedCells:
+    """A fixed-size vector of floats with one copy per writing thread"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards = []         # (thread, cells) for every thread that has written
+        self._retired = [0.0] * size  # Totals of threads that have exited
+        self._lock = threading.Lock()  # Only taken when a thread writes for the first time and on reads
+
+    def cells(self) -> List[float]:
+        cells = getattr(self._local, 'cells', None)
+        if cells is None:
+            cells = [0.0] * self.size
+            self._local.cells = cells
+            with self._lock:
+                # Thread-per-connection servers start a thread per request
+                if len(self._shards) >= MAX_SHARDS:
+                    self._retire_exited()
+                self._shards.append((threading.current_thread(), cells))
+        return cells
+
+    def _retire_exited(self) -> None:
+        # Fold exited threads into the retired totals; they can no longer write
+        live = []
+        for thread, cells in self._shards:
+            if thread.is_alive():
+                live.append((thread, cells))
+            else:
+                for i, value in enumerate(cells):
+                    self._retired[i] += value
+        self._shards = live
+
+    def values(self) -> List[float]:
+        with self._lock:
+            self._retire_exited()
+            totals = list(self._retired)
+            for _, cells in self._shards:
+                for i, value in enumerate(cells):
+                    totals[i] += value
+        return totals
+
+    def reset(self) -> None:
+        self._local = threading.local()
+        self._shards = []
+        self._retired = [0.0] * self.size
+        self._lock = threading.Lock()
+
+
+class MetricChild:
+    """One labelled series of a metric"""
+    __slots__ = ('buckets', 'cells')
+
+    def __init__(self, size: int, buckets: Optional[Tuple[float, ...]]):
+        self.buckets = buckets
+        self.cells = ShardedCells(size)
+
+    def inc(self, value: float = 1.0) -> None:
+        self.cells.cells()[0] += value
+
+    def dec(self, value: float = 1.0) -> None:
+        self.cells.cells()[0] -= value
+
+    def observe(self, value: float) -> None:
+        # Cells hold one count per bucket (the last one is +Inf) followed by the sum
+        cells = self.cells.cells()
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+
+class Metric:
+    """A named counter, gauge or histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str] = (),
+                 buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets is not None else None
+        self.size = len(self.buckets) + 2 if self.buckets is not None else 1
+        self.children = {}  # label values -> MetricChild
+        self._lock = threading.Lock()
+
+    def labels(self, **labels) -> MetricChild:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(key, MetricChild(self.size, self.buckets))
+        return child
+
+    # Shortcuts for metrics without labels
+    def inc(self, value: float = 1.0) -> None:
+        self.labels().inc(value)
+
+    def dec(self, value: float = 1.0) -> None:
+        self.labels().dec(value)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], List[float]]]:
+        return [(key, child.cells.values()) for key, child in list(self.children.items())]
+
+    def reset(self) -> None:
+        for child in self.children.values():
+            child.cells.reset()
+
+
+class CallbackMetric:
+    """A metric whose samples are computed when metrics are read"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                 callback: Callable[[], List[Tuple[Tuple[str, ...], float]]], local: bool):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = None
+        self.callback = callback
+        self.local = local  # Shared state every process sees alike, so it is not summed across processes
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], List[float]]]:
+        try:
+            return [(tuple(str(value) for value in key), [float(value)]) for key, value in self.callback()]
+        except Exception as e:
+            logger.error(f"Error collecting metric {self.name}: {str(e)}")
+            return []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values))]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+def _bucket_bound(bound: float) -> str:
+    return '+Inf' if bound == math.inf else repr(bound)
+
+
+def estimate_quantile(buckets: Sequence[float], counts: Sequence[float], quantile: float) -> float:
+    """Linearly interpolated quantile from histogram bucket counts (like histogram_quantile)"""
+    total = sum(counts)
+    if not total:
+        return math.nan
+    rank = quantile * total
+    cumulative = 0.0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            if i >= len(buckets):
+                return buckets[-1]
+            return lower + (buckets[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def _snapshot_pid(path: str) -> Optional[int]:
+    name = os.path.basename(path)
+    try:
+        return int(name[len('metrics-'):-len('.json')])
+    except ValueError:
+        return None
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """All metrics of a process, plus the snapshot files of its sibling processes"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self.interval = 1.0
+        self._flusher = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # The flusher and scrapes write the same file
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Metric:
+        return self._register(Metric(name, help_text, 'counter', labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Metric:
+        return self._register(Metric(name, help_text, 'gauge', labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        return self._register(Metric(name, help_text, 'histogram', labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, kind: str, callback, labelnames: Sequence[str] = (),
+                 local: bool = False) -> CallbackMetric:
+        """Register a metric computed by callback() -> [(label values, value), ...]"""
+        return self._register(CallbackMetric(name, help_text, kind, labelnames, callback, local))
+
+    def snapshot(self, include_local: bool = False) -> Dict:
+        """Current samples of this process, keyed by metric name"""
+        return {
+            name: [[list(key), values] for key, values in metric.samples()]
+            for name, metric in list(self.metrics.items())
+            if include_local or not getattr(metric, 'local', False)
+        }
+
+    # Multi-process support
+
+    def enable_multiprocess(self, directory: str, interval: float = 1.0) -> None:
+        """Share metrics with the other processes writing snapshots to directory"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self._start_flusher()
+        logger.info(f"Sharing metrics through {directory}")
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def write_snapshot(self) -> None:
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with self._write_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+
+    def retire_snapshot(self, pid: int) -> None:
+        """
+        Keep the final snapshot of an exited process under a name without its pid,
+        so a new process that reuses the pid cannot overwrite what it counted.
+        The rename is atomic: a concurrent scrape sees the file under one name only.
+        """
+        if self.directory is None:
+            return
+        try:
+            os.replace(self._snapshot_path(pid),
+                       os.path.join(self.directory, f"metrics-exited-{pid}-{time.time_ns()}.json"))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error retiring metrics snapshot of process {pid}: {str(e)}")
+
+    def close(self) -> None:
+        """Write a final snapshot so nothing recorded since the last one is lost"""
+        if self.directory is not None:
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _start_flusher(self) -> None:
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _after_fork(self) -> None:
+        # The child starts from zero; what the parent recorded stays in the parent's snapshot
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        for metric in self.metrics.values():
+            if isinstance(metric, Metric):
+                metric._lock = threading.Lock()
+                metric.reset()
+        if self.directory is not None:
+            self._start_flusher()
+
+    def merged_samples(self) -> Dict[str, Dict[Tuple[str, ...], List[float]]]:
+        """Samples of this process summed with the latest snapshots of the others"""
+        merged = {}
+
+        def merge(snapshot, kinds=None):
+            for name, samples in snapshot.items():
+                if kinds is not None and (name not in self.metrics or self.metrics[name].kind not in kinds):
+                    continue
+                series = merged.setdefault(name, {})
+                for key, values in samples:
+                    key = tuple(key)
+                    if key in series and len(series[key]) == len(values):
+                        series[key] = [a + b for a, b in zip(series[key], values)]
+                    else:
+                        series[key] = list(values)
+
+        merge(self.snapshot(include_local=True))
+        if self.directory is not None:
+            # Publish this process's metrics now, so a scrape served next by another
+            # worker does not miss what was recorded since the last periodic write
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+            own_path = self._snapshot_path(os.getpid())
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                if path == own_path:
+                    continue
+                # An exited process still contributes what it counted, but not the
+                # gauges it last reported, which no longer describe anything
+                kinds = None if _process_alive(_snapshot_pid(path)) else ('counter', 'histogram')
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        merge(json.load(f), kinds)
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Skipping unreadable metrics snapshot {path}: {str(e)}")
+        return merged
+
+    def exposition(self) -> bytes:
+        """All metrics in the Prometheus text exposition format"""
+        merged = self.merged_samples()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            series = merged.get(name, {})
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, values in sorted(series.items()):
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(values[0])}")
+                    continue
+                bounds = metric.buckets + (math.inf,)
+                cumulative = 0.0
+                for bound, count in zip(bounds, values[:-1]):
+                    cumulative += count
+                    le = 'le="' + _bucket_bound(bound) + '"'
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, le)} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(values[-1])}")
+                lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {_format_value(cumulative)}")
+
+            # Quantile estimates for reading /metrics without a Prometheus server
+            if metric.kind == 'histogram' and series:
+                lines.append(f"# HELP {name}_quantile Estimated quantiles of {name}")
+                lines.append(f"# TYPE {name}_quantile gauge")
+                for key, values in sorted(series.items()):
+                    for quantile in QUANTILES:
+                        estimate = estimate_quantile(metric.buckets, values[:-1], quantile)
+                        q = f'quantile="{quantile}"'
+                        lines.append(f"{name}_quantile{_format_labels(metric.labelnames, key, q)} {_format_value(estimate)}")
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# Process-wide registry shared by every backend module
+registry = MetricsRegistry()
+
+if os.environ.get('LOLGRID_METRICS_DIR'):
+    registry.enable_multiprocess(os.environ['LOLGRID_METRICS_DIR'])
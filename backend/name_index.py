@@ -0,0 +1,179 @@
+"""
+Normalized champion name index.
+
+Champion names, common aliases and icon IDs are normalized (case, accents,
+punctuation and spacing removed) into one lookup table built at load time, so
+"kaisa", "Kai Sa" and "Kai'Sa" all resolve to the same champion in O(1). The
+same keys feed a prefix trie for autocomplete, with a trigram index as a
+typo-tolerant fallback when the prefix matches too few champions.
+"""
+
+from typing import Dict, List, Optional, Set
+from collections import defaultdict
+import logging
+import os
+import unicodedata
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 20
+# Minimum trigram similarity for a fuzzy suggestion
+FUZZY_THRESHOLD = 0.25
+
+# Common player shorthand, mapped to the champion's display name
+CHAMPION_ALIASES = {
+    "asol": "Aurelion Sol",
+    "blitz": "Blitzcrank",
+    "cass": "Cassiopeia",
+    "cho": "Cho'Gath",
+    "fiddle": "Fiddlesticks",
+    "gp": "Gangplank",
+    "heimer": "Heimerdinger",
+    "j4": "Jarvan IV",
+    "kass": "Kassadin",
+    "kog": "Kog'Maw",
+    "mf": "Miss Fortune",
+    "mord": "Mordekaiser",
+    "morg": "Morgana",
+    "mundo": "Dr. Mundo",
+    "naut": "Nautilus",
+    "nunu": "Nunu & Willump",
+    "tf": "Twisted Fate",
+    "trynd": "Tryndamere",
+    "vlad": "Vladimir",
+    "voli": "Volibear",
+    "ww": "Warwick",
+    "yi": "Master Yi",
+}
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a name and strip accents and everything but letters and digits"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(char for char in decomposed.lower() if char.isascii() and char.isalnum())
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrieNode:
+    __slots__ = ('children', 'names')
+
+    def __init__(self):
+        self.children = {}  # character -> TrieNode
+        self.names = []     # Best suggestions for this prefix, at most MAX_SUGGESTIONS
+
+
+class ChampionNameIndex:
+    """Canonical champion names by normalized key, with prefix and fuzzy search"""
+
+    def __init__(self, champion_names: List[str], icon_paths: Optional[Dict[str, str]] = None,
+                 aliases: Optional[Dict[str, str]] = None):
+        self.champion_names = sorted(champion_names)
+        aliases = CHAMPION_ALIASES if aliases is None else aliases
+
+        # Icon file stems, e.g. "Nunu & Willump" -> "Nunu"
+        self.icon_ids = {
+            name: os.path.splitext(os.path.basename(path))[0]
+            for name, path in (icon_paths or {}).items()
+        }
+
+        # Exact names win over icon IDs, which win over aliases
+        known_names = set(self.champion_names)
+        self.canonical_names = {}  # normalized key -> display name
+        for name in self.champion_names:
+            self.canonical_names.setdefault(normalize_name(name), name)
+        for name, icon_id in self.icon_ids.items():
+            if name in known_names:
+                self.canonical_names.setdefault(normalize_name(icon_id), name)
+        for alias, name in aliases.items():
+            if name in known_names:
+                self.canonical_names.setdefault(normalize_name(alias), name)
+            else:
+                logger.warning(f"Ignoring alias '{alias}' for unknown champion '{name}'")
+
+        # Full names first so they rank above word and alias matches, e.g. "fate"
+        # finds Twisted Fate and "w" lists Warwick before Nunu & Willump
+        self.trie = TrieNode()
+        for name in self.champion_names:
+            self._insert(normalize_name(name), name)
+        for key, name in self.canonical_names.items():
+            self._insert(key, name)
+        for name in self.champion_names:
+            words = name.split()
+            for i in range(1, len(words)):
+                self._insert(normalize_name(' '.join(words[i:])), name)
+
+        self.trigram_index = defaultdict(set)  # trigram -> normalized keys
+        self.trigram_counts = {}               # normalized key -> number of trigrams
+        for key in self.canonical_names:
+            key_trigrams = trigrams(key)
+            self.trigram_counts[key] = len(key_trigrams)
+            for trigram in key_trigrams:
+                self.trigram_index[trigram].add(key)
+
+        logger.info(f"Built champion name index with {len(self.canonical_names)} keys for {len(self.champion_names)} champions")
+
+    def _insert(self, key: str, name: str) -> None:
+        node = self.trie
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            if name not in node.names and len(node.names) < MAX_SUGGESTIONS:
+                node.names.append(name)
+
+    def canonical(self, name) -> Optional[str]:
+        """Resolve any spelling, alias or icon ID of a champion to its display name"""
+        if not isinstance(name, str):
+            return None
+        return self.canonical_names.get(normalize_name(name))
+
+    def icon_id(self, name: str) -> str:
+        """Icon file stem for a champion, or the input unchanged if it is unknown"""
+        canonical = self.canonical(name)
+        if canonical is None:
+            return name
+        return self.icon_ids.get(canonical, canonical)
+
+    def prefix_matches(self, key: str) -> List[str]:
+        node = self.trie
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.names
+
+    def fuzzy_matches(self, key: str) -> List[str]:
+        """Champions whose keys share enough trigrams with key, most similar first"""
+        query = trigrams(key)
+        shared = defaultdict(int)
+        for trigram in query:
+            for candidate in self.trigram_index.get(trigram, ()):
+                shared[candidate] += 1
+
+        scores = {}
+        for candidate, count in shared.items():
+            similarity = count / (len(query) + self.trigram_counts[candidate] - count)
+            name = self.canonical_names[candidate]
+            if similarity >= FUZZY_THRESHOLD and similarity > scores.get(name, 0.0):
+                scores[name] = similarity
+        return sorted(scores, key=lambda name: (-scores[name], name))
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[str]:
+        """Champion names matching a partial query, prefix matches before fuzzy ones"""
+        key = normalize_name(query)
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        if not key:
+            return self.champion_names[:limit]
+
+        suggestions = list(self.prefix_matches(key)[:limit])
+        # Too short for trigrams to say anything useful
+        if len(suggestions) < limit and len(key) >= 3:
+            for name in self.fuzzy_matches(key):
+                if name not in suggestions:
+                    suggestions.append(name)
+                    if len(suggestions) == limit:
+                        break
+        return suggestions
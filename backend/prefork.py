@@ -0,0 +1,354 @@
+"""
+Pre-fork production server for the League of Legends Grid Game API.
+
+The master process imports backend.app once, which loads the champion data and
+icons and builds the champion index, grid generator and preencoded payloads. It
+then freezes the garbage collector and forks the workers, so every worker shares
+those objects copy-on-write instead of loading its own copy. The master only
+supervises: it respawns workers that die, replaces all of them on SIGHUP without
+closing the listening socket, and adds or removes one worker on SIGTTIN/SIGTTOU.
+
+Run it from the project root:
+    python -m backend.prefork --port 5001 --workers 4
+"""
+
+from typing import Dict, Optional
+import argparse
+import gc
+import glob
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Get the project root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('LOLGRID_WORKERS', os.cpu_count() or 1))
+GRACEFUL_TIMEOUT = float(os.environ.get('LOLGRID_GRACEFUL_TIMEOUT', '30'))
+KEEPALIVE_TIMEOUT = float(os.environ.get('LOLGRID_KEEPALIVE_TIMEOUT', '5'))
+
+
+def configure_game_store() -> None:
+    """
+    Games kept in process memory are invisible to the other workers, and SIGTTIN
+    can add a worker to any running server, so default to the SQLite store unless
+    a store or stateless games were configured explicitly, and make it
+    write-through so a guess handled by one worker is seen by the next. Must run
+    before backend.app is imported.
+    """
+    if os.environ.get('LOLGRID_STATELESS_GAMES') == '1':
+        return
+    if 'LOLGRID_GAME_STORE' not in os.environ:
+        os.environ['LOLGRID_GAME_STORE'] = 'sqlite'
+        logger.warning("Using the SQLite game store so games are shared between workers")
+    if os.environ['LOLGRID_GAME_STORE'] == 'sqlite':
+        os.environ.setdefault('LOLGRID_GAME_STORE_SHARED', '1')
+    else:
+        logger.warning(f"The {os.environ['LOLGRID_GAME_STORE']} game store is not shared between workers")
+
+
+def configure_shared_index() -> None:
+    """Map the champion index from a file so every worker reads the same pages"""
+    os.environ.setdefault('LOLGRID_SHARED_INDEX', os.path.join(PROJECT_ROOT, 'data', 'champion_index.bin'))
+
+
+def configure_warmup() -> None:
+    """Warm up in the master while the app loads, so every worker shares the warm caches and starts ready"""
+    # A background warm-up thread would not survive the fork
+    if os.environ.get('LOLGRID_WARMUP', '').lower() != 'off':
+        os.environ['LOLGRID_WARMUP'] = 'sync'
+
+
+def configure_metrics() -> Optional[str]:
+    """
+    Have every process write metric snapshots to one directory, so /metrics on any
+    worker reports the whole server. Snapshots of a previous run are removed; those
+    of workers that exit during this run are kept so counters never go backwards,
+    though only their counters and histograms are merged, not their gauges. The
+    master renames a reaped worker's snapshot, so a new worker with the same pid
+    starts its own file instead of overwriting it.
+    Returns the directory if it is a temporary one to remove on exit.
+    """
+    if 'LOLGRID_METRICS_DIR' in os.environ:
+        for path in glob.glob(os.path.join(os.environ['LOLGRID_METRICS_DIR'], 'metrics-*.json')):
+            os.remove(path)
+        return None
+    directory = tempfile.mkdtemp(prefix='lolgrid-metrics-')
+    os.environ['LOLGRID_METRICS_DIR'] = directory
+    return directory
+
+
+def memory_usage() -> Dict[str, int]:
+    """Resident, proportional and private memory of this process in KiB (Linux only)"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+class Arbiter:
+    """Master process owning the listening socket and the worker processes"""
+
+    def __init__(self, host: str, port: int, workers: int, graceful_timeout: float = GRACEFUL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}       # pid -> generation the worker was started in
+        self.generation = 0     # Bumped on every graceful restart
+        self.retiring = {}      # pid -> deadline for old workers still finishing requests
+        self.signals = []
+        self.listener = None
+        self.api = None
+
+    def preload(self) -> None:
+        """Load everything the workers share, then freeze it out of the collector's reach"""
+        start = time.perf_counter()
+        from backend import app as api
+        self.api = api
+        api.game_states.flush()
+
+        # Objects allocated so far are moved to a permanent generation. Collections
+        # in the workers then never touch them, so their pages stay shared.
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Preloaded application in {(time.perf_counter() - start) * 1000:.0f} ms "
+                    f"({gc.get_freeze_count()} objects frozen, {memory_usage().get('Rss', 0) // 1024} MiB resident)")
+
+    def run(self) -> None:
+        self.preload()
+        self.listener = socket.create_server((self.host, self.port), backlog=2048)
+        self.listener.set_inheritable(True)
+
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        signal.set_wakeup_fd(wakeup_write)
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, lambda signum, frame: self.signals.append(signum))
+
+        logger.info(f"Master {os.getpid()} listening on http://{self.host}:{self.port} with {self.num_workers} workers")
+        self.manage_workers()
+        try:
+            while True:
+                select.select([wakeup_read], [], [], 1.0)
+                try:
+                    os.read(wakeup_read, 1024)
+                except BlockingIOError:
+                    pass
+
+                while self.signals:
+                    signum = self.signals.pop(0)
+                    if signum in (signal.SIGTERM, signal.SIGINT):
+                        self.stop()
+                        return
+                    if signum == signal.SIGHUP:
+                        self.reload()
+                    elif signum == signal.SIGTTIN and self.games_in_worker_memory():
+                        logger.warning("Ignoring SIGTTIN: games are kept in worker memory, so a new worker "
+                                       "would not see them; use the SQLite game store to add workers")
+                    elif signum == signal.SIGTTIN:
+                        self.num_workers += 1
+                        logger.info(f"Increased workers to {self.num_workers}")
+                    elif signum == signal.SIGTTOU and self.num_workers > 1:
+                        self.num_workers -= 1
+                        logger.info(f"Decreased workers to {self.num_workers}")
+
+                self.reap_workers()
+                self.kill_overdue_workers()
+                self.manage_workers()
+                # Workers only append to the log file; the master is the one process rotating it
+                if self.api.log_pipeline is not None:
+                    self.api.log_pipeline.rotate()
+        finally:
+            self.listener.close()
+
+    def games_in_worker_memory(self) -> bool:
+        """True when each worker keeps its own games, so they are lost with the worker"""
+        from backend.game_store import MemoryGameStore
+        return not self.api.STATELESS_GAMES and isinstance(self.api.game_states, MemoryGameStore)
+
+    def spawn_worker(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return
+
+        # Worker process: never return into the master's loop
+        exit_code = 0
+        try:
+            Worker(self.listener, self.api, os.getppid()).run()
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, so drain the log queue first
+            if self.api.log_pipeline is not None:
+                self.api.log_pipeline.stop()
+            logging.shutdown()
+            os._exit(exit_code)
+
+    def manage_workers(self) -> None:
+        """Start or stop current-generation workers until there are num_workers of them"""
+        current = [pid for pid, generation in self.workers.items() if generation == self.generation and pid not in self.retiring]
+        for _ in range(self.num_workers - len(current)):
+            self.spawn_worker()
+        for pid in sorted(current)[:max(0, len(current) - self.num_workers)]:
+            self.retire_worker(pid)
+
+    def retire_worker(self, pid: int) -> None:
+        """Ask a worker to finish its in-flight requests and exit"""
+        self.retiring[pid] = time.monotonic() + self.graceful_timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reload(self) -> None:
+        """Graceful restart: start a new generation of workers, then retire the old one"""
+        self.generation += 1
+        old_workers = [pid for pid in self.workers if pid not in self.retiring]
+        logger.info(f"Graceful restart: replacing {len(old_workers)} workers")
+        if self.games_in_worker_memory():
+            logger.warning("Games are kept in worker memory: every live game is dropped with the old workers")
+        self.manage_workers()
+        for pid in old_workers:
+            self.retire_worker(pid)
+
+    def reap_workers(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            self.api.metrics.retire_snapshot(pid)
+            if self.retiring.pop(pid, None) is None:
+                logger.warning(f"Worker {pid} exited unexpectedly with status {os.waitstatus_to_exitcode(status)}")
+
+    def kill_overdue_workers(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                logger.warning(f"Worker {pid} did not exit within {self.graceful_timeout}s, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def stop(self) -> None:
+        logger.info("Shutting down workers")
+        for pid in list(self.workers):
+            self.retire_worker(pid)
+        while self.workers:
+            self.reap_workers()
+            self.kill_overdue_workers()
+            time.sleep(0.1)
+        self.api.game_states.close()
+        self.api.metrics.close()
+        self.api.event_journal.close()
+        logger.info("All workers stopped")
+
+
+class Worker:
+    """A forked worker serving the preloaded Flask app on the shared socket"""
+
+    def __init__(self, listener: socket.socket, api, master_pid: int):
+        self.listener = listener
+        self.api = api
+        self.master_pid = master_pid
+        self.server = None
+        self.stopping = False
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        # The master's handlers and wakeup pipe are not ours; Ctrl+C reaches the
+        # whole process group, but workers wait for the master's SIGTERM
+        signal.set_wakeup_fd(-1)
+        for sig in (signal.SIGHUP, signal.SIGCHLD, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.shutdown())
+
+        self.api.game_states.after_fork()
+
+        class KeepAliveRequestHandler(WSGIRequestHandler):
+            # Idle keep-alive connections would otherwise hold up a graceful shutdown
+            timeout = KEEPALIVE_TIMEOUT
+
+        self.server = make_server(self.listener.getsockname()[0], self.listener.getsockname()[1], self.api.app,
+                                  threaded=True, request_handler=KeepAliveRequestHandler, fd=self.listener.fileno())
+        # Wait for in-flight requests when the server closes
+        self.server.daemon_threads = False
+        self.server.block_on_close = True
+        self.server.service_actions = self.check_master
+        if self.stopping:
+            return
+
+        memory = memory_usage()
+        logger.info(f"Worker {os.getpid()} ready in {(time.perf_counter() - start) * 1000:.1f} ms "
+                    f"(RSS {memory.get('Rss', 0) // 1024} MiB, private {(memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0)) // 1024} MiB)")
+        self.server.serve_forever(poll_interval=0.5)
+        self.server.server_close()
+        self.api.game_states.close()
+        self.api.metrics.close()
+        self.api.event_journal.close()
+        logger.info(f"Worker {os.getpid()} exited")
+
+    def shutdown(self) -> None:
+        self.stopping = True
+        if self.server is None:
+            return
+        # serve_forever's shutdown() blocks until the loop exits, so it cannot run in the signal handler's thread
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def check_master(self) -> None:
+        """Exit if the master died and this worker was re-parented"""
+        if os.getppid() != self.master_pid:
+            logger.warning(f"Master {self.master_pid} is gone, worker {os.getpid()} shutting down")
+            self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the League of Legends Grid Game API")
+    parser.add_argument("--host", default=os.environ.get('LOLGRID_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('LOLGRID_PORT', '5001')))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT,
+                        help="Seconds a retiring worker may spend finishing requests before it is killed")
+    args = parser.parse_args()
+
+    configure_game_store()
+    configure_shared_index()
+    configure_warmup()
+    metrics_dir = configure_metrics()
+    try:
+        Arbiter(args.host, args.port, args.workers, args.graceful_timeout).run()
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
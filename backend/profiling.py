@@ -0,0 +1,231 @@
+"""
+Opt-in per-request profiling.
+
+Requests are profiled when they carry the profiling token header, when they are
+picked by the sampling rate, or (kept only if they turn out slow) when a latency
+threshold is set. Token and sampled requests run under cProfile; every profiled
+request is also sampled by a background stack sampler. Each kept profile is written
+to the profile directory as:
+- a collapsed-stack file for flamegraph.pl or speedscope
+- a pstats dump when cProfile ran
+- a top-N text summary
+
+The middleware is only installed when a trigger is configured, so it costs nothing
+otherwise.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_HEADER = 'HTTP_X_PROFILE'  # X-Profile: <LOLGRID_PROFILE_TOKEN>
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Frame chain as a root-first, semicolon-separated collapsed stack"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """One background thread sampling the stacks of the threads being profiled"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.recordings = {}  # thread id -> Counter of collapsed stacks
+        self.active = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def _ensure_running(self) -> None:
+        # Started lazily, and again in forked workers, which do not inherit the thread
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.recordings = {}
+                    self.active = threading.Event()
+                    self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                    self.thread.start()
+                    self.pid = os.getpid()
+
+    def start(self, thread_id: int) -> None:
+        self._ensure_running()
+        with self.lock:
+            self.recordings[thread_id] = Counter()
+            self.active.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self.lock:
+            samples = self.recordings.pop(thread_id, Counter())
+            if not self.recordings:
+                self.active.clear()
+        return samples
+
+    def _run(self) -> None:
+        while True:
+            self.active.wait()
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, samples in self.recordings.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """WSGI middleware deciding which requests to profile and writing their profiles"""
+
+    def __init__(self, output_dir: str, token: Optional[str] = None, sample_rate: float = 0.0,
+                 slow_ms: float = 0.0, top: int = 30, interval: float = 0.002):
+        self.output_dir = output_dir
+        self.token = token
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.top = top
+        self.sampler = StackSampler(interval)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def wrap(self, wsgi_app):
+        def profiled_app(environ, start_response):
+            return self(wsgi_app, environ, start_response)
+        return profiled_app
+
+    def trigger(self, environ: Dict) -> Optional[str]:
+        """Why this request is profiled up front, or None"""
+        if self.token and environ.get(PROFILE_HEADER) == self.token:
+            return 'header'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, wsgi_app, environ, start_response):
+        trigger = self.trigger(environ)
+        if trigger is None and not self.slow_ms:
+            return wsgi_app(environ, start_response)
+
+        thread_id = threading.get_ident()
+        profile = cProfile.Profile() if trigger is not None else None
+        self.sampler.start(thread_id)
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Another request's profiler is active (profiling is process-wide from 3.12)
+                    profile = None
+            try:
+                return wsgi_app(environ, start_response)
+            finally:
+                if profile is not None:
+                    profile.disable()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            samples = self.sampler.stop(thread_id)
+            if trigger is None and elapsed_ms >= self.slow_ms:
+                trigger = 'slow'
+            if trigger is not None:
+                try:
+                    self.write(environ, trigger, elapsed_ms, samples, profile)
+                except OSError as e:
+                    logger.error(f"Error writing request profile: {str(e)}")
+
+    def write(self, environ: Dict, trigger: str, elapsed_ms: float, samples: Counter,
+              profile: Optional[cProfile.Profile]) -> str:
+        method = environ.get('REQUEST_METHOD', 'GET')
+        path = environ.get('PATH_INFO', '/')
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'root'
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        base = os.path.join(self.output_dir, f"{stamp}-{method}-{slug}-{elapsed_ms:.0f}ms")
+
+        with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary = io.StringIO()
+        summary.write(f"{method} {path}?{environ.get('QUERY_STRING', '')} took {elapsed_ms:.1f} ms ({trigger})\n")
+        summary.write(f"{sum(samples.values())} stack samples\n\n")
+        for title, counts in (("Self samples", self_samples(samples)), ("Total samples", total_samples(samples))):
+            summary.write(f"{title}:\n")
+            for label, count in counts[:self.top]:
+                summary.write(f"{count:8d}  {label}\n")
+            summary.write("\n")
+        if profile is not None:
+            profile.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(profile, stream=summary)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        logger.info(f"Profiled {method} {path} ({trigger}, {elapsed_ms:.1f} ms) to {base}.*")
+        return base
+
+
+def self_samples(samples: Counter) -> List[Tuple[str, int]]:
+    """Samples per function at the top of the stack"""
+    counts = Counter()
+    for stack, count in samples.items():
+        counts[stack.rsplit(';', 1)[-1]] += count
+    return counts.most_common()
+
+
+def total_samples(samples: Counter) -> List[Tuple[str, int]]:
+    """Samples per function anywhere on the stack, counting recursion once"""
+    counts = Counter()
+    for stack, count in samples.items():
+        for label in set(stack.split(';')):
+            counts[label] += count
+    return counts.most_common()
+
+
+def profiler_from_env() -> Optional[RequestProfiler]:
+    """
+    Build a profiler configured by LOLGRID_PROFILE_TOKEN (profile requests sending
+    it in X-Profile), LOLGRID_PROFILE_SAMPLE_RATE (fraction of requests to profile),
+    LOLGRID_PROFILE_SLOW_MS (keep profiles of requests at least this slow),
+    LOLGRID_PROFILE_DIR, LOLGRID_PROFILE_TOP and LOLGRID_PROFILE_INTERVAL_MS (stack
+    sampling interval). Returns None if no trigger is set.
+    """
+    token = os.environ.get('LOLGRID_PROFILE_TOKEN') or None
+    sample_rate = float(os.environ.get('LOLGRID_PROFILE_SAMPLE_RATE', '0'))
+    slow_ms = float(os.environ.get('LOLGRID_PROFILE_SLOW_MS', '0'))
+    if token is None and sample_rate <= 0 and slow_ms <= 0:
+        return None
+    return RequestProfiler(
+        os.environ.get('LOLGRID_PROFILE_DIR', os.path.join(PROJECT_ROOT, 'logs', 'profiles')),
+        token=token,
+        sample_rate=sample_rate,
+        slow_ms=slow_ms,
+        top=int(os.environ.get('LOLGRID_PROFILE_TOP', '30')),
+        interval=float(os.environ.get('LOLGRID_PROFILE_INTERVAL_MS', '2')) / 1000,
+    )
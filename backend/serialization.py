@@ -0,0 +1,160 @@
+"""
+Response serialization for the League of Legends Grid Game API.
+
+Immutable payloads are encoded and compressed once up front; dynamic responses
+go through a faster JSON provider when orjson is installed and are compressed
+according to the client's Accept-Encoding.
+"""
+
+from typing import Dict, Optional, Tuple
+import gzip
+import hashlib
+import json
+import logging
+
+from flask import Flask, Request, Response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header, parse_etags
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_THRESHOLD = 1024
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript'}
+
+
+def dumps_compact(obj) -> bytes:
+    """Encode an object as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best content coding supported by both sides, or None for identity"""
+    accept = parse_accept_header(accept_encoding)
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class PreencodedPayload:
+    """A JSON payload encoded, compressed and hashed once and served many times"""
+
+    def __init__(self, obj, etag: Optional[str] = None):
+        self.body = dumps_compact(obj)
+        self.etag = etag or hashlib.sha1(self.body).hexdigest()[:16]
+        self.encoded = {}  # content coding -> compressed body
+        if len(self.body) >= COMPRESSION_THRESHOLD:
+            self.encoded['gzip'] = compress(self.body, 'gzip', 9)
+            if brotli is not None:
+                self.encoded['br'] = compress(self.body, 'br', 11)
+
+    def render(self, accept_encoding: Optional[str], if_none_match: Optional[str],
+               cache_control: Optional[str] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Pick the status, body and headers for a request with the given
+        Accept-Encoding and If-None-Match header values
+        """
+        headers = {}
+        # Compressed and identity bodies share a weak ETag, like most proxies do
+        headers['ETag'] = f'W/"{self.etag}"' if self.encoded else f'"{self.etag}"'
+        if self.encoded:
+            headers['Vary'] = 'Accept-Encoding'
+        if cache_control:
+            headers['Cache-Control'] = cache_control
+
+        if parse_etags(if_none_match).contains_weak(self.etag):
+            return 304, b'', headers
+
+        encoding = choose_encoding(accept_encoding)
+        if encoding not in self.encoded:
+            return 200, self.body, headers
+        headers['Content-Encoding'] = encoding
+        return 200, self.encoded[encoding], headers
+
+    def response(self, request: Request, cache_control: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Response:
+        """Build a Flask response for this payload, honouring If-None-Match and Accept-Encoding"""
+        status, body, render_headers = self.render(
+            request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match'), cache_control
+        )
+        response = Response(body, status=status, mimetype='application/json')
+        response.headers.update(render_headers)
+        if headers:
+            response.headers.update(headers)
+        return response
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
+def install_json_provider(app: Flask) -> None:
+    """Use orjson for jsonify when available, otherwise skip key sorting and indentation"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+        logger.info("Using orjson JSON provider")
+    else:
+        app.json.sort_keys = False
+        app.json.compact = True
+
+
+def compress_body(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress a dynamic body if it is large enough and the client accepts it"""
+    if len(body) < COMPRESSION_THRESHOLD:
+        return body, None
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding, 5), encoding
+
+
+def compress_response(response: Response, request: Request) -> Response:
+    """after_request hook compressing dynamic responses above the size threshold"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body, encoding = compress_body(response.get_data(), request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+    return response
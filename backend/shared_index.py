@@ -0,0 +1,277 @@
+"""
+Memory-mapped champion index shared by every worker on a machine.
+
+The champion ID table, category ID table, per-category champion bitmasks and the
+category pair matrix (number of champions matching each pair) are written once
+to a flat little-endian binary file. Workers mmap it read-only and read straight
+from the mapping, so the index lives in the page cache once per machine however
+many worker processes run, and refcount writes never un-share it.
+
+File layout (all integers little-endian):
+    header          HEADER struct, see below
+    champion table  name table for champion names, indexed by champion ID
+    category table  name table for category names, indexed by category ID
+    masks           n_categories * mask_bytes, bit i set if champion i matches
+    pair counts     n_categories * n_categories uint16
+
+A name table is (n + 1) uint32 offsets into its UTF-8 blob, an open-addressing
+hash table of uint16 slots (ID + 1, 0 for empty) keyed by the CRC-32 of the name,
+padding to 4 bytes, then the blob.
+"""
+
+from typing import Iterator, List, Optional
+from collections.abc import Mapping, Sequence
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+from backend.champion_index import ChampionIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LGIX'
+FORMAT_VERSION = 1
+# magic, format version, champions, categories, bytes per mask, index version,
+# champion table offset, category table offset, masks offset, pair counts offset, file size
+HEADER = struct.Struct('<4sHHHH16s5I')
+PAIR_COUNT = struct.Struct('<H')
+SLOT = struct.Struct('<H')
+NAME_OFFSETS = struct.Struct('<2I')
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _hash_slots(count: int) -> int:
+    """Hash table size for count names: a power of two at most half full"""
+    return 1 << max(1, (2 * count - 1).bit_length())
+
+
+def _encode_name_table(names: List[str]) -> bytes:
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+
+    slots = [0] * _hash_slots(len(encoded))
+    for i, name in enumerate(encoded):
+        slot = zlib.crc32(name) & (len(slots) - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (len(slots) - 1)
+        slots[slot] = i + 1
+
+    table = struct.pack(f'<{len(offsets)}I', *offsets) + struct.pack(f'<{len(slots)}H', *slots)
+    table += b'\0' * (_align(len(table), 4) - len(table))
+    return table + b''.join(encoded)
+
+
+def write_index_file(index: ChampionIndex, path: str) -> None:
+    """Write an index to path, replacing any existing file atomically"""
+    n_champions = len(index.champion_names)
+    n_categories = len(index.categories)
+    mask_bytes = _align((n_champions + 7) // 8)
+
+    champion_table = _encode_name_table(index.champion_names)
+    category_table = _encode_name_table(index.categories)
+    masks = b''.join(mask.to_bytes(mask_bytes, 'little') for mask in index.category_masks)
+    pair_counts = b''.join(
+        PAIR_COUNT.pack((mask_a & mask_b).bit_count())
+        for mask_a in index.category_masks for mask_b in index.category_masks
+    )
+
+    champion_offset = _align(HEADER.size)
+    category_offset = _align(champion_offset + len(champion_table))
+    masks_offset = _align(category_offset + len(category_table))
+    pairs_offset = _align(masks_offset + len(masks))
+    file_size = pairs_offset + len(pair_counts)
+
+    data = bytearray(file_size)
+    HEADER.pack_into(data, 0, MAGIC, FORMAT_VERSION, n_champions, n_categories, mask_bytes,
+                     index.version.encode('ascii'), champion_offset, category_offset, masks_offset,
+                     pairs_offset, file_size)
+    data[champion_offset:champion_offset + len(champion_table)] = champion_table
+    data[category_offset:category_offset + len(category_table)] = category_table
+    data[masks_offset:masks_offset + len(masks)] = masks
+    data[pairs_offset:file_size] = pair_counts
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    # Workers that already mapped the old file keep their inode until they reopen
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote shared champion index {index.version} to {path} ({file_size} bytes)")
+
+
+def read_index_version(path: str) -> Optional[str]:
+    """Return the index version stored in a file, or None if it is missing or unreadable"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, format_version, *_, version, _, _, _, _, _ = HEADER.unpack(header)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        return None
+    return version.decode('ascii')
+
+
+class NameTable(Sequence):
+    """Read-only view of a name table, indexable by ID"""
+
+    def __init__(self, buffer: memoryview, offset: int, count: int):
+        self.buffer = buffer
+        self.count = count
+        self.offsets_offset = offset
+        self.slots_offset = offset + (count + 1) * 4
+        self.slot_mask = _hash_slots(count) - 1
+        self.blob_offset = _align(self.slots_offset + (self.slot_mask + 1) * 2, 4)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _name_bytes(self, i: int) -> memoryview:
+        start, end = NAME_OFFSETS.unpack_from(self.buffer, self.offsets_offset + i * 4)
+        return self.buffer[self.blob_offset + start:self.blob_offset + end]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return str(self._name_bytes(i), 'utf-8')
+
+    def find(self, name: str) -> Optional[int]:
+        """Look a name up in the hash table, returning its ID or None"""
+        target = name.encode('utf-8')
+        slot = zlib.crc32(target) & self.slot_mask
+        while True:
+            entry = SLOT.unpack_from(self.buffer, self.slots_offset + slot * 2)[0]
+            if not entry:
+                return None
+            if self._name_bytes(entry - 1) == target:
+                return entry - 1
+            slot = (slot + 1) & self.slot_mask
+
+
+class NameIds(Mapping):
+    """Name -> ID mapping backed by a NameTable"""
+
+    def __init__(self, names: NameTable):
+        self.names = names
+
+    def get(self, name: str, default=None):
+        i = self.names.find(name) if isinstance(name, str) else None
+        return default if i is None else i
+
+    def __getitem__(self, name: str) -> int:
+        i = self.get(name)
+        if i is None:
+            raise KeyError(name)
+        return i
+
+    def __contains__(self, name) -> bool:
+        return self.get(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class MaskTable(Sequence):
+    """Category bitmasks read as ints from the mapping"""
+
+    def __init__(self, buffer: memoryview, offset: int, count: int, mask_bytes: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.mask_bytes = mask_bytes
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = self.offset + i * self.mask_bytes
+        return int.from_bytes(self.buffer[start:start + self.mask_bytes], 'little')
+
+
+class MappedChampionIndex(ChampionIndex):
+    """ChampionIndex whose tables are read from a memory-mapped index file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        (magic, format_version, n_champions, n_categories, mask_bytes, version,
+         champion_offset, category_offset, masks_offset, pairs_offset, file_size) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION or file_size != len(buffer):
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} champion index file")
+
+        self.path = path
+        self.version = version.decode('ascii')
+        self.champion_names = NameTable(buffer, champion_offset, n_champions)
+        self.champion_ids = NameIds(self.champion_names)
+        self.categories = NameTable(buffer, category_offset, n_categories)
+        self.category_ids = NameIds(self.categories)
+        self.category_masks = MaskTable(buffer, masks_offset, n_categories, mask_bytes)
+        self._pairs_offset = pairs_offset
+
+        # Zero-copy array views for vectorised use when NumPy is installed
+        if np is not None:
+            self.mask_array = np.frombuffer(self._mmap, dtype='<u8', count=n_categories * mask_bytes // 8,
+                                            offset=masks_offset).reshape(n_categories, mask_bytes // 8)
+            self.pair_count_matrix = np.frombuffer(self._mmap, dtype='<u2', count=n_categories * n_categories,
+                                                   offset=pairs_offset).reshape(n_categories, n_categories)
+        else:
+            self.mask_array = None
+            self.pair_count_matrix = None
+
+        logger.info(f"Mapped champion index {self.version} from {path} ({file_size} bytes)")
+
+    def pair_count(self, category1: str, category2: str) -> int:
+        category_id1 = self.category_ids.get(category1)
+        category_id2 = self.category_ids.get(category2)
+        if category_id1 is None or category_id2 is None:
+            return 0
+        return PAIR_COUNT.unpack_from(self._mmap, self._pairs_offset + (category_id1 * len(self.categories) + category_id2) * 2)[0]
+
+
+def load_champion_index(champions_data: List, path: Optional[str] = None) -> ChampionIndex:
+    """Build the champion index and share it like share_champion_index"""
+    return share_champion_index(ChampionIndex(champions_data), path)
+
+
+def share_champion_index(index: ChampionIndex, path: Optional[str] = None) -> ChampionIndex:
+    """
+    Share an index through the index file at path (or LOLGRID_SHARED_INDEX) when
+    one is configured. The file is rewritten when it was built from different
+    data; otherwise it is mapped as is.
+    """
+    path = path or os.environ.get('LOLGRID_SHARED_INDEX')
+    if not path:
+        return index
+
+    if read_index_version(path) != index.version:
+        write_index_file(index, path)
+    return MappedChampionIndex(path)
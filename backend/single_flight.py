@@ -0,0 +1,82 @@
+"""
+Single-flight coalescing of expensive shared computations.
+
+When many requests need the same missing result at once (the daily challenge at
+rollover, a cache entry, a pool refill), only the first computes it; the others
+wait on the same future and get its result, or its exception. Nothing is cached
+here: once the computation finishes the key is free again, so callers keep their
+own cache and check it before asking for a flight.
+"""
+
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+import logging
+import os
+import threading
+import weakref
+
+from backend.metrics import registry as metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FLIGHT_CALLS = metrics.counter('lolgrid_single_flight_calls_total',
+                               'Single-flight calls by flight and role (leader computed, follower waited)',
+                               ['flight', 'role'])
+
+# Every flight, so a forked child can drop flights whose leaders live in the parent
+_flights = weakref.WeakSet()
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; concurrent callers share its outcome"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls: Dict[Hashable, Future] = {}
+        self.leaders = FLIGHT_CALLS.labels(flight=name, role='leader')
+        self.followers = FLIGHT_CALLS.labels(flight=name, role='follower')
+        _flights.add(self)
+
+    def do(self, key: Hashable, func: Callable, *args) -> Any:
+        """Return func(*args), or wait for the call already in flight for key and return its result"""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+
+        if not leader:
+            self.followers.inc()
+            return future.result()
+
+        self.leaders.inc()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.calls)
+
+    def _after_fork(self) -> None:
+        # The leaders of any calls in flight at the fork are threads of the parent
+        self.lock = threading.Lock()
+        self.calls = {}
+
+
+def _reset_after_fork() -> None:
+    for flight in list(_flights):
+        flight._after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,233 @@
+"""
+Lightweight request tracing.
+
+A sampled request gets a trace whose spans nest through a contextvar. Grid
+generation, each generation attempt, category selection, pair scoring and category
+scans all become spans with timings and attributes. Finished traces are kept in an
+in-process ring buffer served by /api/debug/traces, and appended to a JSONL file
+when one is configured. Requests that are not sampled carry no trace, and traced
+functions then cost a single contextvar lookup.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = 'X-Trace'  # X-Trace: <LOLGRID_TRACE_TOKEN> forces a trace
+
+_current_span = contextvars.ContextVar('lolgrid_current_span', default=None)
+
+
+class Trace:
+    """All spans of one sampled request"""
+    __slots__ = ('trace_id', 'origin', 'spans', 'max_spans', 'dropped')
+
+    def __init__(self, max_spans: int):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.max_spans = max_spans
+        self.dropped = 0
+
+    def start_span(self, name: str, parent: Optional['Span']) -> Optional['Span']:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(self, len(self.spans) + 1, parent.span_id if parent is not None else None, name)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> Dict:
+        root = self.spans[0]
+        return {
+            'traceId': self.trace_id,
+            'name': root.name,
+            'startedAt': root.wall_time,
+            'durationMs': root.duration_ms,
+            'spanCount': len(self.spans),
+            'droppedSpans': self.dropped,
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+class Span:
+    """A timed operation within a trace"""
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start', 'end', 'wall_time', 'attributes')
+
+    def __init__(self, trace: Trace, span_id: int, parent_id: Optional[int], name: str):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.wall_time = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = {}
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return round((self.end - self.start) * 1000, 3) if self.end is not None else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'spanId': self.span_id,
+            'parentId': self.parent_id,
+            'name': self.name,
+            'offsetMs': round((self.start - self.trace.origin) * 1000, 3),
+            'durationMs': self.duration_ms,
+            'attributes': self.attributes,
+        }
+
+
+class SpanScope:
+    """Context manager making a span current until it ends"""
+    __slots__ = ('span', 'token')
+
+    def __init__(self, span: Optional[Span]):
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self.span is not None:
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if self.span is not None:
+            self.span.end = time.perf_counter()
+            if exc_type is not None:
+                self.span.attributes['error'] = exc_type.__name__
+            _current_span.reset(self.token)
+
+
+_NOOP_SCOPE = SpanScope(None)
+
+
+def span(name: str, **attributes) -> SpanScope:
+    """Child span of the current span, or a no-op when the request is not traced"""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP_SCOPE
+    child = parent.trace.start_span(name, parent)
+    if child is None:
+        return _NOOP_SCOPE
+    child.attributes.update(attributes)
+    return SpanScope(child)
+
+
+def traced(name: str):
+    """Decorator recording each call of a function as a span of the current trace"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def annotate(**attributes) -> None:
+    """Add attributes to the current span, if the request is traced"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+class Tracer:
+    """Decides which requests are traced and keeps their finished traces"""
+
+    def __init__(self, sample_rate: float = 0.0, token: Optional[str] = None, buffer_size: int = 200,
+                 export_path: Optional[str] = None, max_spans: int = 5000):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_spans = max_spans
+        self.export_path = export_path
+        self.traces = deque(maxlen=buffer_size)
+        self.export_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.token is not None
+
+    def start_trace(self, name: str, token: Optional[str] = None, **attributes) -> Optional[SpanScope]:
+        """Root span scope for a request if it is sampled or carries the trace token, else None"""
+        forced = self.token is not None and token == self.token
+        if not forced and not (self.sample_rate and random.random() < self.sample_rate):
+            return None
+        root = Trace(self.max_spans).start_span(name, None)
+        root.attributes.update(attributes)
+        scope = SpanScope(root)
+        scope.__enter__()
+        return scope
+
+    def finish_trace(self, scope: SpanScope, **attributes) -> None:
+        scope.span.attributes.update(attributes)
+        scope.__exit__(None, None, None)
+        trace = scope.span.trace
+        self.traces.append(trace)
+        if self.export_path is not None:
+            try:
+                line = json.dumps(trace.to_dict(), separators=(',', ':'))
+                with self.export_lock, open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                logger.error(f"Error exporting trace {trace.trace_id}: {str(e)}")
+
+    def recent(self, limit: int = 50, min_ms: float = 0.0) -> List[Dict]:
+        """Summaries of the latest finished traces, newest first"""
+        summaries = []
+        for trace in reversed(list(self.traces)):
+            root = trace.spans[0]
+            if root.duration_ms is None or root.duration_ms < min_ms:
+                continue
+            summaries.append({
+                'traceId': trace.trace_id,
+                'name': root.name,
+                'startedAt': root.wall_time,
+                'durationMs': root.duration_ms,
+                'spanCount': len(trace.spans),
+                'attributes': root.attributes,
+            })
+            if len(summaries) == limit:
+                break
+        return summaries
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        for trace in list(self.traces):
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+
+def tracer_from_env() -> Tracer:
+    """
+    Build a tracer configured by LOLGRID_TRACE_SAMPLE_RATE (fraction of requests to
+    trace, default 0), LOLGRID_TRACE_TOKEN (trace requests sending it in X-Trace),
+    LOLGRID_TRACE_BUFFER (finished traces kept in memory), LOLGRID_TRACE_FILE (JSONL
+    file to append traces to) and LOLGRID_TRACE_MAX_SPANS (spans kept per trace).
+    """
+    return Tracer(
+        sample_rate=float(os.environ.get('LOLGRID_TRACE_SAMPLE_RATE', '0')),
+        token=os.environ.get('LOLGRID_TRACE_TOKEN') or None,
+        buffer_size=int(os.environ.get('LOLGRID_TRACE_BUFFER', '200')),
+        export_path=os.environ.get('LOLGRID_TRACE_FILE') or None,
+        max_spans=int(os.environ.get('LOLGRID_TRACE_MAX_SPANS', '5000')),
+    )
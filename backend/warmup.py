@@ -0,0 +1,92 @@
+"""
+Startup warm-up and readiness.
+
+Without a warm-up, the first requests after boot fill the grid generator's
+caches and generate the daily challenge. That makes them several times slower
+than steady state. The warm-up runs these steps once at startup, logging how long
+each phase took, and /ready reports 503 until it has finished. A load balancer
+polling /ready then only sends traffic to warmed workers.
+
+LOLGRID_WARMUP selects how it runs:
+- background (default): in a thread, while the server already accepts requests
+- sync: before the app module finishes importing
+- off: not at all; the server is ready at once and caches fill on first use
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Named warm-up phases, run once, and the readiness they gate"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, Callable, bool]] = []
+        self.timings: Dict[str, float] = {}  # phase (or phase.step) -> milliseconds
+        self.ready = threading.Event()
+        self.running = None  # phase currently running
+        self.error: Optional[str] = None
+        self.thread = None
+
+    def add(self, name: str, func: Callable, steps: bool = False) -> None:
+        """Add a phase; with steps, func returns a dict of step -> milliseconds that is reported too"""
+        self.phases.append((name, func, steps))
+
+    def run(self) -> None:
+        """Run every phase in order, then mark the server ready even if a phase failed"""
+        start = time.perf_counter()
+        for name, func, has_steps in self.phases:
+            self.running = name
+            phase_start = time.perf_counter()
+            try:
+                result = func()
+            except Exception as e:
+                # Whatever failed is retried lazily by the first request that needs it
+                self.error = f"{name}: {str(e)}"
+                logger.error(f"Warm-up phase {name} failed: {str(e)}")
+                continue
+            self.timings[name] = round((time.perf_counter() - phase_start) * 1000, 1)
+            if has_steps:
+                for step, step_ms in result.items():
+                    self.timings[f"{name}.{step}"] = round(step_ms, 1)
+                details = ', '.join(f"{step} {step_ms:.0f} ms" for step, step_ms in result.items())
+                logger.info(f"Warm-up phase {name} took {self.timings[name]:.0f} ms ({details})")
+            else:
+                logger.info(f"Warm-up phase {name} took {self.timings[name]:.0f} ms")
+        self.running = None
+        self.timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+        self.ready.set()
+        logger.info(f"Warm-up finished in {self.timings['total']:.0f} ms; ready for traffic")
+
+    def start(self) -> None:
+        """Run the phases in a background thread"""
+        self.thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self.thread.start()
+
+    def skip(self) -> None:
+        self.ready.set()
+
+    def status(self) -> Dict:
+        status = {'ready': self.ready.is_set(), 'phases': dict(self.timings)}
+        if self.running is not None:
+            status['running'] = self.running
+        if self.error is not None:
+            status['error'] = self.error
+        return status
+
+
+def run_warmup(warmup: Warmup) -> None:
+    """Run, start or skip the warm-up as LOLGRID_WARMUP selects (background, sync or off)"""
+    mode = os.environ.get('LOLGRID_WARMUP', 'background').lower()
+    if mode == 'off':
+        warmup.skip()
+    elif mode == 'sync':
+        warmup.run()
+    else:
+        warmup.start()
@@ -3,12 +3,18 @@ This script analyzes champion data to determine what type of weapon each champio
 The results can be used to populate the 'weapons' category in categories.py.
 """
 
-import json
 import re
 import logging
 import os
+import sys
 from typing import Dict, List, Set
 
+# Get the project root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from backend.champion_data import load_champions_data
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -39,25 +45,6 @@ WEAPON_KEYWORDS = {
     "other": ["dagger", "knife", "throwing", "boomerang", "chakram", "sling", "whip", "chain", "hook"]
 }
 
-def load_champion_data(file_path: str) -> Dict:
-    """Load champion data from JSON file."""
-    try:
-        print(f"Attempting to load champion data from: {file_path}")
-        print(f"Current working directory: {os.getcwd()}")
-        
-        if not os.path.exists(file_path):
-            print(f"File not found: {file_path}")
-            return []
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            champions = data.get("champions", [])
-            print(f"Successfully loaded {len(champions)} champions")
-            return champions
-    except Exception as e:
-        print(f"Error loading champion data: {e}")
-        return []
-
 def analyze_champion_weapons(champion: Dict) -> Set[str]:
     """
     Analyze a champion's data to determine what weapons they use.
@@ -177,10 +164,10 @@ def generate_category_updates(weapon_categories: Dict[str, List[str]], magic_cat
 def main():
     """Main function to run the weapon analysis."""
     # Load champion data
-    file_path = "data/champions.json"
-    print(f"Starting weapon and magic analysis with file path: {file_path}")
+    print("Starting weapon and magic analysis")
     
-    champions_data = load_champion_data(file_path)
+    champions_data = load_champions_data()
+    print(f"Loaded {len(champions_data)} champions")
     
     if not champions_data:
         print("No champion data loaded. Exiting.")
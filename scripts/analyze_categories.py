@@ -11,7 +11,8 @@ import sys
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Import from backend directory
-from backend.grid_generator import GridGenerator, load_champions_data
+from backend.champion_data import load_champions_data
+from backend.grid_generator import GridGenerator
 from backend.categories import CATEGORY_TYPES, get_all_categories, get_category_type, get_champions_for_category
 
 def analyze_category_difficulties():
@@ -169,23 +170,22 @@ def generate_grid_samples():
     print("=====================================")
     
     for difficulty in difficulties:
-        game_state = generator.generate_game_state(difficulty)
+        row_categories, col_categories, solutions, grid_difficulty = generator.generate_valid_grid(difficulty)
         print(f"\nGrid with target difficulty: {difficulty:.1f}")
-        print(f"Actual difficulty: {game_state['difficulty']:.3f}")
+        print(f"Actual difficulty: {grid_difficulty:.3f}")
         
         print("\nRow categories:")
-        for cat in game_state['categories']['yAxis']:
-            print(f"  {cat['name']}")
+        for cat in row_categories:
+            print(f"  {cat}")
         
         print("\nColumn categories:")
-        for cat in game_state['categories']['xAxis']:
-            print(f"  {cat['name']}")
+        for cat in col_categories:
+            print(f"  {cat}")
         
         print("\nSample champions for each cell:")
-        for i, row in enumerate(game_state['grid']):
-            for j, cell in enumerate(row):
-                champions = cell['correctChampions']
-                print(f"  Cell ({i},{j}): {cell['yCategory']} x {cell['xCategory']} - {len(champions)} champions")
+        for i, row in enumerate(solutions):
+            for j, champions in enumerate(row):
+                print(f"  Cell ({i},{j}): {row_categories[i]} x {col_categories[j]} - {len(champions)} champions")
                 if champions:
                     sample = random.sample(champions, min(3, len(champions)))
                     print(f"    Sample: {', '.join(sample)}")
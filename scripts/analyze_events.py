@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Analyze the game event journal the backend writes when LOLGRID_EVENT_JOURNAL is set.
+
+The journal is loaded into columnar arrays: games hold their six category IDs, and
+guesses hold game, cell, champion and outcome. The script reports:
+- accuracy per category, per category pair and per cell position
+- which champions are guessed, guesses per game and final scores
+- anomalies:
+  - guesses for games missing from the journal
+  - games with more than nine guesses
+  - outcomes that disagree with the current champion data
+  - daily challenges that differ between workers
+
+numpy and orjson are used when installed.
+"""
+
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Plain Python aggregation fallback
+    np = None
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# Get the project root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from backend.categories import get_champions_for_category
+from backend.champion_data import load_champions_data
+
+GUESSES_PER_GAME = 9
+
+
+class Interner:
+    """Dense integer IDs for repeated strings"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __call__(self, value: str) -> int:
+        id_ = self.ids.get(value)
+        if id_ is None:
+            id_ = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return id_
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class EventColumns:
+    """Journal events as parallel arrays"""
+
+    def __init__(self):
+        self.categories = Interner()
+        self.champions = Interner()
+        self.game_ids = Interner()
+
+        # Per game, indexed by game ID: row categories then column categories, -1 if not journaled
+        self.game_cells = array('i')
+        self.game_difficulty = array('d')
+        self.game_final_score = array('i')
+
+        # Per guess
+        self.guess_game = array('i')
+        self.guess_row = array('b')
+        self.guess_col = array('b')
+        self.guess_champion = array('i')
+        self.guess_correct = array('b')
+
+        # Daily challenges and verifications
+        self.daily_grids = defaultdict(set)  # date -> {(rows, cols)}
+        self.verify_cell = array('b')
+        self.verify_correct = array('b')
+        self.verify_dates = Counter()
+
+        self.malformed = 0
+
+    def game(self, game_id: str) -> int:
+        index = self.game_ids(game_id)
+        if index == len(self.game_difficulty):
+            self.game_cells.extend((-1,) * 6)
+            self.game_difficulty.append(-1.0)
+            self.game_final_score.append(0)
+        return index
+
+    def add(self, event: Dict) -> None:
+        event_type = event['t']
+        if event_type == 'guess':
+            game = self.game(event['game'])
+            self.guess_game.append(game)
+            self.guess_row.append(event['row'])
+            self.guess_col.append(event['col'])
+            self.guess_champion.append(self.champions(event['champion']))
+            self.guess_correct.append(1 if event['correct'] else 0)
+            self.game_final_score[game] = event['score']
+        elif event_type == 'game':
+            game = self.game(event['game'])
+            for offset, category in enumerate(event['rows'] + event['cols']):
+                self.game_cells[game * 6 + offset] = self.categories(category)
+            self.game_difficulty[game] = event['difficulty']
+        elif event_type == 'verify':
+            self.verify_cell.append(event['row'] * 3 + event['col'])
+            self.verify_correct.append(1 if event['correct'] else 0)
+            self.verify_dates[event['date']] += 1
+        elif event_type == 'daily':
+            self.daily_grids[event['date']].add((tuple(event['rows']), tuple(event['cols'])))
+
+
+def load_journal(paths: List[str]) -> EventColumns:
+    columns = EventColumns()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    columns.add(loads(line))
+                except (ValueError, KeyError, TypeError, OverflowError):
+                    # A torn last line from a crash, or an event from an incompatible version
+                    columns.malformed += 1
+    return columns
+
+
+def guess_cell_categories(columns: EventColumns):
+    """Row and column category ID of each guess's cell (-1 when its game was not journaled)"""
+    if np is not None:
+        cells = np.frombuffer(columns.game_cells, dtype=np.int32).reshape(-1, 6)
+        games = np.frombuffer(columns.guess_game, dtype=np.int32)
+        rows = np.frombuffer(columns.guess_row, dtype=np.int8).astype(np.intp)
+        cols = np.frombuffer(columns.guess_col, dtype=np.int8).astype(np.intp)
+        return cells[games, rows], cells[games, cols + 3]
+    cells = columns.game_cells
+    row_categories = array('i', (cells[game * 6 + row] for game, row in zip(columns.guess_game, columns.guess_row)))
+    col_categories = array('i', (cells[game * 6 + 3 + col] for game, col in zip(columns.guess_game, columns.guess_col)))
+    return row_categories, col_categories
+
+
+def count_by(keys, correct, size: int) -> Tuple[List[int], List[int]]:
+    """Guesses and correct guesses per key in range(size); negative keys are skipped"""
+    if np is not None:
+        keys = np.asarray(keys, dtype=np.int64)
+        correct = np.frombuffer(correct, dtype=np.int8) if isinstance(correct, array) else np.asarray(correct)
+        known = keys >= 0
+        totals = np.bincount(keys[known], minlength=size)
+        hits = np.bincount(keys[known], weights=correct[known], minlength=size)
+        return totals.astype(int).tolist(), hits.astype(int).tolist()
+    totals = [0] * size
+    hits = [0] * size
+    for key, is_correct in zip(keys, correct):
+        if key >= 0:
+            totals[key] += 1
+            hits[key] += is_correct
+    return totals, hits
+
+
+def print_accuracy_table(title: str, labels: List[str], totals: List[int], hits: List[int],
+                         min_guesses: int, top: int, hardest_first: bool = True) -> None:
+    rows = [(hits[i] / totals[i], totals[i], labels[i]) for i in range(len(labels)) if totals[i] >= min_guesses]
+    rows.sort(key=lambda row: (row[0] if hardest_first else -row[0], -row[1]))
+    print(f"\n{title} ({len(rows)} of {sum(1 for t in totals if t)} have at least {min_guesses} guesses):")
+    for accuracy, total, label in rows[:top]:
+        print(f"  {accuracy:7.1%}  {total:>8}  {label}")
+
+
+def check_outcomes(columns: EventColumns, row_categories, col_categories, champions_data: List[Dict]) -> Counter:
+    """Distinct (cell categories, champion, outcome) combinations whose outcome the current data disagrees with"""
+    category_champions = {}
+
+    def matches(category_id: int) -> set:
+        if category_id not in category_champions:
+            category_champions[category_id] = set(get_champions_for_category(champions_data, columns.categories.values[category_id]))
+        return category_champions[category_id]
+
+    combinations = Counter(zip(
+        (int(category) for category in row_categories),
+        (int(category) for category in col_categories),
+        columns.guess_champion,
+        columns.guess_correct,
+    ))
+    disagreements = Counter()
+    for (row_category, col_category, champion, is_correct), count in combinations.items():
+        if row_category < 0 or col_category < 0:
+            continue
+        name = columns.champions.values[champion]
+        expected = name in matches(row_category) and name in matches(col_category)
+        if expected != bool(is_correct):
+            key = (columns.categories.values[row_category], columns.categories.values[col_category], name, bool(is_correct))
+            disagreements[key] += count
+    return disagreements
+
+
+def analyze(columns: EventColumns, min_guesses: int, top: int, check_data: bool) -> None:
+    num_guesses = len(columns.guess_game)
+    journaled_games = sum(1 for difficulty in columns.game_difficulty if difficulty >= 0)
+    print(f"{journaled_games} games created, {num_guesses} guesses, {len(columns.verify_cell)} daily verifications, "
+          f"{columns.malformed} malformed lines")
+    if num_guesses:
+        print(f"Overall guess accuracy: {sum(columns.guess_correct) / num_guesses:.1%}")
+
+    row_categories, col_categories = guess_cell_categories(columns)
+    num_categories = len(columns.categories)
+
+    # Accuracy per category, counting each guess for both of its cell's categories
+    row_totals, row_hits = count_by(row_categories, columns.guess_correct, num_categories)
+    col_totals, col_hits = count_by(col_categories, columns.guess_correct, num_categories)
+    totals = [a + b for a, b in zip(row_totals, col_totals)]
+    hits = [a + b for a, b in zip(row_hits, col_hits)]
+    print_accuracy_table("Hardest categories", columns.categories.values, totals, hits, min_guesses, top)
+    print_accuracy_table("Easiest categories", columns.categories.values, totals, hits, min_guesses, top, hardest_first=False)
+
+    # Accuracy per ordered (row, column) category pair
+    if np is not None:
+        pair_keys = np.where((row_categories >= 0) & (col_categories >= 0), row_categories.astype(np.int64) * num_categories + col_categories, -1)
+    else:
+        pair_keys = [r * num_categories + c if r >= 0 and c >= 0 else -1 for r, c in zip(row_categories, col_categories)]
+    pair_totals, pair_hits = count_by(pair_keys, columns.guess_correct, num_categories * num_categories)
+    seen_pairs = [i for i, total in enumerate(pair_totals) if total]
+    pair_labels = [f"{columns.categories.values[i // num_categories]} x {columns.categories.values[i % num_categories]}" for i in seen_pairs]
+    print_accuracy_table("Hardest category pairs", pair_labels, [pair_totals[i] for i in seen_pairs],
+                         [pair_hits[i] for i in seen_pairs], min_guesses, top)
+
+    # Accuracy per cell position
+    cells = [row * 3 + col for row, col in zip(columns.guess_row, columns.guess_col)]
+    cell_totals, cell_hits = count_by(cells, columns.guess_correct, 9)
+    print("\nAccuracy by cell (row, col):")
+    for row in range(3):
+        print("  " + "  ".join(
+            f"{cell_hits[row * 3 + col] / cell_totals[row * 3 + col]:6.1%}" if cell_totals[row * 3 + col] else "     -"
+            for col in range(3)))
+
+    # Guess distributions
+    champion_totals, champion_hits = count_by(columns.guess_champion, columns.guess_correct, len(columns.champions))
+    most_guessed = sorted(range(len(champion_totals)), key=lambda i: -champion_totals[i])[:top]
+    print("\nMost guessed champions:")
+    for i in most_guessed:
+        print(f"  {champion_totals[i]:>8}  {champion_hits[i] / champion_totals[i]:7.1%}  {columns.champions.values[i]}")
+
+    guesses_per_game = Counter(Counter(columns.guess_game).values())
+    print("\nGuesses per game: " + ", ".join(f"{count}: {games}" for count, games in sorted(guesses_per_game.items())))
+    played = set(columns.guess_game)
+    final_scores = Counter(columns.game_final_score[game] for game in played)
+    print("Final scores: " + ", ".join(f"{score}: {games}" for score, games in sorted(final_scores.items())))
+
+    if columns.verify_cell:
+        verify_totals, verify_hits = count_by(columns.verify_cell, columns.verify_correct, 9)
+        print(f"\nDaily verifications over {len(columns.verify_dates)} days, accuracy by cell:")
+        for row in range(3):
+            print("  " + "  ".join(
+                f"{verify_hits[row * 3 + col] / verify_totals[row * 3 + col]:6.1%}" if verify_totals[row * 3 + col] else "     -"
+                for col in range(3)))
+
+    # Anomalies
+    print("\nAnomaly checks:")
+    unknown = sum(1 for game in played if columns.game_difficulty[game] < 0)
+    print(f"  {unknown} games with guesses but no creation event")
+    overplayed = sum(games for count, games in guesses_per_game.items() if count > GUESSES_PER_GAME)
+    print(f"  {overplayed} games with more than {GUESSES_PER_GAME} guesses")
+    split_dailies = sorted(date for date, grids in columns.daily_grids.items() if len(grids) > 1)
+    print(f"  {len(split_dailies)} days whose daily challenge differed between workers" + (f": {', '.join(split_dailies)}" if split_dailies else ""))
+    if check_data:
+        disagreements = check_outcomes(columns, row_categories, col_categories, load_champions_data())
+        print(f"  {sum(disagreements.values())} guesses whose outcome disagrees with the current champion data")
+        for (row_category, col_category, champion, is_correct), count in disagreements.most_common(top):
+            print(f"    {count:>6}  {champion} in {row_category} x {col_category} was {'correct' if is_correct else 'incorrect'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze the game event journal")
+    parser.add_argument("paths", nargs="*", help="Journal files (default: $LOLGRID_EVENT_JOURNAL or logs/events.jsonl)")
+    parser.add_argument("--top", type=int, default=15, help="Rows to show per table")
+    parser.add_argument("--min-guesses", type=int, default=20, help="Guesses a category or pair needs to be ranked")
+    parser.add_argument("--skip-data-check", action="store_true", help="Do not check outcomes against the champion data")
+    args = parser.parse_args()
+
+    default_path = os.environ.get('LOLGRID_EVENT_JOURNAL', '')
+    if default_path.lower() in ('', 'off', '0', '1'):
+        default_path = os.path.join(PROJECT_ROOT, 'logs', 'events.jsonl')
+    paths = args.paths or [path for path in (default_path,) if os.path.exists(path)]
+    if not paths:
+        print("No event journal found")
+        return
+
+    start = time.perf_counter()
+    columns = load_journal(paths)
+    loaded = time.perf_counter()
+    analyze(columns, args.min_guesses, args.top, not args.skip_data_check)
+    print(f"\nLoaded in {loaded - start:.2f}s, analyzed in {time.perf_counter() - loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
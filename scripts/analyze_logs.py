@@ -6,7 +6,6 @@ Script to analyze game logs and identify issues with game state or category matc
 import os
 import re
 import sys
-import json
 import logging
 from collections import defaultdict
 from typing import Dict, List, Set, Tuple
@@ -17,7 +16,8 @@ sys.path.append(PROJECT_ROOT)
 
 # Import backend modules
 from backend.categories import CATEGORY_TYPES, get_all_categories, get_champions_for_category
-from backend.grid_generator import GridGenerator, load_champions_data
+from backend.champion_data import load_champions_data
+from backend.grid_generator import GridGenerator
 
 # Configure logging
 logging.basicConfig(
@@ -26,13 +26,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def load_champions_data():
-    """Load champion data from the JSON file"""
-    data_path = os.path.join(PROJECT_ROOT, 'data', 'champions.json')
-    with open(data_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return data["champions"]
-
 def analyze_log_file(log_file_path):
     """Analyze the game log file to identify issues"""
     if not os.path.exists(log_file_path):
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WSGI (Flask threaded server) and ASGI (uvicorn) variants of the backend.
+
+Each server is started in a subprocess and driven with the same concurrent mix of
+requests: new games, guesses, valid-champions lookups and champion list fetches.
+Throughput and latency percentiles are printed for each server.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List
+
+import aiohttp
+
+# Get the project root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "wsgi": lambda port: [sys.executable, "-m", "flask", "--app", "backend.app", "run", "--port", str(port), "--with-threads"],
+    "asgi": lambda port: [sys.executable, "-m", "uvicorn", "backend.asgi:app", "--port", str(port), "--log-level", "warning"],
+}
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def wait_until_ready(base_url: str, timeout: float = 60.0) -> None:
+    """Poll the champion list until the server answers"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/api/champions") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+async def play_session(session: aiohttp.ClientSession, base_url: str, latencies: Dict[str, List[float]]) -> None:
+    """One simulated player: start a game, guess every cell, reveal a cell and fetch the champion list"""
+    async def timed(name, method, path, **kwargs):
+        start = time.perf_counter()
+        async with session.request(method, f"{base_url}{path}", **kwargs) as response:
+            body = await response.json()
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        return body
+
+    game = await timed("game", "GET", "/api/game?difficulty=0.5&format=compact")
+    for cell in range(9):
+        await timed("guess", "POST", "/api/guess?format=compact", json={
+            "gameId": game["gameId"], "row": cell // 3, "col": cell % 3, "champion": random.choice(["Ahri", "Garen", "Jinx", "Thresh"])
+        })
+    await timed("valid-champions", "POST", "/api/valid-champions", json={"rowCategory": "Ionia", "colCategory": "Mage"})
+    await timed("champions", "GET", "/api/champions")
+
+async def run_load(base_url: str, concurrency: int, sessions: int) -> Dict[str, List[float]]:
+    latencies = {"game": [], "guess": [], "valid-champions": [], "champions": []}
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def bounded():
+            async with semaphore:
+                await play_session(session, base_url, latencies)
+        await asyncio.gather(*(bounded() for _ in range(sessions)))
+    return latencies
+
+def benchmark(name: str, port: int, concurrency: int, sessions: int) -> None:
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    server = subprocess.Popen(SERVERS[name](port), cwd=PROJECT_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        start = time.perf_counter()
+        latencies = asyncio.run(run_load(base_url, concurrency, sessions))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{name.upper()}: {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s) at concurrency {concurrency}")
+    print(f"  {'endpoint':<16} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, values in latencies.items():
+        if values:
+            print(f"  {endpoint:<16} {len(values):>6} {percentile(values, 50):>8.2f} {percentile(values, 95):>8.2f} {percentile(values, 99):>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the WSGI and ASGI backend servers")
+    parser.add_argument("--servers", nargs="+", default=["wsgi", "asgi"], choices=sorted(SERVERS))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=200, help="Number of simulated games to play")
+    parser.add_argument("--port", type=int, default=5101)
+    args = parser.parse_args()
+
+    for i, name in enumerate(args.servers):
+        benchmark(name, args.port + i, args.concurrency, args.sessions)
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,10 @@ This file handles fetching and organizing champion icons from the Data Dragon AP
 """
 
 import json
+import math
 import os
+import sys
+import hashlib
 import aiohttp
 import asyncio
 from typing import Dict, Optional, Tuple
@@ -17,6 +20,7 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Update paths to use project root
 ICONS_DIR = Path(os.path.join(PROJECT_ROOT, "static", "champion_icons"))
 PROCESSED_DIR = ICONS_DIR / "processed"
+ATLAS_DIR = ICONS_DIR / "atlas"
 CHAMPION_ICONS_JSON = os.path.join(PROJECT_ROOT, "data", "champion_icons.json")
 
 # Create a directory for storing champion icons if it doesn't exist
@@ -138,6 +142,67 @@ def generate_processed_icons(champion_icons: Dict[str, str]) -> None:
             output_path = processed_dir / f"{champion_name}_{tint}.png"
             save_processed_icon(icon_path, str(output_path), tint=tint)
 
+def build_sprite_atlas(icon_paths: Dict[str, Path], size: str = "medium", tint: str = "default", tint_strength: float = 0.5) -> Tuple[Image.Image, Dict]:
+    """
+    Pack every icon, processed with the given size and tint, into a single atlas image.
+    Returns the atlas and a manifest of per-champion (x, y) offsets.
+    """
+    icon_width, icon_height = ICON_SIZES[size]
+    columns = math.ceil(math.sqrt(len(icon_paths)))
+    rows = math.ceil(len(icon_paths) / columns)
+    atlas = Image.new("RGBA", (columns * icon_width, rows * icon_height), (0, 0, 0, 0))
+    
+    coordinates = {}
+    for i, (champion_id, icon_path) in enumerate(sorted(icon_paths.items())):
+        x, y = (i % columns) * icon_width, (i // columns) * icon_height
+        img = process_icon(str(icon_path), size, tint, tint_strength)
+        if img.size != (icon_width, icon_height):
+            img = resize_icon(img, (icon_width, icon_height))
+        atlas.paste(img.convert("RGBA"), (x, y))
+        coordinates[champion_id] = [x, y]
+    
+    manifest = {
+        "size": size,
+        "tint": tint,
+        "width": atlas.width,
+        "height": atlas.height,
+        "iconWidth": icon_width,
+        "iconHeight": icon_height,
+        "champions": coordinates
+    }
+    return atlas, manifest
+
+def build_sprite_atlases() -> None:
+    """
+    Build an atlas and JSON manifest for every icon size and for the correct/incorrect tints.
+    Each manifest names its atlas image by content hash so the image can be cached forever.
+    """
+    ATLAS_DIR.mkdir(exist_ok=True)
+    icon_paths = {icon_file.stem: icon_file for icon_file in ICONS_DIR.glob("*.png")}
+    
+    variants = [(size, "default") for size in ICON_SIZES] + [("medium", tint) for tint in ["correct", "incorrect"]]
+    for size, tint in variants:
+        name = size if tint == "default" else tint
+        atlas, manifest = build_sprite_atlas(icon_paths, size, tint)
+        
+        buffer = io.BytesIO()
+        atlas.save(buffer, "PNG", optimize=True)
+        data = buffer.getvalue()
+        content_hash = hashlib.sha1(data).hexdigest()[:12]
+        
+        # Remove atlases from previous builds of this variant
+        for old_file in ATLAS_DIR.glob(f"{name}.*.png"):
+            old_file.unlink()
+        
+        image_name = f"{name}.{content_hash}.png"
+        with open(ATLAS_DIR / image_name, "wb") as f:
+            f.write(data)
+        manifest["image"] = f"/champion_icons/atlas/{image_name}"
+        with open(ATLAS_DIR / f"{name}.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+        
+        print(f"Built {name} atlas ({atlas.width}x{atlas.height}, {len(data)} bytes) with {len(manifest['champions'])} icons")
+
 def save_icon_paths():
     """Save the paths of all champion icons to a JSON file"""
     icon_paths = {}
@@ -163,9 +228,16 @@ async def main():
         # Generate processed versions of all icons
         generate_processed_icons(champion_icons)
         
+        # Pack the icons into sprite atlases
+        build_sprite_atlases()
+        
         print(f"Successfully downloaded {len(champion_icons)} champion icons")
         print("Icon paths have been saved to", CHAMPION_ICONS_JSON)
         print("Processed icons have been generated in", PROCESSED_DIR)
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--atlas":
+        # Only rebuild the sprite atlases from the icons already on disk
+        build_sprite_atlases()
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
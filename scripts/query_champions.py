@@ -1,11 +1,14 @@
-import json
 from typing import Dict, List, Set
 from dataclasses import dataclass
 from enum import Enum
 import os
+import sys
 
 # Get the project root directory
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from backend.champion_data import load_champions_data
 
 class AbilitySlot(Enum):
     PASSIVE = "passive"
@@ -21,11 +24,6 @@ class AbilityQuery:
     flags: Set[str]
     required_count: int = 1  # How many flags need to match
 
-def load_champion_data() -> Dict:
-    """Load champion data from JSON file."""
-    with open(os.path.join(PROJECT_ROOT, 'data', 'champions.json'), 'r') as f:
-        return json.load(f)
-
 def check_ability_flags(ability: Dict, required_flags: Set[str]) -> bool:
     """Check if an ability has all the required flags"""
     if not ability or 'flags' not in ability:
@@ -56,10 +54,9 @@ def check_champion_abilities(champion: Dict, query: AbilityQuery) -> bool:
 
 def find_champions(query: AbilityQuery) -> List[str]:
     """Find all champions that match the given ability query"""
-    champions_data = load_champion_data()
     matching_champions = []
 
-    for champion in champions_data['champions']:
+    for champion in load_champions_data():
         if check_champion_abilities(champion, query):
             matching_champions.append(champion['name'])
 